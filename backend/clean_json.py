@@ -1,3 +1,7 @@
+import hashlib
+import math
+import operator
+
 import pandas as pd
 
 # Colonnes standardisées
@@ -50,43 +54,127 @@ def normalize_bool(v):
     return False
 
 
-def clean_database(db):
-    cleaned_clients = []
+# ---------------------------------------------------------
+# Version du schéma : change automatiquement avec VALID_COLUMNS.
+# Un document enregistré par l'application porte ce tampon ("_schema") :
+# ses dossiers ayant exactement les colonnes attendues sont déjà propres.
+# ---------------------------------------------------------
+SCHEMA_KEY = "_schema"
+SCHEMA_VERSION = 1
+_COLUMNS = list(VALID_COLUMNS.keys())
+SCHEMA_STAMP = "{}:{}".format(
+    SCHEMA_VERSION,
+    hashlib.sha1(
+        repr([(col, type(default).__name__) for col, default in VALID_COLUMNS.items()]).encode("utf-8")
+    ).hexdigest()[:8],
+)
+
+
+def clean_record(item):
+    clean = {}
+
+    for col, default in VALID_COLUMNS.items():
+        if col in item:
+            val = item[col]
+
+            # bool
+            if isinstance(default, bool):
+                val = normalize_bool(val)
+
+            # float (NaN / infini : JSON ne sait pas les écrire, défaut)
+            elif isinstance(default, float):
+                try:
+                    val = float(val)
+                except Exception:
+                    val = default
+                if not math.isfinite(val):
+                    val = default
+
+            # date (laisser string)
+            elif isinstance(default, str) and "Date" in col:
+                val = val if val else ""
+
+            # text
+            elif isinstance(default, str):
+                val = val if val else ""
+
+            clean[col] = val
+        else:
+            clean[col] = default
+
+    return clean
+
+
+# Types attendus d'un dossier propre, colonne par colonne ("Dossier N" : numéro
+# texte ou nombre, ou absent) et montants, pour l'empreinte
+_CLEAN_TYPES = {
+    (number_type,) + tuple(type(default) for default in list(VALID_COLUMNS.values())[1:])
+    for number_type in (str, int, float, type(None))
+}
+_amounts = operator.itemgetter(*[col for col, d in VALID_COLUMNS.items() if isinstance(d, float)])
 
-    for item in db.get("clients", []):
-        if not isinstance(item, dict):
-            continue
 
-        clean = {}
+def _is_clean_shape(item):
+    # Empreinte d'un dossier propre : exactement les colonnes du schéma, dans
+    # l'ordre, chaque valeur du type de son défaut et des montants finis.
+    # Le tampon seul ne suffit pas : un fichier modifié à la main le conserve.
+    return (
+        list(item) == _COLUMNS
+        and tuple(map(type, item.values())) in _CLEAN_TYPES
+        and math.isfinite(sum(_amounts(item)))
+    )
 
-        for col, default in VALID_COLUMNS.items():
-            if col in item:
-                val = item[col]
 
-                # bool
-                if isinstance(default, bool):
-                    val = normalize_bool(val)
+def clean_database(db, reference=None, trusted=False):
+    """
+    Nettoie la base.
 
-                # float
-                elif isinstance(default, float):
-                    try:
-                        val = float(val)
-                    except Exception:
-                        val = default
+    reference : base propre dont est issue `db` (snapshot chargé). Les dossiers
+                identiques à leur version de référence ne sont pas renettoyés :
+                à l'enregistrement, seuls les dossiers modifiés le sont.
+    trusted   : document lu sur le stockage. S'il porte le tampon du schéma
+                courant, ses dossiers de la bonne forme sont repris tels quels.
+    """
+    trusted = trusted and db.get(SCHEMA_KEY) == SCHEMA_STAMP
 
-                # date (laisser string)
-                elif isinstance(default, str) and "Date" in col:
-                    val = val if val else ""
+    ref_clients = (reference or {}).get("clients", [])
+    ref_by_key = None
 
-                # text
-                elif isinstance(default, str):
-                    val = val if val else ""
+    cleaned_clients = []
+    dirty = []  # positions dans cleaned_clients des dossiers à nettoyer
 
-                clean[col] = val
-            else:
-                clean[col] = default
+    for i, item in enumerate(db.get("clients", [])):
+        if not isinstance(item, dict):
+            continue
+
+        if trusted and _is_clean_shape(item):
+            cleaned_clients.append(item)
+            continue
 
-        cleaned_clients.append(clean)
+        if reference is not None:
+            # Même position d'abord (cas courant), sinon par numéro de dossier
+            ref = ref_clients[i] if i < len(ref_clients) else None
+            if ref is None or ref.get("Dossier N") != item.get("Dossier N"):
+                if ref_by_key is None:
+                    ref_by_key = {r.get("Dossier N"): r for r in ref_clients}
+                ref = ref_by_key.get(item.get("Dossier N"))
+            if ref is not None and ref == item and _is_clean_shape(item):
+                cleaned_clients.append(dict(item))
+                continue
+
+        dirty.append(len(cleaned_clients))
+        cleaned_clients.append(item)
+
+    # Import local : clean_columnar dépend de VALID_COLUMNS (import circulaire)
+    from backend.clean_columnar import COLUMNAR_MIN_ROWS, clean_records_columnar
+
+    if len(dirty) >= COLUMNAR_MIN_ROWS:
+        # Gros volume (import, ancien fichier) : moteur colonne, même résultat
+        for pos, clean in zip(dirty, clean_records_columnar([cleaned_clients[p] for p in dirty])):
+            cleaned_clients[pos] = clean
+    else:
+        for pos in dirty:
+            cleaned_clients[pos] = clean_record(cleaned_clients[pos])
 
     return {
         "clients": cleaned_clients,
@@ -96,4 +184,5 @@ def clean_database(db):
         "tarifs": db.get("tarifs", []),
         "tarifs_history": db.get("tarifs_history", []),
         "history": db.get("history", []),
+        SCHEMA_KEY: SCHEMA_STAMP,
     }
@@ -0,0 +1,150 @@
+# backend/codec.py
+# Sérialisation JSON de la base (chemin critique : chaque rerun).
+#
+# orjson est utilisé s'il est installé : décodage directement depuis les
+# octets téléchargés (pas de str intermédiaire), dates et numpy sérialisés
+# nativement. Sinon, repli transparent sur le module json standard.
+#
+#   python -m backend.codec [nb_dossiers]   -> micro-benchmark
+import json
+import time
+from datetime import date, datetime
+from decimal import Decimal
+
+try:
+    import orjson
+except ImportError:  # dépendance optionnelle
+    orjson = None
+
+BACKEND = "orjson" if orjson is not None else "json"
+
+
+def default(obj):
+    """Types rencontrés dans les dossiers mais inconnus de json/orjson."""
+    if isinstance(obj, (datetime, date)):
+        return obj.isoformat()
+    if isinstance(obj, Decimal):
+        return float(obj)
+    if isinstance(obj, (set, tuple)):
+        return list(obj)
+    # numpy / pandas (np.float64, np.bool_, pd.Timestamp...)
+    if hasattr(obj, "isoformat"):
+        return obj.isoformat()
+    if hasattr(obj, "item"):
+        return obj.item()
+    raise TypeError(f"Type non sérialisable en JSON : {type(obj).__name__}")
+
+
+if orjson is not None:
+    _OPTS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+    def dumps(obj, indent=False) -> bytes:
+        opts = (_OPTS | orjson.OPT_INDENT_2) if indent else _OPTS
+        return orjson.dumps(obj, default=default, option=opts)
+
+    def loads(raw):
+        try:
+            return orjson.loads(raw)
+        except orjson.JSONDecodeError:
+            # Fichiers écrits par json.dumps avec NaN / Infinity : refusés par orjson
+            return json.loads(raw)
+
+else:
+
+    def dumps(obj, indent=False) -> bytes:
+        if indent:
+            return json.dumps(obj, indent=2, default=default).encode("utf-8")
+        return json.dumps(
+            obj, ensure_ascii=False, separators=(",", ":"), default=default
+        ).encode("utf-8")
+
+    def loads(raw):
+        # json.loads accepte directement les octets (UTF-8 détecté)
+        return json.loads(raw)
+
+
+# ---------------------------------------------------------
+# 🔹 Micro-benchmark sur la forme réelle du document
+# ---------------------------------------------------------
+def sample_document(n_clients=2000):
+    """Document factice ayant la forme de database.json (colonnes de clean_json)."""
+    from backend.clean_json import VALID_COLUMNS
+
+    clients = []
+    for i in range(n_clients):
+        c = {}
+        for col, default in VALID_COLUMNS.items():
+            if col == "Dossier N":
+                c[col] = f"{12000 + i // 3}-{i % 3}" if i % 3 else str(12000 + i // 3)
+            elif isinstance(default, bool):
+                c[col] = (i + len(col)) % 4 == 0
+            elif isinstance(default, float):
+                c[col] = round(((i * 37 + len(col)) % 5000) * 1.25, 2)
+            elif "Date" in col:
+                c[col] = f"2024-{1 + i % 12:02d}-{1 + i % 28:02d}" if i % 2 else ""
+            else:
+                c[col] = f"{col} é {i % 97}"
+        clients.append(c)
+
+    return {
+        "clients": clients,
+        "visa": [{"Categories": "Affaires", "Sous-categories": "Travail", "Visa": f"V-{i}"} for i in range(120)],
+        "escrow": [],
+        "compta": [],
+        "tarifs": [{"Visa": f"V-{i}", "Tarif": 1500.0 + i, "Date_effet": "2024-01-01", "Actif": True} for i in range(120)],
+        "tarifs_history": [],
+        "history": [],
+    }
+
+
+def benchmark(doc=None, repeat=5):
+    """Meilleur temps (ms) d'encodage/décodage, orjson et json standard."""
+    doc = doc if doc is not None else sample_document()
+
+    def best(fn):
+        times = []
+        for _ in range(repeat):
+            t0 = time.perf_counter()
+            fn()
+            times.append(time.perf_counter() - t0)
+        return round(min(times) * 1000, 2)
+
+    rows = []
+    for indent in (True, False):
+        std_raw = (
+            json.dumps(doc, indent=2) if indent
+            else json.dumps(doc, ensure_ascii=False, separators=(",", ":"))
+        ).encode("utf-8")
+        rows.append({
+            "codec": "json",
+            "indent": indent,
+            "size": len(std_raw),
+            "encode_ms": best(lambda: (
+                json.dumps(doc, indent=2) if indent
+                else json.dumps(doc, ensure_ascii=False, separators=(",", ":"))
+            ).encode("utf-8")),
+            "decode_ms": best(lambda: json.loads(std_raw.decode("utf-8"))),
+        })
+        if orjson is not None:
+            raw = dumps(doc, indent=indent)
+            rows.append({
+                "codec": "orjson",
+                "indent": indent,
+                "size": len(raw),
+                "encode_ms": best(lambda: dumps(doc, indent=indent)),
+                "decode_ms": best(lambda: loads(raw)),
+            })
+    return rows
+
+
+if __name__ == "__main__":
+    import sys
+
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    print(f"codec actif : {BACKEND} — {n} dossiers")
+    for row in benchmark(sample_document(n)):
+        print(
+            f"{row['codec']:7} indent={row['indent']!s:5} "
+            f"{row['size'] / 1024:9.0f} Ko  "
+            f"encodage {row['encode_ms']:8.2f} ms  décodage {row['decode_ms']:8.2f} ms"
+        )
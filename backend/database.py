@@ -1,8 +1,51 @@
-from backend.dropbox_utils import load_database, save_database
+import threading
+
+from backend.dropbox_utils import REV_KEY, load_database, save_database
+from backend.merge import DOSSIER_KEY, dossier_key
+
+
+def normalize_key(dossier_num) -> str:
+    """Clé d'index d'un numéro de dossier (12937, "12937 ", "12937-1"...)."""
+    return "" if dossier_num is None else str(dossier_num).strip()
+
+
+def _build_index(clients):
+    index = {}
+    for i, c in enumerate(clients):
+        key = dossier_key(c)
+        # Doublons : le premier dossier l'emporte (comme l'ancien parcours)
+        if key and key not in index:
+            index[key] = i
+    return index
+
 
 class Database:
-    def __init__(self):
-        self.db = load_database()
+    """
+    Base chargée + index « Dossier N » -> position dans db["clients"].
+    Les recherches par numéro sont en O(1) ; l'index suit les ajouts,
+    modifications et suppressions faits via cette classe.
+    index : index partagé (get_database), copié avant toute modification.
+    """
+
+    def __init__(self, db=None, index=None):
+        self.db = load_database() if db is None else db
+        if index is None:
+            self._reindex()
+        else:
+            self._index = index
+            self._shared = True
+
+    def _reindex(self):
+        self._index = _build_index(self.db.get("clients", []))
+        self._shared = False
+
+    def _own_index(self):
+        if self._shared:
+            self._index = dict(self._index)
+            self._shared = False
+
+    def save(self):
+        save_database(self.db)
 
     # ------------------------
     # CLIENTS
@@ -10,31 +53,89 @@ class Database:
     def list_clients(self):
         return self.db.get("clients", [])
 
+    def __len__(self):
+        return len(self.db.get("clients", []))
+
+    def __contains__(self, dossier_num):
+        return normalize_key(dossier_num) in self._index
+
+    def position(self, dossier_num):
+        """Position du dossier dans db["clients"] (None si absent)."""
+        return self._index.get(normalize_key(dossier_num))
+
     def get_client(self, dossier_num):
-        for c in self.db.get("clients", []):
-            if str(c.get("Dossier N")) == str(dossier_num):
-                return c
-        return None
+        i = self.position(dossier_num)
+        return None if i is None else self.db["clients"][i]
+
+    def get_many(self, dossier_nums):
+        """{numéro normalisé: dossier} pour les numéros trouvés."""
+        clients = self.db.get("clients", [])
+        out = {}
+        for num in dossier_nums:
+            key = normalize_key(num)
+            i = self._index.get(key)
+            if i is not None:
+                out[key] = clients[i]
+        return out
+
+    def _apply_update(self, dossier_num, new_data: dict):
+        i = self.position(dossier_num)
+        if i is None:
+            return False
+        self._update_at(i, new_data)
+        return True
+
+    def _update_at(self, i, new_data: dict):
+        record = self.db["clients"][i]
+        key = dossier_key(record)
+        record.update(new_data)
+
+        # Renumérotation : on déplace l'entrée d'index
+        new_key = dossier_key(record)
+        if new_key != key:
+            self._own_index()
+            if self._index.get(key) == i:
+                del self._index[key]
+            if new_key and new_key not in self._index:
+                self._index[new_key] = i
 
     def update_client(self, dossier_num, new_data: dict):
-        updated = False
-        for i, c in enumerate(self.db["clients"]):
-            if str(c.get("Dossier N")) == str(dossier_num):
-                self.db["clients"][i].update(new_data)
-                updated = True
-                break
-        if updated:
-            save_database(self.db)
+        if self._apply_update(dossier_num, new_data):
+            self.save()
+
+    def update_client_at(self, position, new_data: dict):
+        """Mise à jour par position (ligne d'un DataFrame construit sur db["clients"])."""
+        self._update_at(position, new_data)
+        self.save()
+
+    def update_many(self, updates):
+        """
+        updates : {numéro: champs} ou liste de (numéro, champs).
+        Un seul enregistrement pour tout le lot. Retourne le nombre de dossiers modifiés.
+        """
+        items = updates.items() if isinstance(updates, dict) else updates
+        count = sum(1 for num, fields in items if self._apply_update(num, fields))
+        if count:
+            self.save()
+        return count
 
     def add_client(self, data):
-        self.db["clients"].append(data)
-        save_database(self.db)
+        clients = self.db.setdefault("clients", [])
+        clients.append(data)
+        key = dossier_key(data)
+        if key and key not in self._index:
+            self._own_index()
+            self._index[key] = len(clients) - 1
+        self.save()
 
     def delete_client(self, dossier_num):
+        key = normalize_key(dossier_num)
         self.db["clients"] = [
-            c for c in self.db["clients"] if str(c["Dossier N"]) != str(dossier_num)
+            c for c in self.db["clients"] if normalize_key(c.get(DOSSIER_KEY)) != key
         ]
-        save_database(self.db)
+        # Les positions suivantes ont bougé
+        self._reindex()
+        self.save()
 
     # ------------------------
     # VISA TABLE
@@ -50,3 +151,27 @@ class Database:
             c for c in self.db["clients"]
             if c["Escrow"] or c["Escrow_a_reclamer"] or c["Escrow_reclame"]
         ]
+
+
+# Index « Dossier N » partagé par révision de la base
+_INDEX = {"key": None, "index": None}
+_INDEX_LOCK = threading.Lock()
+
+
+def get_database(db) -> Database:
+    """
+    Database sur la base chargée : l'index est construit une fois par
+    révision et partagé entre reruns et sessions (chaque Database le copie
+    avant de le modifier).
+    """
+    rev = db.get(REV_KEY)
+    key = None if rev is None else (rev, len(db.get("clients", [])))
+    with _INDEX_LOCK:
+        if key is not None and _INDEX["key"] == key:
+            return Database(db, index=_INDEX["index"])
+
+    index = _build_index(db.get("clients", []))
+    if key is not None:
+        with _INDEX_LOCK:
+            _INDEX.update(key=key, index=index)
+    return Database(db, index=index)
@@ -1,48 +1,305 @@
-import json
-import dropbox
+import itertools
+import threading
+from collections import OrderedDict
 import streamlit as st
 from backend.clean_json import clean_database
+from backend.kpi_store import record_save
+from backend.file_format import DEFAULT_FORMAT, FORMAT_STATS, decode_document, encode_document
+from backend.merge import merge_databases
+from backend.journal import (
+    COMPACT_THRESHOLD_BYTES,
+    apply_journal,
+    diff_database,
+    encode_patches,
+    journal_header,
+    journal_path_for,
+    parse_journal,
+)
+from backend.storage import (
+    StorageConflict,
+    StorageNotFound,
+    get_storage,
+    get_token_manager,
+    storage_config,
+)
+from backend.write_behind import WriteBehindQueue
 
 
-APP_KEY = st.secrets["dropbox"]["APP_KEY"]
-APP_SECRET = st.secrets["dropbox"]["APP_SECRET"]
-REFRESH_TOKEN = st.secrets["dropbox"]["DROPBOX_TOKEN"]
-JSON_PATH = st.secrets["paths"]["DROPBOX_JSON"]
+# ---------------------------------------------------------
+# 🔹 Chemins et options (lus au premier accès, pas à l'import)
+# ---------------------------------------------------------
+def json_path():
+    return storage_config()["json_path"]
+
+
+def journal_enabled():
+    # Mode journal : chaque enregistrement ajoute des patchs à un fichier annexe
+    # au lieu de réécrire database.json (voir backend/journal.py)
+    return bool(storage_config()["storage"].get("JOURNAL", False))
+
+
+def journal_path():
+    return storage_config()["paths"].get("DROPBOX_JOURNAL", journal_path_for(json_path()))
+
+
+def journal_compact_bytes():
+    return int(storage_config()["storage"].get("JOURNAL_COMPACT_BYTES", COMPACT_THRESHOLD_BYTES))
+
+
+def storage_format():
+    # Format d'écriture de database.json (voir backend/file_format.py).
+    # La lecture détecte le format : changer ce réglage est sans risque.
+    return storage_config()["storage"].get("FORMAT", DEFAULT_FORMAT)
+
+
+def write_behind_enabled():
+    # Écriture différée : save_database() rend la main tout de suite,
+    # l'upload part en arrière-plan (voir backend/write_behind.py)
+    return bool(storage_config()["storage"].get("WRITE_BEHIND", False))
 
 
 # ---------------------------------------------------------
-# 🔹 Fonction interne : obtention d'un token Dropbox
+# 🔹 Snapshot partagé (process) : base nettoyée + révision Dropbox
+# ---------------------------------------------------------
+_SNAPSHOT = {
+    "rev": None,           # révision exposée aux pages (base[+journal])
+    "content_hash": None,
+    "data": None,          # base + journal rejoué, nettoyée (ou version provisoire)
+    "durable": None,       # dernière version réellement enregistrée
+    "base_rev": None,      # révision de database.json
+    "base": None,          # database.json seul (sans journal)
+    "journal_rev": None,   # révision du fichier journal (None = absent)
+    "journal": b"",        # contenu brut du journal
+}
+_SNAPSHOT_LOCK = threading.Lock()
+
+# Révision Dropbox du document chargé, posée sur chaque copie de travail.
+# save_database() s'en sert pour écrire en WriteMode.update(rev).
+REV_KEY = "_rev"
+
+# Dernières versions publiées, servant de base aux fusions à trois voies
+_BASES = OrderedDict()
+_MAX_BASES = 8
+# Versions publiées par l'écriture différée, à part pour qu'une rafale
+# d'enregistrements n'évince pas les vraies révisions de _BASES
+_PENDING_BASES = OrderedDict()
+SAVE_MAX_ATTEMPTS = 3
+
+
+def _copy_database(data, rev=None):
+    """
+    Copie de travail du snapshot.
+    Les pages modifient librement listes et dicts (append, update...) :
+    on ne doit jamais leur donner l'objet partagé entre sessions.
+    """
+    out = {}
+    for key, value in data.items():
+        if isinstance(value, list):
+            out[key] = [dict(v) if isinstance(v, dict) else v for v in value]
+        else:
+            out[key] = value
+    if rev is not None:
+        out[REV_KEY] = rev
+    return out
+
+
+def _snapshot_rev(base_rev, journal_rev, journal):
+    """La révision exposée n'inclut le journal que s'il s'applique à cette base."""
+    if journal_rev and parse_journal(journal)[0] == base_rev:
+        return f"{base_rev}+{journal_rev}"
+    return base_rev
+
+
+def _superseded():
+    """
+    Écriture différée : une version provisoire plus récente que celle en
+    cours d'envoi est publiée (enregistrements arrivés pendant l'upload).
+    Appelé sous _SNAPSHOT_LOCK.
+    """
+    sent = getattr(_FLUSH, "provisional", None)
+    current = _SNAPSHOT["rev"]
+    return sent is not None and current is not None and "~" in current and current != sent
+
+
+def _publish_snapshot(data, base_rev, content_hash=None, base=None, journal_rev=None, journal=b""):
+    rev = _snapshot_rev(base_rev, journal_rev, journal)
+    copy = _copy_database(data)
+    with _SNAPSHOT_LOCK:
+        # Les pages continuent de voir la version provisoire la plus récente
+        # jusqu'à ce que _rebase_pending la rejoue sur la version écrite
+        if not _superseded():
+            _SNAPSHOT["rev"] = rev
+            _SNAPSHOT["data"] = copy
+        _SNAPSHOT["durable"] = copy
+        _SNAPSHOT["content_hash"] = content_hash
+        _SNAPSHOT["base_rev"] = base_rev
+        _SNAPSHOT["base"] = copy if base is None else base
+        _SNAPSHOT["journal_rev"] = journal_rev
+        _SNAPSHOT["journal"] = journal
+
+        if rev is not None:
+            _BASES[rev] = copy
+            _BASES.move_to_end(rev)
+            while len(_BASES) > _MAX_BASES:
+                _BASES.popitem(last=False)
+    return rev
+
+
+def _snapshot_state():
+    with _SNAPSHOT_LOCK:
+        return dict(_SNAPSHOT)
+
+
+def _cached_snapshot(base_rev, content_hash=None, journal_rev=None):
+    """Retourne une copie du snapshot si les révisions Dropbox sont inchangées."""
+    with _SNAPSHOT_LOCK:
+        if _SNAPSHOT["data"] is None:
+            return None
+        if _SNAPSHOT["base_rev"] != base_rev or _SNAPSHOT["journal_rev"] != journal_rev:
+            return None
+        if _SNAPSHOT["content_hash"] and content_hash and _SNAPSHOT["content_hash"] != content_hash:
+            return None
+        return _copy_database(_SNAPSHOT["data"], _SNAPSHOT["rev"])
+
+
+def _publish_provisional(data, rev):
+    """
+    Publie une version pas encore écrite (écriture différée).
+    Seules les données changent : les révisions de stockage restent celles
+    du dernier enregistrement réel.
+    """
+    with _SNAPSHOT_LOCK:
+        _SNAPSHOT["rev"] = rev
+        _SNAPSHOT["data"] = _copy_database(data)
+        _PENDING_BASES[rev] = _SNAPSHOT["data"]
+        while len(_PENDING_BASES) > _MAX_BASES:
+            _PENDING_BASES.popitem(last=False)
+
+
+def _base_for(rev):
+    with _SNAPSHOT_LOCK:
+        base = _BASES.get(rev)
+        return base if base is not None else _PENDING_BASES.get(rev)
+
+
+def invalidate_snapshot():
+    """Force le prochain load_database() à retélécharger le fichier."""
+    with _SNAPSHOT_LOCK:
+        for key in ["rev", "content_hash", "data", "durable", "base_rev", "base", "journal_rev"]:
+            _SNAPSHOT[key] = None
+        _SNAPSHOT["journal"] = b""
+
+
+# ---------------------------------------------------------
+# 🔹 Client Dropbox (token réutilisé, voir backend/storage.py)
 # ---------------------------------------------------------
 def get_dbx():
-    import requests
-    resp = requests.post(
-        "https://api.dropbox.com/oauth2/token",
-        data={
-            "refresh_token": REFRESH_TOKEN,
-            "client_id": APP_KEY,
-            "client_secret": APP_SECRET,
-            "grant_type": "refresh_token",
-        },
-    )
-    token = resp.json().get("access_token")
-    if not token:
-        raise Exception("❌ Impossible de générer un token Dropbox.")
-    return dropbox.Dropbox(token)
+    return get_token_manager().get_client()
+
+
+def get_token_stats():
+    return get_token_manager().stats()
+
+
+def list_database_versions(limit=10):
+    """Révisions disponibles de database.json (plus récente d'abord)."""
+    return get_storage().list_versions(json_path(), limit=limit)
+
+
+# ---------------------------------------------------------
+# 🔹 Encodage
+# ---------------------------------------------------------
+def _encode(cleaned) -> bytes:
+    return encode_document(cleaned, storage_format())
+
+
+def _decode(raw: bytes):
+    doc, _ = decode_document(raw)
+    # Document déjà enregistré par l'application : pas de renettoyage
+    return clean_database(doc, trusted=True)
+
+
+def get_format_stats():
+    """Dernières mesures (taille, encodage, décodage) par format."""
+    return {"active": storage_format(), "formats": {k: dict(v) for k, v in FORMAT_STATS.items()}}
 
 
 # ---------------------------------------------------------
 # 🔹 Charger la base JSON
 # ---------------------------------------------------------
+def _load_full(store):
+    # Appel léger : si la révision n'a pas bougé, pas de téléchargement
+    current = store.metadata(json_path())
+    if current is None:
+        raise FileNotFoundError(json_path())
+    cached = _cached_snapshot(current.rev, current.content_hash)
+    if cached is not None:
+        return cached
+
+    metadata, raw = store.read(json_path())
+
+    # Nettoyage auto
+    data = _decode(raw)
+
+    rev = _publish_snapshot(data, metadata.rev, metadata.content_hash)
+    return _copy_database(data, rev)
+
+
+def _replay(base, patches):
+    """
+    Base + patchs du journal, renettoyée : un patch peut venir d'une autre
+    version de l'application. Seuls les dossiers touchés sont renettoyés.
+    """
+    if not patches:
+        return base
+    return clean_database(apply_journal(base, patches), reference=base)
+
+
+def _load_journaled(store):
+    base_meta = store.metadata(json_path())
+    if base_meta is None:
+        raise FileNotFoundError(json_path())
+    journal_meta = store.metadata(journal_path())
+    journal_rev = journal_meta.rev if journal_meta else None
+
+    cached = _cached_snapshot(base_meta.rev, base_meta.content_hash, journal_rev)
+    if cached is not None:
+        return cached
+
+    # Base inchangée : seul le journal (petit) est retéléchargé
+    state = _snapshot_state()
+    if state["base"] is not None and state["base_rev"] == base_meta.rev:
+        base = state["base"]
+        base_rev, content_hash = state["base_rev"], state["content_hash"]
+    else:
+        metadata, raw = store.read(json_path())
+        base = _decode(raw)
+        base_rev, content_hash = metadata.rev, metadata.content_hash
+
+    journal = b""
+    if journal_meta is not None:
+        journal_meta, journal = store.read(journal_path())
+        journal_rev = journal_meta.rev
+
+    header_rev, patches = parse_journal(journal)
+    data = _replay(base, patches) if header_rev == base_rev else base
+
+    rev = _publish_snapshot(data, base_rev, content_hash, base, journal_rev, journal)
+    return _copy_database(data, rev)
+
+
 def load_database():
     try:
-        dbx = get_dbx()
-        metadata, res = dbx.files_download(JSON_PATH)
-        data = json.loads(res.content.decode("utf-8"))
-
-        # Nettoyage auto
-        data = clean_database(data)
+        # Écriture en attente : le snapshot local est plus récent que le stockage
+        if _WRITE_QUEUE is not None and _WRITE_QUEUE.dirty():
+            state = _snapshot_state()
+            if state["data"] is not None:
+                return _copy_database(state["data"], state["rev"])
 
-        return data
+        store = get_storage()
+        if journal_enabled():
+            return _load_journaled(store)
+        return _load_full(store)
 
     except Exception as e:
         st.error(f"❌ Erreur load_database : {e}")
@@ -52,18 +309,352 @@ def load_database():
 # ---------------------------------------------------------
 # 🔹 Sauvegarder la base JSON
 # ---------------------------------------------------------
-def save_database(data):
-    try:
-        dbx = get_dbx()
+def _read_base(store, rev):
+    """
+    Version de départ `rev` d'un enregistrement (base de la fusion à trois
+    voies) : en mémoire si elle y est encore, sinon relue sur le stockage
+    (révision archivée, plus journal rejoué en mode journal). Introuvable :
+    StorageConflict, on ne fusionne jamais sans base.
+    """
+    base = _base_for(rev)
+    if base is not None:
+        return base
+    # "rev~n" : version provisoire d'une écriture différée, jamais écrite
+    if "~" not in rev:
+        base_rev, _, journal_rev = rev.partition("+")
+        try:
+            _, raw = store.read_version(json_path(), base_rev)
+            base = _decode(raw)
+            if journal_rev:
+                _, journal = store.read_version(journal_path(), journal_rev)
+                header_rev, patches = parse_journal(journal)
+                base = _replay(base, patches) if header_rev == base_rev else base
+            return base
+        except StorageNotFound:
+            pass
+    raise StorageConflict(
+        f"Version de départ {rev} introuvable (trop ancienne) : "
+        "rechargez la page puis refaites la modification"
+    )
 
-        # Nettoyage avant écriture
-        cleaned = clean_database(data)
 
-        dbx.files_upload(
-            json.dumps(cleaned, indent=2).encode("utf-8"),
-            JSON_PATH,
-            mode=dropbox.files.WriteMode("overwrite")
+def _warn_conflicts(conflicts):
+    if not conflicts:
+        return
+    # Thread de fond (écriture différée) : pas de contexte Streamlit, les
+    # conflits sont conservés par la file et affichés dans la barre latérale
+    if getattr(_FLUSH, "active", False):
+        _WRITE_QUEUE.record_conflicts(conflicts)
+    else:
+        st.warning(
+            "⚠️ Dossiers ou tables modifiés simultanément par une autre session : "
+            + ", ".join(conflicts)
+            + ". Vos valeurs ont été conservées pour les champs et tables en conflit."
         )
 
+
+def _save_full(store, data, cleaned):
+    """
+    Écriture optimiste : on envoie le document en WriteMode.update(rev)
+    avec la révision lue au chargement. Si quelqu'un a écrit entre-temps,
+    on récupère uniquement la version distante, on fusionne dossier par
+    dossier et on réessaie. Sans révision connue (import, réparation),
+    on écrase comme avant.
+    """
+    rev = data.get(REV_KEY)
+    base = None
+
+    for attempt in range(SAVE_MAX_ATTEMPTS):
+        try:
+            metadata = store.write(json_path(), _encode(cleaned), rev, overwrite=True)
+            break
+        except StorageConflict:
+            if attempt == SAVE_MAX_ATTEMPTS - 1:
+                raise
+            if base is None:
+                base = _read_base(store, rev)
+
+            remote_meta, raw = store.read(json_path())
+            remote = _decode(raw)
+            _publish_snapshot(remote, remote_meta.rev, remote_meta.content_hash)
+
+            merged, conflicts = merge_databases(base, cleaned, remote)
+            _warn_conflicts(conflicts)
+
+            cleaned = clean_database(merged)
+            base = remote
+            rev = remote_meta.rev
+
+    # La prochaine lecture voit l'écriture sans nouvel aller-retour
+    data[REV_KEY] = _publish_snapshot(cleaned, metadata.rev, metadata.content_hash)
+
+
+def _reset_journal(store, new_base_rev, state):
+    """
+    Réinitialise le journal sur la nouvelle base. Les patchs ajoutés par
+    une autre session depuis notre lecture sont reportés dans le nouveau journal.
+    Journal réécrit entre-temps sur une autre base : StorageConflict (aucun
+    patch n'est abandonné en silence).
+    """
+    old_header, old_patches = parse_journal(state["journal"])
+    folded = len(old_patches) if old_header == state["base_rev"] else 0
+    journal_rev = state["journal_rev"]
+    carried = []
+
+    for attempt in range(SAVE_MAX_ATTEMPTS):
+        body = journal_header(new_base_rev) + encode_patches(carried)
+        try:
+            meta = store.write(journal_path(), body, journal_rev)
+            return meta.rev, body, carried
+        except StorageConflict:
+            if attempt == SAVE_MAX_ATTEMPTS - 1:
+                raise
+            journal_meta, raw = store.read(journal_path())
+            header, patches = parse_journal(raw)
+            if header == state["base_rev"]:
+                # Patchs ajoutés depuis notre lecture, pas encore dans la nouvelle base
+                carried = patches[folded:]
+            elif header == new_base_rev:
+                # Journal déjà repris sur notre base par une autre session
+                carried = patches
+            else:
+                raise StorageConflict(
+                    f"Journal réinitialisé sur une autre base ({header}) pendant la réécriture"
+                )
+            journal_rev = journal_meta.rev
+
+
+def _empty_state(store):
+    """
+    Snapshot d'un stockage sans database.json (première écriture en mode
+    journal). Un journal resté sans base est remplacé par le nouveau.
+    """
+    empty = clean_database({})
+    journal_meta = store.metadata(journal_path())
+    return {
+        "rev": None, "content_hash": None, "data": empty, "durable": empty,
+        "base_rev": None, "base": empty,
+        "journal_rev": journal_meta.rev if journal_meta else None, "journal": b"",
+    }
+
+
+def _rewrite_base(store, build):
+    """
+    Réécrit database.json puis repart d'un journal vide.
+    `build(state)` produit le document complet à partir du snapshot à jour.
+    Utilisé pour la compaction et pour les écritures complètes en mode journal.
+    """
+    for attempt in range(SAVE_MAX_ATTEMPTS):
+        try:
+            _load_journaled(store)
+            state = _snapshot_state()
+        except FileNotFoundError:
+            state = _empty_state(store)
+        doc = clean_database(build(state))
+        try:
+            # Sans base (stockage vierge) : création, sans révision attendue
+            metadata = store.write(
+                json_path(), _encode(doc), state["base_rev"], overwrite=state["base_rev"] is not None
+            )
+            break
+        except StorageConflict:
+            if attempt == SAVE_MAX_ATTEMPTS - 1:
+                raise
+
+    journal_rev, journal, carried = _reset_journal(store, metadata.rev, state)
+    data = _replay(doc, carried)
+    return _publish_snapshot(data, metadata.rev, metadata.content_hash, doc, journal_rev, journal)
+
+
+def compact_journal():
+    """Replie le journal dans database.json (appelé automatiquement au-delà du seuil)."""
+    return _rewrite_base(get_storage(), lambda state: state["durable"])
+
+
+def _save_journaled(store, data, cleaned):
+    rev = data.get(REV_KEY)
+    loaded = _read_base(store, rev) if rev else None
+    patches = diff_database(loaded, cleaned) if loaded is not None else None
+
+    # Pas de version de départ connue : écriture complète fusionnée
+    if patches is None:
+        def build(state):
+            if not rev:
+                return cleaned
+            merged, conflicts = merge_databases(loaded, cleaned, state["durable"])
+            _warn_conflicts(conflicts)
+            return merged
+
+        data[REV_KEY] = _rewrite_base(store, build)
+        return
+
+    if not patches:
+        return
+
+    payload = encode_patches(patches)
+    if _snapshot_state()["durable"] is None:
+        _load_journaled(store)
+
+    for attempt in range(SAVE_MAX_ATTEMPTS):
+        state = _snapshot_state()
+        header_rev, _ = parse_journal(state["journal"])
+        if state["journal"] and header_rev == state["base_rev"]:
+            body = state["journal"] + payload
+        else:
+            body = journal_header(state["base_rev"]) + payload
+
+        try:
+            meta = store.write(journal_path(), body, state["journal_rev"])
+            break
+        except StorageConflict:
+            if attempt == SAVE_MAX_ATTEMPTS - 1:
+                raise
+            # Quelqu'un a écrit avant nous : on relit et on rajoute nos patchs à la suite
+            _load_journaled(store)
+
+    # Rejeu local : la prochaine lecture n'a rien à retélécharger
+    new_data = _replay(state["base"], parse_journal(body)[1])
+    data[REV_KEY] = _publish_snapshot(
+        new_data, state["base_rev"], state["content_hash"], state["base"], meta.rev, body
+    )
+
+    if len(body) > journal_compact_bytes():
+        data[REV_KEY] = _rewrite_base(store, lambda s: s["durable"])
+
+
+def _save_now(data, cleaned):
+    store = get_storage()
+    rev = data.get(REV_KEY)
+    before = _base_for(rev) if rev else None
+
+    if journal_enabled():
+        _save_journaled(store, data, cleaned)
+    else:
+        _save_full(store, data, cleaned)
+
+    # Indicateurs du tableau de bord : seuls les dossiers modifiés sont recomptés
+    if data.get(REV_KEY) != rev:
+        record_save(rev, before, data.get(REV_KEY), _snapshot_state()["durable"])
+
+
+# ---------------------------------------------------------
+# 🔹 Écriture différée (option [storage] WRITE_BEHIND)
+# ---------------------------------------------------------
+_WRITE_QUEUE = None
+_WRITE_QUEUE_LOCK = threading.Lock()
+_PROVISIONAL = itertools.count(1)
+# Révision provisoire publiée pour un document en attente
+PROVISIONAL_KEY = "_provisional"
+# Contexte du thread de fond pendant l'écriture d'un document en attente
+_FLUSH = threading.local()
+
+
+def _write_queue():
+    global _WRITE_QUEUE
+    with _WRITE_QUEUE_LOCK:
+        if _WRITE_QUEUE is None:
+            cfg = storage_config()["storage"]
+            _WRITE_QUEUE = WriteBehindQueue(
+                _flush_pending,
+                _rebase_pending,
+                delay=float(cfg.get("WRITE_BEHIND_DELAY", 0.5)),
+                max_delay=float(cfg.get("WRITE_BEHIND_MAX_DELAY", 5.0)),
+            )
+        return _WRITE_QUEUE
+
+
+def _flush_pending(doc):
+    """Thread de fond : écriture réelle du document en attente."""
+    work = {k: v for k, v in doc.items() if k != PROVISIONAL_KEY}
+    _FLUSH.active, _FLUSH.provisional = True, doc.get(PROVISIONAL_KEY)
+    try:
+        # Le document en attente est déjà nettoyé
+        _save_now(work, {k: v for k, v in work.items() if k != REV_KEY})
+    finally:
+        _FLUSH.active, _FLUSH.provisional = False, None
+    return work[REV_KEY]
+
+
+def _rebase_pending(sent, pending, new_rev):
+    """
+    D'autres enregistrements sont arrivés pendant l'upload de `sent` :
+    on les rejoue sur la version effectivement écrite (qui peut contenir
+    une fusion avec une autre session).
+    """
+    merged, _ = merge_databases(sent, pending, _snapshot_state()["durable"])
+    doc = clean_database(merged)
+    provisional = f"{new_rev}~{next(_PROVISIONAL)}"
+    _publish_provisional(doc, provisional)
+    doc[REV_KEY] = new_rev
+    doc[PROVISIONAL_KEY] = provisional
+    return doc
+
+
+def _save_behind(data, cleaned):
+    rev = data.get(REV_KEY)
+    # Base relue hors du verrou de la file (accès stockage si elle n'est plus en mémoire)
+    base = _read_base(get_storage(), rev) if rev else None
+    published = {}
+
+    def combine(pending):
+        state = _snapshot_state()
+        if pending is not None:
+            latest, durable = pending, pending.get(REV_KEY)
+        else:
+            latest, durable = state["data"], state["rev"]
+
+        if latest is None or base is None or rev == state["rev"]:
+            # Copie issue de la dernière version (ou import sans révision) : rien à fusionner
+            doc = cleaned
+        else:
+            merged, conflicts = merge_databases(base, cleaned, latest)
+            _warn_conflicts(conflicts)
+            doc = clean_database(merged)
+
+        published["rev"] = f"{durable}~{next(_PROVISIONAL)}"
+        _publish_provisional(doc, published["rev"])
+        # Indicateurs de la version provisoire (en mémoire seulement)
+        record_save(rev, base, published["rev"], doc)
+
+        doc = dict(doc)
+        doc[REV_KEY] = durable if durable else rev
+        doc[PROVISIONAL_KEY] = published["rev"]
+        return doc
+
+    _write_queue().update(combine)
+    data[REV_KEY] = published["rev"]
+
+
+def write_status():
+    """État de l'écriture différée pour l'interface (None si désactivée)."""
+    if _WRITE_QUEUE is None:
+        return None
+    return _WRITE_QUEUE.status()
+
+
+def clear_write_conflicts():
+    """Conflits de l'écriture différée vus par l'utilisateur."""
+    if _WRITE_QUEUE is not None:
+        _WRITE_QUEUE.clear_conflicts()
+
+
+def flush_writes(timeout=None):
+    """Attend la fin des écritures différées. True si tout est enregistré."""
+    if _WRITE_QUEUE is None:
+        return True
+    return _WRITE_QUEUE.flush(timeout)
+
+
+def save_database(data):
+    try:
+        # Nettoyage avant écriture : seuls les dossiers modifiés depuis le chargement
+        rev = data.get(REV_KEY)
+        cleaned = clean_database(data, reference=_base_for(rev) if rev else None)
+
+        if write_behind_enabled():
+            _save_behind(data, cleaned)
+        else:
+            _save_now(data, cleaned)
+
     except Exception as e:
         st.error(f"❌ Erreur save_database : {e}")
@@ -0,0 +1,149 @@
+# backend/file_format.py
+# Format d'écriture de database.json sur le stockage.
+#
+#   json          JSON indenté (historique, lisible dans Dropbox)
+#   json-compact  JSON sans espaces
+#   json-gzip     JSON compact compressé gzip
+#   json-zstd     JSON compact compressé zstd   (pip install zstandard)
+#   msgpack       MessagePack                   (pip install msgpack)
+#
+# Les formats JSON sont écrits tels quels, pour rester lisibles par les
+# anciennes versions de l'application. Les autres sont précédés d'un
+# en-tête b"BLDB1:<format>\n". À la lecture, le format est détecté :
+# un fichier JSON existant continue donc de fonctionner quel que soit
+# le réglage [storage] FORMAT.
+import gzip
+import time
+
+from backend import codec
+from backend.storage import StorageError
+
+FORMATS = ["json", "json-compact", "json-gzip", "json-zstd", "msgpack"]
+DEFAULT_FORMAT = "json"
+
+MAGIC = b"BLDB1:"
+_GZIP_MAGIC = b"\x1f\x8b"
+_ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+
+# Dernières mesures par format : taille (octets), encodage / décodage (ms)
+FORMAT_STATS = {}
+
+
+# ---------------------------------------------------------
+# 🔹 Dépendances optionnelles
+# ---------------------------------------------------------
+def _zstd():
+    try:
+        import zstandard
+    except ImportError:
+        raise StorageError("Format json-zstd : installer le paquet zstandard")
+    return zstandard
+
+
+def _msgpack():
+    try:
+        import msgpack
+    except ImportError:
+        raise StorageError("Format msgpack : installer le paquet msgpack")
+    return msgpack
+
+
+def available_formats():
+    out = []
+    for fmt in FORMATS:
+        try:
+            if fmt == "json-zstd":
+                _zstd()
+            elif fmt == "msgpack":
+                _msgpack()
+        except StorageError:
+            continue
+        out.append(fmt)
+    return out
+
+
+# ---------------------------------------------------------
+# 🔹 Encodage / décodage
+# ---------------------------------------------------------
+def _encode_body(doc, fmt) -> bytes:
+    if fmt == "json":
+        return codec.dumps(doc, indent=True)
+    if fmt == "json-compact":
+        return codec.dumps(doc)
+    if fmt == "json-gzip":
+        return gzip.compress(codec.dumps(doc), compresslevel=6, mtime=0)
+    if fmt == "json-zstd":
+        return _zstd().ZstdCompressor(level=3).compress(codec.dumps(doc))
+    if fmt == "msgpack":
+        return _msgpack().packb(doc, use_bin_type=True, default=codec.default)
+    raise StorageError(f"Format de stockage inconnu : {fmt}")
+
+
+def _decode_body(body: bytes, fmt):
+    if fmt in ("json", "json-compact"):
+        return codec.loads(body)
+    if fmt == "json-gzip":
+        return codec.loads(gzip.decompress(body))
+    if fmt == "json-zstd":
+        return codec.loads(_zstd().ZstdDecompressor().decompress(body))
+    if fmt == "msgpack":
+        return _msgpack().unpackb(body, raw=False, strict_map_key=False)
+    raise StorageError(f"Format de stockage inconnu : {fmt}")
+
+
+def detect_format(raw: bytes):
+    """Retourne (format, charge utile sans en-tête)."""
+    if raw.startswith(MAGIC):
+        header, _, body = raw.partition(b"\n")
+        return header[len(MAGIC):].decode("ascii").strip(), body
+    # Fichiers compressés sans en-tête (déposés à la main)
+    if raw.startswith(_GZIP_MAGIC):
+        return "json-gzip", raw
+    if raw.startswith(_ZSTD_MAGIC):
+        return "json-zstd", raw
+    return "json", raw
+
+
+def _record(fmt, **values):
+    FORMAT_STATS.setdefault(fmt, {}).update(values)
+
+
+def encode_document(doc, fmt=DEFAULT_FORMAT) -> bytes:
+    t0 = time.perf_counter()
+    body = _encode_body(doc, fmt)
+    raw = body if fmt in ("json", "json-compact") else MAGIC + fmt.encode("ascii") + b"\n" + body
+    _record(fmt, size=len(raw), encode_ms=(time.perf_counter() - t0) * 1000)
+    return raw
+
+
+def decode_document(raw: bytes):
+    """Décode un fichier quel que soit son format. Retourne (document, format)."""
+    t0 = time.perf_counter()
+    fmt, body = detect_format(raw)
+    doc = _decode_body(body, fmt)
+    _record(fmt, size=len(raw), decode_ms=(time.perf_counter() - t0) * 1000)
+    return doc, fmt
+
+
+def compare_formats(doc, repeat=3):
+    """
+    Mesure chaque format disponible sur le document réel :
+    taille, meilleur temps d'encodage et de décodage (ms).
+    """
+    rows = []
+    for fmt in available_formats():
+        enc, dec = [], []
+        for _ in range(repeat):
+            t0 = time.perf_counter()
+            raw = encode_document(doc, fmt)
+            enc.append(time.perf_counter() - t0)
+            t0 = time.perf_counter()
+            decode_document(raw)
+            dec.append(time.perf_counter() - t0)
+        rows.append({
+            "format": fmt,
+            "size": len(raw),
+            "encode_ms": round(min(enc) * 1000, 2),
+            "decode_ms": round(min(dec) * 1000, 2),
+        })
+    return rows
@@ -0,0 +1,147 @@
+# backend/journal.py
+# Journal des modifications (mode "journal" du stockage).
+#
+# Au lieu de réécrire tout database.json à chaque édition, chaque
+# enregistrement ajoute quelques lignes JSON à un fichier annexe :
+#   1re ligne : {"journal": 1, "base_rev": "<révision de database.json>"}
+#   puis      : {"ts": "...", "op": "set",    "key": "12937-1", "fields": {...}}
+#               {"ts": "...", "op": "delete", "key": "12937-1"}
+#               {"ts": "...", "op": "table",  "table": "visa", "value": [...]}
+# Les lecteurs rejouent le journal sur la base. Un journal dont base_rev ne
+# correspond plus à la base (compaction, écriture complète) est ignoré.
+from datetime import datetime
+
+from backend import codec
+from backend.merge import DOSSIER_KEY, dossier_key
+
+JOURNAL_VERSION = 1
+COMPACT_THRESHOLD_BYTES = 256 * 1024
+
+
+def journal_path_for(json_path: str) -> str:
+    """/Apps/x/database.json -> /Apps/x/database.journal.jsonl"""
+    if json_path.endswith(".json"):
+        return json_path[: -len(".json")] + ".journal.jsonl"
+    return json_path + ".journal.jsonl"
+
+
+def _dumps(obj) -> bytes:
+    return codec.dumps(obj) + b"\n"
+
+
+def journal_header(base_rev) -> bytes:
+    return _dumps({"journal": JOURNAL_VERSION, "base_rev": base_rev})
+
+
+def encode_patches(patches) -> bytes:
+    return b"".join(_dumps(p) for p in patches)
+
+
+def parse_journal(raw: bytes):
+    """Retourne (base_rev, patches). Les lignes illisibles sont ignorées."""
+    base_rev = None
+    patches = []
+    if not raw:
+        return base_rev, patches
+
+    lines = raw.splitlines()
+    for i, line in enumerate(lines):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            entry = codec.loads(line)
+        except Exception:
+            # Dernière ligne tronquée par une écriture interrompue
+            continue
+        if i == 0 and "journal" in entry:
+            base_rev = entry.get("base_rev")
+            continue
+        patches.append(entry)
+
+    return base_rev, patches
+
+
+def diff_database(old, new):
+    """
+    Liste des patchs faisant passer `old` à `new`.
+    Retourne None si la différence n'est pas exprimable en patchs
+    (dossiers sans numéro modifiés, numéros en double) : il faut alors
+    une écriture complète.
+    """
+    ts = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    patches = []
+
+    old_clients = old.get("clients", [])
+    new_clients = new.get("clients", [])
+
+    old_orphans = [c for c in old_clients if not dossier_key(c)]
+    new_orphans = [c for c in new_clients if not dossier_key(c)]
+    if old_orphans != new_orphans:
+        return None
+
+    old_idx = {dossier_key(c): c for c in old_clients if dossier_key(c)}
+    new_idx = {dossier_key(c): c for c in new_clients if dossier_key(c)}
+    # Numéro en double : un patch par numéro ne peut pas décrire les deux dossiers
+    if len(old_idx) + len(old_orphans) != len(old_clients):
+        return None
+    if len(new_idx) + len(new_orphans) != len(new_clients):
+        return None
+
+    for key, record in new_idx.items():
+        before = old_idx.get(key)
+        if before is None:
+            patches.append({"ts": ts, "op": "set", "key": key, "fields": dict(record)})
+            continue
+        changed = {f: v for f, v in record.items() if before.get(f) != v or f not in before}
+        if changed:
+            patches.append({"ts": ts, "op": "set", "key": key, "fields": changed})
+
+    for key in old_idx:
+        if key not in new_idx:
+            patches.append({"ts": ts, "op": "delete", "key": key})
+
+    for table in new.keys():
+        if table == "clients" or table.startswith("_"):
+            continue
+        if new.get(table) != old.get(table):
+            patches.append({"ts": ts, "op": "table", "table": table, "value": new.get(table)})
+
+    return patches
+
+
+def apply_journal(db, patches):
+    """
+    Rejoue les patchs sur une copie de `db` (la base n'est pas modifiée).
+    Un patch "set" de création porte le dossier complet (avec son numéro) ;
+    un patch partiel visant un dossier absent (supprimé entre-temps) est ignoré.
+    """
+    if not patches:
+        return db
+
+    out = dict(db)
+    clients = [dict(c) for c in db.get("clients", [])]
+    positions = {}
+    for i, c in enumerate(clients):
+        key = dossier_key(c)
+        if key and key not in positions:
+            positions[key] = i
+
+    for p in patches:
+        op = p.get("op")
+        if op == "set":
+            i = positions.get(p.get("key"))
+            if i is not None:
+                clients[i].update(p.get("fields", {}))
+            elif DOSSIER_KEY in p.get("fields", {}):
+                positions[p.get("key")] = len(clients)
+                clients.append(dict(p.get("fields", {})))
+        elif op == "delete":
+            i = positions.pop(p.get("key"), None)
+            if i is not None:
+                clients[i] = None
+        elif op == "table":
+            out[p.get("table")] = p.get("value")
+
+    out["clients"] = [c for c in clients if c is not None]
+    return out
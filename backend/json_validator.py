@@ -1,6 +1,8 @@
 import json
+import threading
 import pandas as pd
-from backend.dropbox_utils import load_database, save_database
+from backend.clean_json import clean_database
+from backend.dropbox_utils import REV_KEY, load_database, save_database
 
 REQUIRED_CLIENT_FIELDS = [
     "Dossier N", "Nom", "Date", "Categories", "Sous-categories", "Visa",
@@ -44,10 +46,35 @@ def analyse_incoherences(db):
     return alerts
 
 
-def validate_and_fix_json():
-    db = load_database()
+DATE_FIELDS = [
+    "Date", "Date envoi", "Date acceptation",
+    "Date refus", "Date annulation", "Date reclamation"
+]
+
+# Révisions déjà validées dans ce process : la validation ne tourne qu'une
+# fois par version de la base, pas à chaque rerun ni à chaque page
+_VALIDATED_REVS = set()
+_VALIDATED_LOCK = threading.Lock()
+
+
+def _is_valid_date(v, cache):
+    # Les mêmes dates reviennent dans beaucoup de dossiers : un seul parsing par valeur
+    ok = cache.get(v)
+    if ok is None:
+        try:
+            pd.to_datetime(v, errors="raise")
+            ok = True
+        except:
+            ok = False
+        cache[v] = ok
+    return ok
+
+
+def repair_database(db):
+    """Répare la base en mémoire. Retourne True si quelque chose a été corrigé."""
     clients = db.get("clients", [])
     fixed = False
+    date_cache = {}
 
     for c in clients:
 
@@ -61,20 +88,50 @@ def validate_and_fix_json():
                 fixed = True
 
         # 2️⃣ Correction des dates invalides (sans toucher aux dates valides)
-        for date_field in [
-            "Date", "Date envoi", "Date acceptation",
-            "Date refus", "Date annulation", "Date reclamation"
-        ]:
+        for date_field in DATE_FIELDS:
             v = c.get(date_field)
-            try:
-                if v not in [None, "", "None"]:
-                    pd.to_datetime(v, errors="raise")
-            except:
+            if v not in [None, "", "None"] and not _is_valid_date(v, date_cache):
                 c[date_field] = None
                 fixed = True
 
-    if fixed:
-        db["clients"] = clients
-        save_database(db)
-
     return fixed
+
+
+def boot_database():
+    """
+    Chargement de démarrage (main.py, Paramètres) en un seul aller-retour :
+    la base est chargée une fois, validée et réparée en mémoire, et
+    n'est renvoyée que si la réparation change réellement le document
+    enregistré (les champs hors schéma ajoutés ici sont retirés par
+    clean_database). Le résultat est le snapshot publié pour les pages.
+
+    Retourne (db, fixed).
+    """
+    db = load_database()
+    rev = db.get(REV_KEY)
+    with _VALIDATED_LOCK:
+        if rev is not None and rev in _VALIDATED_REVS:
+            return db, False
+
+    repaired = {k: [dict(c) for c in v] if k == "clients" else v for k, v in db.items()}
+    fixed = False
+    if repair_database(repaired):
+        cleaned = clean_database(repaired, reference=db)
+        fixed = cleaned["clients"] != db["clients"]
+        if fixed:
+            cleaned[REV_KEY] = rev
+            save_database(cleaned)
+            # save_database signale ses erreurs sans les lever : sans nouvelle
+            # révision, rien n'a été enregistré (réessayé au prochain démarrage)
+            if cleaned.get(REV_KEY) == rev:
+                return db, False
+            db, rev = cleaned, cleaned.get(REV_KEY)
+
+    with _VALIDATED_LOCK:
+        if rev is not None:
+            _VALIDATED_REVS.add(rev)
+    return db, fixed
+
+
+def validate_and_fix_json():
+    return boot_database()[1]
@@ -0,0 +1,288 @@
+# backend/kpi_store.py
+# Indicateurs du tableau de bord, tenus à jour à chaque enregistrement.
+#
+#   {"version": 1, "rev": "<révision de la base>", "kpis": {"dossiers": 812, ...}}
+#
+# Chaque dossier apporte une contribution additive (1 dossier, 0/1 accepté,
+# ses honoraires, ses acomptes...). À l'enregistrement, seuls les dossiers
+# modifiés sont pris en compte : on retire la contribution de l'ancienne
+# version et on ajoute celle de la nouvelle (en mémoire uniquement, pour ne
+# pas ajouter d'écriture à save_database). Le fichier, écrit à côté de
+# database.json à la première lecture des indicateurs d'une révision
+# (get_kpis), porte la révision de la base qu'il décrit : s'il ne
+# correspond pas à la base chargée (autre session, écriture interrompue),
+# les indicateurs sont recalculés en entier puis réenregistrés.
+#
+# Règles identiques à utils/clients_frame.py et utils/escrow_utils.py,
+# appliquées ici à des dossiers déjà nettoyés (bool / float).
+import threading
+from collections import OrderedDict
+
+from backend import codec
+from backend.storage import StorageError, StorageNotFound, get_storage, storage_config
+
+KPI_VERSION = 1
+
+KPI_FIELDS = [
+    "dossiers", "acceptes", "refuses", "annules",
+    "honoraires", "frais", "total_facture", "total_encaisse", "solde_du",
+    "escrow_actif", "escrow_a_reclamer",
+    "soldes", "non_soldes", "negatifs",
+]
+_MONEY_FIELDS = {
+    "honoraires", "frais", "total_facture", "total_encaisse", "solde_du",
+    "escrow_actif", "escrow_a_reclamer",
+}
+# Écart toléré entre valeurs tenues à jour et recalcul complet
+KPI_TOLERANCE = 0.005
+
+# Indicateurs par révision de la base (versions provisoires comprises)
+_KPIS = OrderedDict()
+_MAX_KPIS = 8
+_KPIS_LOCK = threading.Lock()
+# Révision enregistrée dont les indicateurs ne sont pas encore dans le fichier
+_UNPERSISTED = {"rev": None}
+
+
+def kpi_path():
+    json_path = storage_config()["json_path"]
+    default = (json_path[: -len(".json")] if json_path.endswith(".json") else json_path) + ".kpi.json"
+    return storage_config()["paths"].get("DROPBOX_KPI", default)
+
+
+# ---------------------------------------------------------
+# 🔹 Contribution d'un dossier
+# ---------------------------------------------------------
+def _float(v):
+    try:
+        return float(v or 0)
+    except Exception:
+        return 0.0
+
+
+def row_contribution(r):
+    """Contribution additive d'un dossier (dict nettoyé) à chaque indicateur."""
+    accepte = bool(r.get("Dossier accepte"))
+    refuse = bool(r.get("Dossier refuse"))
+    annule = bool(r.get("Dossier Annule"))
+    closed = accepte or refuse or annule
+
+    honoraires = _float(r.get("Montant honoraires (US $)"))
+    frais = _float(r.get("Autres frais (US $)"))
+    acomptes = sum(_float(r.get(f"Acompte {i}")) for i in range(1, 5))
+    solde = honoraires + frais - acomptes
+
+    reclame = bool(r.get("Escrow_reclame"))
+    return {
+        "dossiers": 1,
+        "acceptes": int(accepte),
+        "refuses": int(refuse),
+        "annules": int(annule),
+        "honoraires": honoraires,
+        "frais": frais,
+        "total_facture": honoraires + frais,
+        "total_encaisse": acomptes,
+        "solde_du": solde,
+        "escrow_actif": acomptes if not reclame and not closed else 0.0,
+        "escrow_a_reclamer": (
+            acomptes if not reclame and closed and bool(r.get("Escrow_a_reclamer")) else 0.0
+        ),
+        "soldes": int(solde <= 0),
+        "non_soldes": int(solde > 0),
+        "negatifs": int(solde < 0),
+    }
+
+
+def empty_kpis():
+    return {f: 0.0 if f in _MONEY_FIELDS else 0 for f in KPI_FIELDS}
+
+
+def _accumulate(kpis, rows, sign):
+    for r in rows:
+        for field, value in row_contribution(r).items():
+            kpis[field] += sign * value
+
+
+def _rounded(kpis):
+    # Les additions / soustractions successives accumulent des résidus flottants
+    return {f: round(v, 2) if f in _MONEY_FIELDS else v for f, v in kpis.items()}
+
+
+def compute_kpis(clients):
+    """Recalcul complet à partir des dossiers."""
+    kpis = empty_kpis()
+    _accumulate(kpis, (c for c in clients if isinstance(c, dict)), 1)
+    return _rounded(kpis)
+
+
+def _changed_rows(before, after):
+    """
+    (anciennes versions, nouvelles versions) des dossiers qui diffèrent.
+    Comparaison par position, puis par numéro de dossier pour les lignes
+    décalées (suppression, insertion au milieu).
+    """
+    removed, added = [], []
+    for i in range(max(len(before), len(after))):
+        old = before[i] if i < len(before) else None
+        new = after[i] if i < len(after) else None
+        if old == new:
+            continue
+        if isinstance(old, dict):
+            removed.append(old)
+        if isinstance(new, dict):
+            added.append(new)
+
+    by_key = {}
+    for r in removed:
+        by_key.setdefault(r.get("Dossier N"), []).append(r)
+    kept_added = []
+    for r in added:
+        same = by_key.get(r.get("Dossier N"), [])
+        if r in same:
+            same.remove(r)  # simple décalage : contribution inchangée
+        else:
+            kept_added.append(r)
+    return [r for rows in by_key.values() for r in rows], kept_added
+
+
+def apply_changes(kpis, before_clients, after_clients):
+    """Indicateurs de `after` à partir de ceux de `before` : seules les différences sont recalculées."""
+    removed, added = _changed_rows(before_clients, after_clients)
+    out = dict(kpis)
+    _accumulate(out, removed, -1)
+    _accumulate(out, added, 1)
+    return _rounded(out)
+
+
+# ---------------------------------------------------------
+# 🔹 Cache par révision + fichier persistant
+# ---------------------------------------------------------
+def _remember(rev, kpis):
+    with _KPIS_LOCK:
+        _KPIS[rev] = kpis
+        _KPIS.move_to_end(rev)
+        while len(_KPIS) > _MAX_KPIS:
+            _KPIS.popitem(last=False)
+
+
+def _cached(rev):
+    with _KPIS_LOCK:
+        return _KPIS.get(rev)
+
+
+def _read_persisted():
+    try:
+        _, raw = get_storage().read(kpi_path())
+    except StorageNotFound:
+        return None
+    doc = codec.loads(raw) if raw else {}
+    if doc.get("version") != KPI_VERSION:
+        return None
+    return doc
+
+
+def _persist(rev, kpis):
+    # Le fichier se décrit lui-même (révision de la base) : un fichier
+    # périmé est simplement ignoré à la lecture, pas besoin de compare-and-swap
+    doc = {"version": KPI_VERSION, "rev": rev, "kpis": kpis}
+    try:
+        get_storage().write(kpi_path(), codec.dumps(doc, indent=True), overwrite=True)
+    except StorageError:
+        pass
+
+
+def _is_durable(rev):
+    # "rev~n" : version publiée par l'écriture différée, pas encore sur le stockage
+    return rev is not None and "~" not in str(rev)
+
+
+def _persist_later(rev):
+    with _KPIS_LOCK:
+        _UNPERSISTED["rev"] = rev if _is_durable(rev) else _UNPERSISTED["rev"]
+
+
+def _persist_pending(rev, kpis):
+    """Écrit le fichier si `rev` a été enregistrée sans que ses indicateurs le soient."""
+    with _KPIS_LOCK:
+        if _UNPERSISTED["rev"] != rev:
+            return
+        _UNPERSISTED["rev"] = None
+    _persist(rev, kpis)
+
+
+def record_save(before_rev, before, after_rev, after):
+    """
+    Appelé après un enregistrement : `before` / `after` sont les documents
+    (nettoyés) avant et après. Mise à jour par différence si les indicateurs
+    de `before_rev` sont connus, recalcul complet sinon. Rien n'est écrit
+    ici : le fichier est mis à jour par get_kpis.
+    """
+    if after_rev is None or after is None:
+        return None
+    known = _cached(before_rev) if before_rev is not None else None
+    if known is not None and before is not None:
+        kpis = apply_changes(known, before.get("clients", []), after.get("clients", []))
+    else:
+        kpis = compute_kpis(after.get("clients", []))
+
+    _remember(after_rev, kpis)
+    _persist_later(after_rev)
+    return kpis
+
+
+def _db_rev(db):
+    # Import local : dropbox_utils importe ce module
+    from backend.dropbox_utils import REV_KEY
+
+    return db.get(REV_KEY)
+
+
+def get_kpis(db):
+    """
+    Indicateurs de la base chargée `db` : en mémoire ou lus dans le fichier
+    s'ils correspondent à sa révision, recalculés (et réenregistrés) sinon.
+    Les indicateurs tenus à jour par record_save sont écrits à leur première lecture.
+    """
+    rev = _db_rev(db)
+    kpis = _cached(rev) if rev is not None else None
+    if kpis is not None:
+        _persist_pending(rev, kpis)
+        return kpis
+
+    if _is_durable(rev):
+        try:
+            doc = _read_persisted()
+        except (StorageError, ValueError):
+            doc = None
+        if doc and doc.get("rev") == rev:
+            kpis = {**empty_kpis(), **doc.get("kpis", {})}
+            _remember(rev, kpis)
+            return kpis
+
+    kpis = compute_kpis(db.get("clients", []))
+    if rev is not None:
+        _remember(rev, kpis)
+        if _is_durable(rev):
+            _persist(rev, kpis)
+    return kpis
+
+
+def rebuild_kpis(db):
+    """
+    Vérification : recalcul complet, comparé aux indicateurs tenus à jour.
+    Retourne (indicateurs recalculés, {indicateur: (tenu à jour, recalculé)}
+    pour les écarts). Les valeurs recalculées remplacent les anciennes.
+    """
+    rev = _db_rev(db)
+    stored = get_kpis(db)
+    fresh = compute_kpis(db.get("clients", []))
+    diffs = {
+        f: (stored.get(f), fresh[f])
+        for f in KPI_FIELDS
+        if abs((stored.get(f) or 0) - fresh[f]) > KPI_TOLERANCE
+    }
+    if rev is not None:
+        _remember(rev, fresh)
+        if _is_durable(rev):
+            _persist(rev, fresh)
+    return fresh, diffs
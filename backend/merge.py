@@ -0,0 +1,156 @@
+# backend/merge.py
+# Fusion à trois voies (base / locale / distante) de la base JSON.
+# Utilisée quand Dropbox refuse un enregistrement parce que le fichier a
+# changé depuis le chargement : on fusionne dossier par dossier sur « Dossier N ».
+
+DOSSIER_KEY = "Dossier N"
+
+
+def dossier_key(record) -> str:
+    v = record.get(DOSSIER_KEY) if isinstance(record, dict) else None
+    return "" if v is None else str(v).strip()
+
+
+def _index(records):
+    """
+    {(numéro, rang) : dossier}. Un numéro en double (saisie, import) garde
+    toutes ses occurrences : la n-ième d'un côté est fusionnée avec la
+    n-ième de l'autre.
+    """
+    out = {}
+    seen = {}
+    for r in records or []:
+        k = dossier_key(r)
+        if k:
+            n = seen.get(k, 0)
+            seen[k] = n + 1
+            out[(k, n)] = r
+    return out
+
+
+def _label(key) -> str:
+    """Numéro affiché pour un conflit ("12937-1", ou "12937-1 (2e)" pour un doublon)."""
+    k, n = key
+    return k if n == 0 else f"{k} ({n + 1}e)"
+
+
+def _merge_record(base, local, remote):
+    """
+    Fusion champ par champ d'un dossier modifié des deux côtés.
+    Si un même champ a été modifié des deux côtés, la version locale gagne.
+    """
+    merged = {}
+    conflict = False
+    for field in list(remote.keys()) + [f for f in local.keys() if f not in remote]:
+        b = base.get(field)
+        l = local.get(field)
+        r = remote.get(field)
+        if l == b:
+            merged[field] = r if field in remote else l
+        elif r == b or l == r:
+            merged[field] = l
+        else:
+            merged[field] = l
+            conflict = True
+    return merged, conflict
+
+
+def merge_clients(base, local, remote):
+    """
+    Retourne (clients fusionnés, liste des dossiers en conflit).
+
+    - dossier inchangé localement          -> version distante (y compris suppression)
+    - dossier inchangé à distance          -> version locale (y compris suppression)
+    - modifié des deux côtés               -> fusion champ par champ
+    - supprimé d'un côté, modifié de l'autre -> la modification est conservée
+    """
+    b_idx = _index(base)
+    l_idx = _index(local)
+    r_idx = _index(remote)
+
+    conflicts = []
+    merged = {}
+
+    for k in list(r_idx.keys()) + [k for k in l_idx.keys() if k not in r_idx]:
+        b = b_idx.get(k)
+        l = l_idx.get(k)
+        r = r_idx.get(k)
+
+        if l == b:
+            result = r
+        elif r == b:
+            result = l
+        elif l is None:
+            result = r
+        elif r is None:
+            result = l
+        elif b is None:
+            # Créé des deux côtés avec le même numéro
+            result, conflict = _merge_record({}, l, r)
+            if conflict:
+                conflicts.append(_label(k))
+        else:
+            result, conflict = _merge_record(b, l, r)
+            if conflict:
+                conflicts.append(_label(k))
+
+        if result is not None:
+            merged[k] = result
+
+    # Dossiers sans numéro : pas de clé de fusion. On garde ceux de la version
+    # locale, plus ceux créés à distance (absents de la base et de la version locale)
+    base_orphans = [r for r in base or [] if not dossier_key(r)]
+    orphans = [r for r in local or [] if not dossier_key(r)]
+    orphans += [
+        r for r in remote or []
+        if not dossier_key(r) and r not in base_orphans and r not in orphans
+    ]
+
+    return list(merged.values()) + orphans, conflicts
+
+
+def _merge_list(base, local, remote):
+    """Retourne (table fusionnée, conflit)."""
+    if local == base or local == remote:
+        return remote, False
+    if remote == base:
+        return local, False
+
+    # Tables en ajout seul (historiques) : on garde les deux séries d'ajouts
+    n = len(base)
+    if local[:n] == base and remote[:n] == base:
+        return base + remote[n:] + [x for x in local[n:] if x not in remote[n:]], False
+
+    # Modifiée des deux côtés : la version locale gagne, le conflit est signalé
+    return local, True
+
+
+def merge_databases(base, local, remote):
+    """
+    Fusionne trois versions nettoyées de la base. `base` (version dont est
+    partie la modification locale) est obligatoire : sans elle, impossible
+    de distinguer une modification distante d'un retour en arrière local.
+    Retourne (base fusionnée, conflits : numéros de dossier et tables).
+    """
+    if base is None:
+        raise ValueError("Fusion impossible sans version de départ")
+
+    clients, conflicts = merge_clients(
+        base.get("clients", []),
+        local.get("clients", []),
+        remote.get("clients", []),
+    )
+
+    merged = {"clients": clients}
+    for key in sorted(set(local.keys()) | set(remote.keys())):
+        if key == "clients" or key.startswith("_"):
+            continue
+        merged[key], conflict = _merge_list(
+            base.get(key, []) or [],
+            local.get(key, []) or [],
+            remote.get(key, []) or [],
+        )
+        if conflict:
+            conflicts.append(f"table {key}")
+
+    return merged, conflicts
@@ -0,0 +1,86 @@
+# backend/sequences.py
+# Compteurs de numéros de dossier, stockés à côté de database.json.
+#
+#   {"version": 1, "parent": 13071, "children": {"12937": 3, ...}}
+#
+# « parent » est le dernier numéro parent attribué, « children » le dernier
+# suffixe attribué par parent. Chaque attribution relit le fichier et le
+# réécrit en WriteMode.update(rev) : deux sessions qui créent un dossier en
+# même temps ne peuvent pas obtenir le même numéro (la seconde relit et
+# passe au suivant). On peut réserver un bloc de numéros en une écriture.
+from backend import codec
+from backend.storage import StorageConflict, StorageNotFound, get_storage, storage_config
+
+SEQUENCES_VERSION = 1
+ALLOCATE_MAX_ATTEMPTS = 8
+
+
+def sequences_path():
+    json_path = storage_config()["json_path"]
+    default = (json_path[: -len(".json")] if json_path.endswith(".json") else json_path) + ".sequences.json"
+    return storage_config()["paths"].get("DROPBOX_SEQUENCES", default)
+
+
+def _read(store):
+    """Retourne (révision ou None si absent, compteurs)."""
+    try:
+        meta, raw = store.read(sequences_path())
+    except StorageNotFound:
+        return None, {"version": SEQUENCES_VERSION, "parent": 0, "children": {}}
+    doc = codec.loads(raw) if raw else {}
+    doc.setdefault("version", SEQUENCES_VERSION)
+    doc.setdefault("parent", 0)
+    doc.setdefault("children", {})
+    return meta.rev, doc
+
+
+def _allocate(advance):
+    """
+    advance(compteurs) modifie les compteurs et retourne les numéros attribués.
+    Compare-and-swap sur la révision du fichier, rejoué en cas de conflit.
+    """
+    store = get_storage()
+    for _ in range(ALLOCATE_MAX_ATTEMPTS):
+        rev, doc = _read(store)
+        allocated = advance(doc)
+        try:
+            # Sans révision : création ("add"), refusée si le fichier vient d'apparaître
+            store.write(sequences_path(), codec.dumps(doc, indent=True), rev)
+            return allocated
+        except StorageConflict:
+            continue
+    raise StorageConflict("Attribution de numéro impossible : trop d'écritures simultanées")
+
+
+def allocate_parent_numbers(count=1, floor=0):
+    """
+    Réserve `count` numéros parents consécutifs.
+    floor : plus grand numéro déjà présent dans la base (les compteurs ne
+            redescendent jamais en dessous, même si le fichier est neuf).
+    """
+    def advance(doc):
+        start = max(int(doc["parent"]), int(floor)) + 1
+        doc["parent"] = start + count - 1
+        return list(range(start, start + count))
+
+    return _allocate(advance)
+
+
+def allocate_child_suffixes(parent, count=1, floor=0):
+    """Réserve `count` suffixes consécutifs pour le parent (floor : plus grand suffixe existant)."""
+    key = str(int(parent))
+
+    def advance(doc):
+        start = max(int(doc["children"].get(key, 0)), int(floor)) + 1
+        doc["children"][key] = start + count - 1
+        return list(range(start, start + count))
+
+    return _allocate(advance)
+
+
+def allocate_parent_number(floor=0):
+    return allocate_parent_numbers(1, floor)[0]
+
+
+def allocate_child_number(parent, floor=0):
+    return f"{int(parent)}-{allocate_child_suffixes(parent, 1, floor)[0]}"
@@ -0,0 +1,474 @@
+# backend/storage.py
+# Couche de stockage interchangeable : Dropbox (production) ou dossier local
+# (copie de travail, benchmarks). Le choix se fait dans secrets.toml :
+#
+#   [storage]
+#   BACKEND = "local"            # "dropbox" par défaut
+#   LOCAL_ROOT = "/data/berenbaum"
+#
+# ou par variables d'environnement (prioritaires) :
+#   BERENBAUM_STORAGE=local  BERENBAUM_LOCAL_ROOT=/data/berenbaum
+#
+# Rien n'est lu dans st.secrets à l'import : la configuration est résolue
+# au premier accès au stockage.
+import hashlib
+import mmap
+import os
+import shutil
+import threading
+import time
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from datetime import datetime
+
+import dropbox
+import streamlit as st
+
+try:
+    import fcntl
+except ImportError:  # Windows : verrou intra-process uniquement
+    fcntl = None
+
+
+class StorageError(Exception):
+    pass
+
+
+class StorageConflict(StorageError):
+    """Le fichier a changé depuis la révision fournie."""
+
+
+class StorageNotFound(StorageError):
+    pass
+
+
+class FileMeta:
+    def __init__(self, path, rev, content_hash=None, size=0, modified=None):
+        self.path = path
+        self.rev = rev
+        self.content_hash = content_hash
+        self.size = size
+        self.modified = modified
+
+    def __repr__(self):
+        return f"FileMeta({self.path!r}, rev={self.rev!r}, size={self.size})"
+
+
+class StorageBackend(ABC):
+    """
+    Interface commune.
+    - read(path)            -> (FileMeta, bytes)       | StorageNotFound
+    - metadata(path)        -> FileMeta ou None        (appel léger)
+    - write(path, payload, rev=None, overwrite=False) -> FileMeta
+          rev fourni    : écrit seulement si la révision courante est `rev`
+          rev absent    : crée le fichier, ou l'écrase si overwrite=True
+          sinon         : StorageConflict
+    - list_versions(path, limit) -> [FileMeta], plus récente d'abord
+    - read_version(path, rev)   -> (FileMeta, bytes) d'une révision précise
+                                   (courante ou archivée) | StorageNotFound
+    """
+
+    name = "abstract"
+
+    @abstractmethod
+    def read(self, path):
+        ...
+
+    @abstractmethod
+    def metadata(self, path):
+        ...
+
+    @abstractmethod
+    def write(self, path, payload: bytes, rev=None, overwrite=False):
+        ...
+
+    @abstractmethod
+    def list_versions(self, path, limit=10):
+        ...
+
+    @abstractmethod
+    def read_version(self, path, rev):
+        ...
+
+
+# ---------------------------------------------------------
+# 🔹 Gestion du token Dropbox (réutilisation + client unique)
+# ---------------------------------------------------------
+class DropboxTokenManager:
+    """
+    Conserve le token d'accès et son expiration.
+    Le rafraîchissement (POST oauth2/token) n'a lieu qu'à l'approche de
+    l'expiration ; entre-temps le même client Dropbox (session HTTP
+    poolée) est servi à toutes les pages.
+    """
+
+    TOKEN_URL = "https://api.dropbox.com/oauth2/token"
+    REFRESH_MARGIN = 300  # secondes avant expiration
+    DEFAULT_TTL = 4 * 3600  # durée Dropbox habituelle si non fournie
+
+    def __init__(self, app_key, app_secret, refresh_token, max_connections=8):
+        self.app_key = app_key
+        self.app_secret = app_secret
+        self.refresh_token = refresh_token
+        self.max_connections = max_connections
+
+        self._lock = threading.Lock()
+        self._access_token = None
+        self._expires_at = 0.0
+        self._client = None
+        self._session = None
+
+        self.refresh_count = 0
+        self.refresh_avoided = 0
+
+    def _needs_refresh(self):
+        return (
+            self._client is None
+            or time.monotonic() >= self._expires_at - self.REFRESH_MARGIN
+        )
+
+    def _http_session(self):
+        if self._session is None:
+            self._session = dropbox.create_session(max_connections=self.max_connections)
+        return self._session
+
+    def _refresh(self):
+        resp = self._http_session().post(
+            self.TOKEN_URL,
+            data={
+                "refresh_token": self.refresh_token,
+                "client_id": self.app_key,
+                "client_secret": self.app_secret,
+                "grant_type": "refresh_token",
+            },
+            timeout=30,
+        )
+        payload = resp.json()
+        token = payload.get("access_token")
+        if not token:
+            raise Exception("❌ Impossible de générer un token Dropbox.")
+
+        ttl = float(payload.get("expires_in") or self.DEFAULT_TTL)
+        self._access_token = token
+        self._expires_at = time.monotonic() + ttl
+        self._client = dropbox.Dropbox(token, session=self._http_session())
+        self.refresh_count += 1
+
+    def get_client(self):
+        with self._lock:
+            if self._needs_refresh():
+                self._refresh()
+            else:
+                self.refresh_avoided += 1
+            return self._client
+
+    def invalidate(self):
+        """À appeler si Dropbox rejette le token (révocation, expiration anticipée)."""
+        with self._lock:
+            self._client = None
+            self._expires_at = 0.0
+
+    def stats(self):
+        with self._lock:
+            remaining = max(0.0, self._expires_at - time.monotonic()) if self._client else 0.0
+            return {
+                "refresh_count": self.refresh_count,
+                "refresh_avoided": self.refresh_avoided,
+                "expires_in": round(remaining),
+            }
+
+
+# ---------------------------------------------------------
+# 🔹 Backend Dropbox
+# ---------------------------------------------------------
+def _path_error(error):
+    if not isinstance(error, dropbox.exceptions.ApiError):
+        return None
+    err = error.error
+    if hasattr(err, "is_path") and err.is_path():
+        return err.get_path()
+    return None
+
+
+class DropboxBackend(StorageBackend):
+    name = "dropbox"
+
+    def __init__(self, token_manager: DropboxTokenManager):
+        self.tokens = token_manager
+
+    def _client(self):
+        return self.tokens.get_client()
+
+    @staticmethod
+    def _meta(m):
+        return FileMeta(
+            getattr(m, "path_display", None),
+            m.rev,
+            getattr(m, "content_hash", None),
+            getattr(m, "size", 0),
+            getattr(m, "server_modified", None),
+        )
+
+    def _call(self, fn, *args, **kwargs):
+        try:
+            return fn(*args, **kwargs)
+        except dropbox.exceptions.AuthError:
+            self.tokens.invalidate()
+            raise
+        except dropbox.exceptions.ApiError as e:
+            perr = _path_error(e)
+            if perr is not None:
+                reason = perr.reason if hasattr(perr, "reason") else perr
+                if hasattr(reason, "is_conflict") and reason.is_conflict():
+                    raise StorageConflict(str(e)) from e
+                if hasattr(perr, "is_not_found") and perr.is_not_found():
+                    raise StorageNotFound(str(e)) from e
+            raise
+
+    def read(self, path):
+        metadata, res = self._call(self._client().files_download, path)
+        return self._meta(metadata), res.content
+
+    def metadata(self, path):
+        try:
+            return self._meta(self._call(self._client().files_get_metadata, path))
+        except StorageNotFound:
+            return None
+
+    def write(self, path, payload: bytes, rev=None, overwrite=False):
+        if rev:
+            mode = dropbox.files.WriteMode.update(rev)
+        elif overwrite:
+            mode = dropbox.files.WriteMode("overwrite")
+        else:
+            mode = dropbox.files.WriteMode("add")
+        return self._meta(self._call(self._client().files_upload, payload, path, mode=mode))
+
+    def list_versions(self, path, limit=10):
+        res = self._call(self._client().files_list_revisions, path, limit=limit)
+        return [self._meta(e) for e in res.entries]
+
+    def read_version(self, path, rev):
+        metadata, res = self._call(self._client().files_download, path, rev=rev)
+        return self._meta(metadata), res.content
+
+
+# ---------------------------------------------------------
+# 🔹 Backend dossier local
+# ---------------------------------------------------------
+class LocalBackend(StorageBackend):
+    """
+    Les chemins Dropbox ("/Apps/berenbaum-law/database.json") sont
+    résolus sous `root`. Écriture atomique (fichier temporaire + os.replace),
+    lecture par mmap, anciennes versions conservées dans `.versions/`.
+    La révision change à chaque écriture (inode + mtime_ns).
+    """
+
+    name = "local"
+
+    def __init__(self, root, keep_versions=10):
+        self.root = os.path.abspath(root)
+        self.keep_versions = keep_versions
+        self._lock = threading.Lock()
+        os.makedirs(self.root, exist_ok=True)
+
+    def _abs(self, path):
+        return os.path.join(self.root, str(path).lstrip("/"))
+
+    def _versions_dir(self, path):
+        rel = str(path).lstrip("/").replace("/", "__")
+        return os.path.join(self.root, ".versions", rel)
+
+    @staticmethod
+    def _rev(st_result):
+        return f"{st_result.st_ino:x}{st_result.st_mtime_ns:x}"
+
+    def _meta_from_stat(self, path, st_result, content_hash=None):
+        return FileMeta(
+            path,
+            self._rev(st_result),
+            content_hash,
+            st_result.st_size,
+            datetime.fromtimestamp(st_result.st_mtime),
+        )
+
+    def read(self, path):
+        p = self._abs(path)
+        try:
+            with open(p, "rb") as f:
+                st_result = os.fstat(f.fileno())
+                if st_result.st_size == 0:
+                    payload = b""
+                else:
+                    with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+                        payload = m[:]
+        except FileNotFoundError as e:
+            raise StorageNotFound(p) from e
+        return self._meta_from_stat(path, st_result), payload
+
+    def metadata(self, path):
+        try:
+            return self._meta_from_stat(path, os.stat(self._abs(path)))
+        except FileNotFoundError:
+            return None
+
+    @contextmanager
+    def _locked(self, path):
+        """Verrou inter-processus (fichier .lock) autour du test-and-set de révision."""
+        with self._lock:
+            if fcntl is None:
+                yield
+                return
+            lock_path = self._abs(path) + ".lock"
+            with open(lock_path, "a+") as fh:
+                fcntl.flock(fh, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(fh, fcntl.LOCK_UN)
+
+    def _archive(self, path, p, current):
+        if not self.keep_versions:
+            return
+        vdir = self._versions_dir(path)
+        os.makedirs(vdir, exist_ok=True)
+        target = os.path.join(vdir, f"{current.st_mtime_ns:020d}_{self._rev(current)}")
+        try:
+            os.link(p, target)
+        except OSError:
+            shutil.copy2(p, target)
+
+        archived = sorted(os.listdir(vdir))
+        for old in archived[: max(0, len(archived) - self.keep_versions)]:
+            os.remove(os.path.join(vdir, old))
+
+    def write(self, path, payload: bytes, rev=None, overwrite=False):
+        p = self._abs(path)
+        os.makedirs(os.path.dirname(p), exist_ok=True)
+
+        with self._locked(path):
+            try:
+                current = os.stat(p)
+            except FileNotFoundError:
+                current = None
+
+            if rev:
+                if current is None or self._rev(current) != rev:
+                    raise StorageConflict(f"{path} : révision {rev} périmée")
+            elif current is not None and not overwrite:
+                raise StorageConflict(f"{path} existe déjà")
+
+            tmp = f"{p}.tmp-{os.getpid()}-{threading.get_ident()}"
+            with open(tmp, "wb") as f:
+                f.write(payload)
+                f.flush()
+                os.fsync(f.fileno())
+
+            if current is not None:
+                self._archive(path, p, current)
+            os.replace(tmp, p)
+
+            return self._meta_from_stat(
+                path, os.stat(p), hashlib.sha256(payload).hexdigest()
+            )
+
+    def list_versions(self, path, limit=10):
+        versions = []
+        current = self.metadata(path)
+        if current is not None:
+            versions.append(current)
+
+        vdir = self._versions_dir(path)
+        if os.path.isdir(vdir):
+            for name in sorted(os.listdir(vdir), reverse=True):
+                full = os.path.join(vdir, name)
+                st_result = os.stat(full)
+                rev = name.split("_", 1)[1] if "_" in name else name
+                versions.append(FileMeta(
+                    full, rev, None, st_result.st_size,
+                    datetime.fromtimestamp(st_result.st_mtime),
+                ))
+
+        return versions[:limit]
+
+    def read_version(self, path, rev):
+        current = self.metadata(path)
+        if current is not None and current.rev == rev:
+            return self.read(path)
+        vdir = self._versions_dir(path)
+        names = os.listdir(vdir) if os.path.isdir(vdir) else []
+        for name in names:
+            if name.endswith(f"_{rev}"):
+                full = os.path.join(vdir, name)
+                with open(full, "rb") as f:
+                    payload = f.read()
+                st_result = os.stat(full)
+                return FileMeta(path, rev, None, st_result.st_size, datetime.fromtimestamp(st_result.st_mtime)), payload
+        raise StorageNotFound(f"{path} : révision {rev} introuvable")
+
+
+# ---------------------------------------------------------
+# 🔹 Configuration (résolue au premier accès)
+# ---------------------------------------------------------
+_CONFIG = None
+_BACKEND = None
+_TOKEN_MANAGER = None
+_INIT_LOCK = threading.Lock()
+
+
+def _secrets_section(name):
+    try:
+        return dict(st.secrets.get(name, {}))
+    except Exception:
+        return {}
+
+
+def storage_config():
+    """Paramètres de stockage : secrets.toml, surchargés par l'environnement."""
+    global _CONFIG
+    if _CONFIG is None:
+        storage = _secrets_section("storage")
+        paths = _secrets_section("paths")
+        _CONFIG = {
+            "backend": os.environ.get("BERENBAUM_STORAGE", storage.get("BACKEND", "dropbox")).lower(),
+            "local_root": os.environ.get("BERENBAUM_LOCAL_ROOT", storage.get("LOCAL_ROOT", "./local_data")),
+            "keep_versions": int(storage.get("KEEP_VERSIONS", 10)),
+            "json_path": paths.get("DROPBOX_JSON", "/Apps/berenbaum-law/database.json"),
+            "storage": storage,
+            "paths": paths,
+        }
+    return _CONFIG
+
+
+def get_token_manager():
+    global _TOKEN_MANAGER
+    with _INIT_LOCK:
+        if _TOKEN_MANAGER is None:
+            creds = st.secrets["dropbox"]
+            _TOKEN_MANAGER = DropboxTokenManager(
+                creds["APP_KEY"], creds["APP_SECRET"], creds["DROPBOX_TOKEN"]
+            )
+        return _TOKEN_MANAGER
+
+
+def get_storage() -> StorageBackend:
+    global _BACKEND
+    if _BACKEND is None:
+        cfg = storage_config()
+        if cfg["backend"] == "local":
+            backend = LocalBackend(cfg["local_root"], cfg["keep_versions"])
+        elif cfg["backend"] == "dropbox":
+            backend = DropboxBackend(get_token_manager())
+        else:
+            raise StorageError(f"Backend de stockage inconnu : {cfg['backend']}")
+        with _INIT_LOCK:
+            if _BACKEND is None:
+                _BACKEND = backend
+    return _BACKEND
+
+
+def set_storage(backend: StorageBackend):
+    """Remplace le backend courant (benchmarks, scripts de migration)."""
+    global _BACKEND
+    with _INIT_LOCK:
+        _BACKEND = backend
@@ -0,0 +1,199 @@
+# backend/write_behind.py
+# File d'écriture différée ("write-behind").
+#
+# save_database() rend la main immédiatement : le document est confié à un
+# thread de fond qui n'envoie que la DERNIÈRE version après une courte
+# période de calme. Une rafale de clics (page Escrow...) ne coûte donc
+# qu'un seul upload. L'état est exposé pour l'interface (status()) : le
+# thread de fond n'a pas accès à st.warning / st.error, les erreurs et les
+# conflits de fusion y sont donc conservés jusqu'à leur affichage.
+import atexit
+import threading
+import time
+from datetime import datetime
+
+
+def _now():
+    return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+
+class WriteBehindQueue:
+    """
+    save_fn(doc)                 -> résultat (exécuté dans le thread de fond)
+    rebase_fn(sent, pending, res) -> nouveau document en attente, appelé quand
+                                    d'autres enregistrements sont arrivés
+                                    pendant l'upload de `sent`
+    """
+
+    def __init__(self, save_fn, rebase_fn=None, delay=0.5, max_delay=5.0, retry_delay=5.0):
+        self.save_fn = save_fn
+        self.rebase_fn = rebase_fn
+        self.delay = delay
+        self.max_delay = max_delay
+        self.retry_delay = retry_delay
+
+        self._cond = threading.Condition()
+        self._doc = None
+        self._seq = 0
+        self._saved_seq = 0
+        self._first_dirty = None
+        self._last_submit = None
+        self._saving = False
+        self._stopped = False
+        self._retry_at = 0.0
+
+        self.saves = 0
+        self.coalesced = 0
+        self.last_saved_at = None
+        self.last_error = None
+        self.last_error_at = None
+        self.conflicts = []
+        self.conflicts_at = None
+
+        self._thread = threading.Thread(target=self._run, name="write-behind", daemon=True)
+        self._thread.start()
+        atexit.register(self.stop)
+
+    # -----------------------------------------------------
+    # Côté pages
+    # -----------------------------------------------------
+    def update(self, fn):
+        """
+        Remplace le document en attente par fn(document_en_attente | None).
+        Retourne le numéro de soumission.
+        """
+        with self._cond:
+            if self._doc is not None:
+                self.coalesced += 1
+            self._doc = fn(self._doc)
+            self._seq += 1
+            now = time.monotonic()
+            self._last_submit = now
+            if self._first_dirty is None:
+                self._first_dirty = now
+            self._cond.notify_all()
+            return self._seq
+
+    def submit(self, doc):
+        return self.update(lambda _: doc)
+
+    def pending(self):
+        with self._cond:
+            return self._doc
+
+    def dirty(self):
+        with self._cond:
+            return self._doc is not None or self._saving
+
+    def flush(self, timeout=None):
+        """Attend que tout ce qui a été soumis soit écrit. True si c'est le cas."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            target = self._seq
+            # On ne fait plus attendre le délai de coalescence
+            self._first_dirty = 0.0 if self._doc is not None else self._first_dirty
+            self._cond.notify_all()
+            while self._saved_seq < target and not self._stopped:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+            return self._saved_seq >= target
+
+    def stop(self, timeout=30):
+        """Vidange à l'arrêt du process."""
+        self.flush(timeout)
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
+
+    def record_conflicts(self, conflicts):
+        """Dossiers en conflit lors d'une fusion faite par le thread de fond."""
+        if not conflicts:
+            return
+        with self._cond:
+            self.conflicts += [c for c in conflicts if c not in self.conflicts]
+            self.conflicts_at = _now()
+
+    def clear_conflicts(self):
+        """Conflits vus par l'utilisateur : on ne les affiche plus."""
+        with self._cond:
+            self.conflicts = []
+            self.conflicts_at = None
+
+    def status(self):
+        with self._cond:
+            if self.last_error and self._doc is not None:
+                state = "error"
+            elif self._saving:
+                state = "saving"
+            elif self._doc is not None:
+                state = "pending"
+            else:
+                state = "saved"
+            return {
+                "state": state,
+                "pending_seq": self._seq,
+                "saved_seq": self._saved_seq,
+                "saves": self.saves,
+                "coalesced": self.coalesced,
+                "last_saved_at": self.last_saved_at,
+                "last_error": self.last_error,
+                "last_error_at": self.last_error_at,
+                "conflicts": list(self.conflicts),
+                "conflicts_at": self.conflicts_at,
+            }
+
+    # -----------------------------------------------------
+    # Thread de fond
+    # -----------------------------------------------------
+    def _ready(self, now):
+        if self._doc is None or now < self._retry_at:
+            return False
+        if now - self._last_submit >= self.delay:
+            return True
+        return now - self._first_dirty >= self.max_delay
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._stopped and not self._ready(time.monotonic()):
+                    self._cond.wait(None if self._doc is None else 0.05)
+                if self._stopped and self._doc is None:
+                    return
+                if self._doc is None:
+                    continue
+
+                doc, seq = self._doc, self._seq
+                self._saving = True
+
+            try:
+                result = self.save_fn(doc)
+                error = None
+            except Exception as e:  # on garde le document et on réessaie
+                result, error = None, e
+
+            with self._cond:
+                self._saving = False
+                if error is not None:
+                    self.last_error = f"{type(error).__name__}: {error}"
+                    self.last_error_at = _now()
+                    self._retry_at = time.monotonic() + self.retry_delay
+                    self._cond.notify_all()
+                    if self._stopped:
+                        return
+                    continue
+
+                self.saves += 1
+                self.last_error = None
+                self.last_error_at = None
+                self.last_saved_at = _now()
+
+                if self._seq == seq:
+                    self._doc = None
+                    self._first_dirty = None
+                elif self.rebase_fn is not None:
+                    self._doc = self.rebase_fn(doc, self._doc, result)
+
+                self._saved_seq = seq
+                self._cond.notify_all()
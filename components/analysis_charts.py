@@ -15,6 +15,29 @@ def _coerce_float(series: pd.Series) -> pd.Series:
     return pd.to_numeric(series, errors="coerce").fillna(0.0)
 
 
+def _aggregated(df: pd.DataFrame) -> bool:
+    """Tranche du cube d'analyse (utils/analysis_cube.py) plutôt que dossiers bruts."""
+    return "Dossiers" in df.columns and "Dossier N" not in df.columns
+
+
+def _count_by(df: pd.DataFrame, cols) -> pd.DataFrame:
+    """Nombre de dossiers par groupe : lignes comptées, ou somme de « Dossiers » pour le cube."""
+    if _aggregated(df):
+        return df.groupby(cols)["Dossiers"].sum().reset_index()
+    return df.groupby(cols).size().reset_index(name="Dossiers")
+
+
+def _year_month(df: pd.DataFrame) -> pd.DataFrame:
+    """Dossiers datés avec colonnes Année / MoisNum (dossiers bruts ou cube)."""
+    if _aggregated(df):
+        return df[df["Année"] > 0]
+    df = _ensure_datetime(df, "Date")
+    df = df[df["Date"].notna()].copy()
+    df["Année"] = df["Date"].dt.year
+    df["MoisNum"] = df["Date"].dt.month
+    return df
+
+
 def _infer_period_col(df: pd.DataFrame) -> Optional[str]:
     for c in ["Periode", "Période", "Mois", "Trimestre", "Semestre", "Année", "Annee", "Year", "Month"]:
         if c in df.columns:
@@ -88,6 +111,9 @@ def monthly_hist(df: pd.DataFrame, period_type: str = "Mois"):
                 df["Dossiers"] = 0
         g = df[[xcol, "Dossiers"]].copy()
         g = g.dropna(subset=[xcol])
+        g = g[g[xcol] != ""]
+        # Cube : plusieurs lignes par période
+        g = g.groupby(xcol, as_index=False)["Dossiers"].sum()
 
     fig = px.bar(g.sort_values(xcol), x=xcol, y="Dossiers", title="📅 Dossiers par période")
     fig.update_layout(xaxis_title="Période", yaxis_title="Nombre de dossiers")
@@ -98,23 +124,19 @@ def multi_year_line(df: pd.DataFrame, years: Optional[List[int]] = None):
     if df is None or df.empty:
         return _empty_fig("📈 Courbes multi-années — aucune donnée")
 
-    if "Date" not in df.columns:
+    if "Date" not in df.columns and not _aggregated(df):
         return _empty_fig("📈 Courbes multi-années — colonne 'Date' introuvable")
 
-    df = _ensure_datetime(df, "Date")
-    df = df[df["Date"].notna()].copy()
+    df = _year_month(df)
     if df.empty:
         return _empty_fig("📈 Courbes multi-années — aucune date valide")
 
-    df["Année"] = df["Date"].dt.year
-    df["MoisNum"] = df["Date"].dt.month
-
     if years:
         df = df[df["Année"].isin(years)].copy()
         if df.empty:
             return _empty_fig("📈 Courbes multi-années — aucune donnée pour ces années")
 
-    g = df.groupby(["Année", "MoisNum"]).size().reset_index(name="Dossiers")
+    g = _count_by(df, ["Année", "MoisNum"])
     g = g.sort_values(["Année", "MoisNum"])
 
     fig = px.line(
@@ -144,8 +166,8 @@ def category_donut(df: pd.DataFrame):
     if "Categories" not in df.columns:
         return _empty_fig("🎯 Répartition catégories — colonne introuvable")
 
-    g = df["Categories"].fillna("").replace("", "Non renseigné").value_counts().reset_index()
-    g.columns = ["Catégorie", "Dossiers"]
+    d = df.assign(Catégorie=df["Categories"].fillna("").replace("", "Non renseigné"))
+    g = _count_by(d, "Catégorie").sort_values("Dossiers", ascending=False)
     fig = px.pie(g, names="Catégorie", values="Dossiers", hole=0.55, title="🎯 Répartition par catégorie")
     return fig
 
@@ -154,18 +176,14 @@ def heatmap_month(df: pd.DataFrame):
     if df is None or df.empty:
         return _empty_fig("🔥 Heatmap — aucune donnée")
 
-    if "Date" not in df.columns:
+    if "Date" not in df.columns and not _aggregated(df):
         return _empty_fig("🔥 Heatmap — colonne 'Date' introuvable")
 
-    df = _ensure_datetime(df, "Date")
-    df = df[df["Date"].notna()].copy()
+    df = _year_month(df)
     if df.empty:
         return _empty_fig("🔥 Heatmap — aucune date valide")
 
-    df["Année"] = df["Date"].dt.year
-    df["MoisNum"] = df["Date"].dt.month
-
-    g = df.groupby(["Année", "MoisNum"]).size().reset_index(name="Dossiers")
+    g = _count_by(df, ["Année", "MoisNum"])
     pivot = g.pivot(index="Année", columns="MoisNum", values="Dossiers").fillna(0)
 
     fig = px.imshow(pivot, aspect="auto", title="🔥 Heatmap d’activité (année × mois)")
@@ -213,8 +231,8 @@ def top_visa(df: pd.DataFrame, top_n: int = 10):
     if "Visa" not in df.columns:
         return _empty_fig("🛂 Top Visas — colonne 'Visa' introuvable")
 
-    g = df["Visa"].fillna("").replace("", "Non renseigné").value_counts().head(top_n).reset_index()
-    g.columns = ["Visa", "Dossiers"]
+    d = df.assign(Visa=df["Visa"].fillna("").replace("", "Non renseigné"))
+    g = _count_by(d, "Visa").sort_values("Dossiers", ascending=False).head(top_n)
     fig = px.bar(g, x="Visa", y="Dossiers", title="🛂 Top Visas (volume)")
     fig.update_layout(xaxis_title="Visa", yaxis_title="Nombre de dossiers")
     return fig
@@ -1,39 +1,30 @@
 import pandas as pd
 import plotly.express as px
-from datetime import datetime
+
+from utils.escrow_utils import (
+    ESCROW_ACTIF,
+    ESCROW_AGING_BUCKETS,
+    ESCROW_A_RECLAMER,
+    ESCROW_NONE,
+    escrow_aging,
+    escrow_arrays,
+    escrow_totals,
+    first_date,
+)
 
 # -----------------------------------------------------
 # UTILS
 # -----------------------------------------------------
-def to_float(v):
-    try:
-        return float(v or 0)
-    except Exception:
-        return 0.0
-
-def total_acomptes(row):
-    return sum(to_float(row.get(f"Acompte {i}", 0)) for i in range(1, 5))
+def _aggregated(df):
+    """Tranche du cube d'analyse (utils/analysis_cube.py) plutôt que dossiers bruts."""
+    return "Dossiers" in df.columns and "Dossier N" not in df.columns
 
 
 # -----------------------------------------------------
 # 1️⃣ RÉPARTITION PAR ÉTAT
 # -----------------------------------------------------
 def escrow_state_donut(df):
-    data = {
-        "Escrow actif": 0.0,
-        "Escrow à réclamer": 0.0,
-        "Escrow réclamé": 0.0,
-    }
-
-    for _, r in df.iterrows():
-        amount = total_acomptes(r)
-
-        if r.get("Escrow_reclame"):
-            data["Escrow réclamé"] += amount
-        elif r.get("Escrow_a_reclamer"):
-            data["Escrow à réclamer"] += amount
-        elif r.get("Escrow"):
-            data["Escrow actif"] += amount
+    data = escrow_totals(df)
 
     plot_df = pd.DataFrame({
         "État": list(data.keys()),
@@ -56,30 +47,14 @@ def escrow_state_donut(df):
 # 2️⃣ ANCIENNETÉ DES ESCROWS
 # -----------------------------------------------------
 def escrow_aging_bar(df):
-    today = datetime.today()
-    buckets = {
-        "0–30 jours": 0,
-        "31–60 jours": 0,
-        "60+ jours": 0,
-    }
-
-    for _, r in df.iterrows():
-        if not (r.get("Escrow") or r.get("Escrow_a_reclamer")):
-            continue
-
-        date_str = r.get("Date envoi") or r.get("Date")
-        try:
-            d = pd.to_datetime(date_str)
-            days = (today - d).days
-        except Exception:
-            continue
-
-        if days <= 30:
-            buckets["0–30 jours"] += 1
-        elif days <= 60:
-            buckets["31–60 jours"] += 1
-        else:
-            buckets["60+ jours"] += 1
+    _, _, state = escrow_arrays(df)
+    en_cours = (state == ESCROW_ACTIF) | (state == ESCROW_A_RECLAMER)
+
+    if _aggregated(df):
+        counts = df.loc[en_cours].groupby("Ancienneté escrow")["Dossiers"].sum()
+    else:
+        counts = pd.Series(escrow_aging(df)[en_cours]).value_counts()
+    buckets = {b: int(counts.get(b, 0)) for b in ESCROW_AGING_BUCKETS}
 
     plot_df = pd.DataFrame({
         "Ancienneté": list(buckets.keys()),
@@ -100,30 +75,20 @@ def escrow_aging_bar(df):
 # 3️⃣ ÉVOLUTION TEMPORELLE
 # -----------------------------------------------------
 def escrow_monthly_line(df):
-    rows = []
-
-    for _, r in df.iterrows():
-        if not (r.get("Escrow") or r.get("Escrow_a_reclamer") or r.get("Escrow_reclame")):
-            continue
-
-        amount = total_acomptes(r)
-        date_str = r.get("Date") or r.get("Date envoi")
-
-        try:
-            d = pd.to_datetime(date_str)
-            month = d.to_period("M").astype(str)
-        except Exception:
-            continue
+    acomptes, _, state = escrow_arrays(df)
 
-        rows.append({
-            "Mois": month,
-            "Montant": amount
-        })
+    if _aggregated(df):
+        rows = pd.DataFrame({"Mois": df["Mois escrow"].to_numpy(), "Montant": acomptes})
+        rows = rows[(state != ESCROW_NONE) & (rows["Mois"] != "")]
+    else:
+        dates = first_date(df, "Date", "Date envoi")
+        rows = pd.DataFrame({"Mois": dates.dt.to_period("M").astype(str), "Montant": acomptes})
+        rows = rows[(state != ESCROW_NONE) & dates.notna().to_numpy()]
 
-    if not rows:
+    if rows.empty:
         return None
 
-    plot_df = pd.DataFrame(rows).groupby("Mois", as_index=False).sum()
+    plot_df = rows.groupby("Mois", as_index=False)["Montant"].sum()
 
     fig = px.line(
         plot_df,
@@ -1,8 +1,7 @@
 import streamlit as st
 from PIL import Image
 
-from backend.dropbox_utils import load_database
-from backend.json_validator import validate_and_fix_json
+from backend.json_validator import boot_database
 from utils.sidebar import render_sidebar
 
 
@@ -17,18 +16,12 @@ st.set_page_config(page_title="Berenbaum Law", page_icon="📁", layout="wide")
 render_sidebar()
 
 # ---------------------------------------------------------
-# VALIDATION AUTOMATIQUE DU JSON AU DEMARRAGE
-# ---------------------------------------------------------
-fixed = validate_and_fix_json()
-if fixed:
-    st.warning("⚠️ La base de données contenait des incohérences et a été automatiquement réparée.")
-
-
-# ---------------------------------------------------------
-# CHARGEMENT BASE DE DONNÉES
+# CHARGEMENT + VALIDATION AUTOMATIQUE DU JSON (un seul chargement)
 # ---------------------------------------------------------
 try:
-    db = load_database()
+    db, fixed = boot_database()
+    if fixed:
+        st.warning("⚠️ La base de données contenait des incohérences et a été automatiquement réparée.")
     st.success("Base de données chargée depuis Dropbox ✔")
 except Exception as e:
     st.error(f"Erreur lors du chargement de Dropbox : {e}")
@@ -1,9 +1,11 @@
 import streamlit as st
-import pandas as pd
-from datetime import datetime
+from datetime import date, timedelta
 
 from utils.sidebar import render_sidebar
 from backend.dropbox_utils import load_database
+from backend.kpi_store import get_kpis
+from utils.clients_frame import get_clients_frame
+from utils.timeline_builder import get_event_store
 
 # =====================================================
 # CONFIG
@@ -22,73 +24,24 @@ if not clients:
     st.warning("Aucun dossier disponible.")
     st.stop()
 
-df = pd.DataFrame(clients).copy()
-df["Dossier N"] = df["Dossier N"].astype(str)
+# Indicateurs tenus à jour à chaque enregistrement (backend/kpi_store.py) :
+# aucun recalcul sur la table complète à l'affichage
+kpi = get_kpis(db)
 
-# =====================================================
-# OUTILS
-# =====================================================
-def to_float(v):
-    try:
-        return float(v or 0)
-    except Exception:
-        return 0.0
-
-def total_acomptes(row):
-    return sum(to_float(row.get(f"Acompte {i}", 0)) for i in range(1, 5))
-
-# =====================================================
-# KPI FINANCIERS GLOBAUX
-# =====================================================
-honoraires = df["Montant honoraires (US $)"].apply(to_float).sum()
-frais = df["Autres frais (US $)"].apply(to_float).sum()
-total_facture = honoraires + frais
-
-total_encaisse = 0.0
-for i in range(1, 5):
-    col = f"Acompte {i}"
-    if col in df.columns:
-        total_encaisse += df[col].apply(to_float).sum()
-
-solde_du = total_facture - total_encaisse
-
-# =====================================================
-# KPI ESCROW — LOGIQUE SYNCHRONISÉE
-# =====================================================
-escrow_actif_total = 0.0
-escrow_a_reclamer_total = 0.0
+honoraires = kpi["honoraires"]
+total_encaisse = kpi["total_encaisse"]
+solde_du = kpi["solde_du"]
 
-for _, r in df.iterrows():
-    acomptes = total_acomptes(r)
+# Escrow — logique synchronisée (utils/escrow_utils.py) :
+# tant que pas accepté / refusé / annulé → Escrow actif ;
+# dès qu’accepté / refusé / annulé → Escrow à réclamer
+escrow_actif_total = kpi["escrow_actif"]
+escrow_a_reclamer_total = kpi["escrow_a_reclamer"]
 
-    if r.get("Escrow_reclame"):
-        continue
-
-    # Tant que pas accepté / refusé / annulé → Escrow actif
-    if not (r.get("Dossier accepte") or r.get("Dossier refuse") or r.get("Dossier Annule")):
-        escrow_actif_total += acomptes
-        continue
-
-    # Dès qu’accepté / refusé / annulé → Escrow à réclamer
-    if r.get("Escrow_a_reclamer"):
-        escrow_a_reclamer_total += acomptes
-
-# =====================================================
-# KPI DOSSIERS
-# =====================================================
-total_dossiers = len(df)
-dossiers_acceptes = df["Dossier accepte"].astype(bool).sum()
-dossiers_refuses = df["Dossier refuse"].astype(bool).sum()
-dossiers_annules = df["Dossier Annule"].astype(bool).sum()
-
-# Soldes
-df["Solde"] = df.apply(lambda r: to_float(r.get("Montant honoraires (US $)", 0))
-                                   + to_float(r.get("Autres frais (US $)", 0))
-                                   - total_acomptes(r), axis=1)
-
-dossiers_soldes = (df["Solde"] <= 0).sum()
-dossiers_non_soldes = (df["Solde"] > 0).sum()
-dossiers_negatifs = (df["Solde"] < 0).sum()
+total_dossiers = kpi["dossiers"]
+dossiers_acceptes = kpi["acceptes"]
+dossiers_refuses = kpi["refuses"]
+dossiers_annules = kpi["annules"]
 
 # =====================================================
 # AFFICHAGE KPI
@@ -114,7 +67,7 @@ k10.metric("Escrow total", f"${escrow_actif_total + escrow_a_reclamer_total:,.2f
 st.markdown("---")
 
 # =====================================================
-# TABLEAU SYNTHÈSE
+# TABLEAU SYNTHÈSE (DataFrame partagé, utils/clients_frame.py)
 # =====================================================
 st.subheader("📋 Synthèse des dossiers")
 
@@ -127,9 +80,33 @@ cols = [
     "Dossier accepte", "Dossier refuse", "Dossier Annule"
 ]
 
+df = get_clients_frame(db)
 cols = [c for c in cols if c in df.columns]
 
 st.dataframe(
     df[cols].sort_values("Dossier N"),
     use_container_width=True
-)
\ No newline at end of file
+)
+
+# =====================================================
+# ACTIVITÉ DE LA PÉRIODE (journal d'événements, utils/timeline_builder.py)
+# =====================================================
+st.markdown("---")
+st.subheader("🗓️ Activité de la période")
+
+today = date.today()
+periode = st.date_input("Période", value=(today - timedelta(days=6), today))
+debut, fin = (periode[0], periode[-1]) if isinstance(periode, (list, tuple)) and periode else (today, today)
+
+activite = get_event_store(db).between(debut, fin)
+if activite.empty:
+    st.info("Aucun événement daté sur cette période.")
+else:
+    st.caption(f"{len(activite)} événement(s) du {debut} au {fin}.")
+    st.dataframe(
+        activite[["date", "Dossier N", "Nom", "label", "amount"]].rename(columns={
+            "date": "Date", "label": "Événement", "amount": "Montant (US $)",
+        }),
+        use_container_width=True,
+        hide_index=True,
+    )
@@ -1,10 +1,10 @@
 # pages/01_📁_Liste_dossiers.py
 import streamlit as st
-import pandas as pd
 
 from utils.sidebar import render_sidebar
 from backend.dropbox_utils import load_database
-from utils.status_utils import normalize_status_columns, normalize_bool
+from utils.clients_frame import get_clients_frame
+from utils.facet_index import facet_selectbox, get_clients_facets
 
 # ---------------------------------------------------------
 # CONFIG
@@ -23,48 +23,9 @@ if not clients:
     st.warning("Aucun dossier trouvé.")
     st.stop()
 
-df = pd.DataFrame(clients).copy()
-
-# ---------------------------------------------------------
-# NORMALISATION
-# ---------------------------------------------------------
-# Dossier N (support xxxxx-1)
-df["Dossier N"] = df.get("Dossier N", "").astype(str).fillna("").str.strip()
-
-# Statuts
-df = normalize_status_columns(df)
-
-# Dates
-df["Date"] = pd.to_datetime(df.get("Date"), errors="coerce")
-df["Année"] = df["Date"].dt.year
-
-# Textes
-for col in ["Nom", "Categories", "Sous-categories", "Visa"]:
-    if col not in df.columns:
-        df[col] = ""
-    df[col] = df[col].astype(str).fillna("").str.strip()
-
-# Numériques
-def to_float(x):
-    try:
-        return float(x or 0)
-    except:
-        return 0.0
-
-for c in ["Montant honoraires (US $)", "Autres frais (US $)"]:
-    if c not in df.columns:
-        df[c] = 0.0
-    df[c] = df[c].apply(to_float)
-
-for i in range(1, 5):
-    col = f"Acompte {i}"
-    if col not in df.columns:
-        df[col] = 0.0
-    df[col] = df[col].apply(to_float)
-
-df["Total facturé"] = df["Montant honoraires (US $)"] + df["Autres frais (US $)"]
-df["Total encaissé"] = df[[f"Acompte {i}" for i in range(1, 5)]].sum(axis=1)
-df["Solde"] = df["Total facturé"] - df["Total encaissé"]
+# Dossier N, statuts, dates, textes, montants et totaux : calculés une
+# fois par révision de la base (utils/clients_frame.py)
+df = get_clients_frame(db)
 
 # ---------------------------------------------------------
 # FILTRES (UNE SEULE LIGNE)
@@ -73,23 +34,21 @@ st.subheader("🧰 Filtres")
 
 f1, f2, f3, f4, f5 = st.columns(5)
 
-# Année
-years = sorted([int(y) for y in df["Année"].dropna().unique().tolist()])
-annee_sel = f1.selectbox("Année", options=["Toutes"] + years)
+# Options et nombres de dossiers par intersection de bitmaps
+# (utils/facet_index.py) : chaque niveau dépend des niveaux précédents
+facets = get_clients_facets(db)
+
+annee_sel = facet_selectbox(f1, "Année", facets, "Année")
+selection = facets.select({"Année": annee_sel})
 
-# Catégorie
-cat_list = ["Toutes"] + sorted([c for c in df["Categories"].unique().tolist() if c])
-categorie_sel = f2.selectbox("Catégorie", options=cat_list)
+categorie_sel = facet_selectbox(f2, "Catégorie", facets, "Categories", selection)
+selection = facets.select({"Categories": categorie_sel}, selection)
 
-# Sous-catégorie (dépendante)
-df_cat = df[df["Categories"] == categorie_sel] if categorie_sel != "Toutes" else df
-sous_list = ["Toutes"] + sorted([s for s in df_cat["Sous-categories"].unique().tolist() if s])
-sous_sel = f3.selectbox("Sous-catégorie", options=sous_list)
+sous_sel = facet_selectbox(f3, "Sous-catégorie", facets, "Sous-categories", selection)
+selection = facets.select({"Sous-categories": sous_sel}, selection)
 
-# Visa (dépendant)
-df_sous = df_cat[df_cat["Sous-categories"] == sous_sel] if sous_sel != "Toutes" else df_cat
-visa_list = ["Tous"] + sorted([v for v in df_sous["Visa"].unique().tolist() if v])
-visa_sel = f4.selectbox("Visa", options=visa_list)
+visa_sel = facet_selectbox(f4, "Visa", facets, "Visa", selection, all_label="Tous")
+selection = facets.select({"Visa": visa_sel}, selection)
 
 # 🔍 NOUVEAU FILTRE NOM
 nom_recherche = f5.text_input("Nom (recherche)", placeholder="Ex: DUPONT")
@@ -97,19 +56,8 @@ nom_recherche = f5.text_input("Nom (recherche)", placeholder="Ex: DUPONT")
 # ---------------------------------------------------------
 # APPLICATION DES FILTRES
 # ---------------------------------------------------------
-df_filt = df.copy()
-
-if annee_sel != "Toutes":
-    df_filt = df_filt[df_filt["Année"] == annee_sel]
-
-if categorie_sel != "Toutes":
-    df_filt = df_filt[df_filt["Categories"] == categorie_sel]
-
-if sous_sel != "Toutes":
-    df_filt = df_filt[df_filt["Sous-categories"] == sous_sel]
-
-if visa_sel != "Tous":
-    df_filt = df_filt[df_filt["Visa"] == visa_sel]
+# Une seule extraction : lignes du bitmap final
+df_filt = df.iloc[facets.rows(selection)]
 
 # 🔍 Filtre Nom (contient, insensible à la casse)
 if nom_recherche.strip():
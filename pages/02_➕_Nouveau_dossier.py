@@ -1,9 +1,12 @@
 import streamlit as st
-import pandas as pd
 from datetime import datetime
 
 from utils.sidebar import render_sidebar
 from backend.dropbox_utils import load_database, save_database
+from backend.sequences import allocate_child_number, allocate_parent_number
+from utils.dossier_hierarchy import get_hierarchy, hierarchy_after_insert
+from utils.name_matcher import DUPLICATE_THRESHOLD, get_name_matcher
+from utils.visa_filters import get_visa_referential
 
 # =====================================================
 # CONFIG
@@ -17,82 +20,17 @@ st.title("➕ Nouveau dossier")
 # ---------------------------------------------------------
 db = load_database()
 clients = db.get("clients", [])
-visa_raw = pd.DataFrame(db.get("visa", []))
 
 # ---------------------------------------------------------
-# FILTRES SIMPLES ET ROBUSTES (VISA)
+# RÉFÉRENTIEL VISA (nettoyé et indexé une fois par version de la base)
 # ---------------------------------------------------------
-def get_souscats(df, categorie):
-    if df.empty or "Categories" not in df.columns or "Sous-categories" not in df.columns:
-        return []
-    return sorted(
-        df[df["Categories"] == categorie]["Sous-categories"]
-        .dropna()
-        .unique()
-        .tolist()
-    )
-
-
-def get_visas(df, souscat):
-    if df.empty or "Sous-categories" not in df.columns or "Visa" not in df.columns:
-        return []
-    return sorted(
-        df[df["Sous-categories"] == souscat]["Visa"]
-        .dropna()
-        .unique()
-        .tolist()
-    )
+visa_ref = get_visa_referential(db)
 
 # ---------------------------------------------------------
 # NUMÉROTATION DOSSIER (support parent + sous-dossier)
+# Index parent -> sous-dossiers construit une fois par version de la base
 # ---------------------------------------------------------
-def parse_parent_and_index(dossier_n: str):
-    """
-    Retourne (parent:int|None, index:int|None)
-    Ex:
-      "12937"   -> (12937, 0)
-      "12937-1" -> (12937, 1)
-      "12937-2" -> (12937, 2)
-    """
-    if dossier_n is None:
-        return None, None
-    s = str(dossier_n).strip()
-    if s == "":
-        return None, None
-    if "-" in s:
-        p, i = s.split("-", 1)
-        try:
-            return int(float(p)), int(float(i))
-        except Exception:
-            return None, None
-    try:
-        return int(float(s)), 0
-    except Exception:
-        return None, None
-
-
-def get_existing_parents(clients_list):
-    parents = set()
-    for c in clients_list:
-        p, _ = parse_parent_and_index(c.get("Dossier N", ""))
-        if p:
-            parents.add(p)
-    return sorted(parents)
-
-
-def next_parent_number(clients_list):
-    parents = get_existing_parents(clients_list)
-    return (max(parents) + 1) if parents else 13057
-
-
-def next_child_index(clients_list, parent_number: int):
-    max_idx = 0
-    for c in clients_list:
-        p, i = parse_parent_and_index(c.get("Dossier N", ""))
-        if p == parent_number and i is not None:
-            if i > max_idx:
-                max_idx = i
-    return max_idx + 1
+hierarchy = get_hierarchy(db)
 
 
 # =====================================================
@@ -109,20 +47,22 @@ type_dossier = colT1.radio(
 )
 
 if type_dossier == "Dossier parent":
-    parent_num = next_parent_number(clients)
+    parent_num = hierarchy.next_parent_number()
     dossier_n_str = str(parent_num)
     colT2.info(
         f"Un **dossier parent** sera créé avec le numéro **{dossier_n_str}**.\n\n"
-        "Pour créer des sous-dossiers, utilisez l’option « Sous-dossier (fils) »."
+        "Pour créer des sous-dossiers, utilisez l’option « Sous-dossier (fils) ».\n\n"
+        "Le numéro définitif est réservé à l’enregistrement (il peut avancer si un "
+        "autre utilisateur crée un dossier au même moment)."
     )
 else:
-    parents = get_existing_parents(clients)
+    parents = hierarchy.parents()
     if not parents:
         st.warning("Aucun dossier parent existant. Créez d’abord un dossier parent.")
         st.stop()
 
     parent_selected = colT2.selectbox("Choisir le dossier parent", parents)
-    child_idx = next_child_index(clients, int(parent_selected))
+    child_idx = hierarchy.next_child_index(int(parent_selected))
     dossier_n_str = f"{int(parent_selected)}-{child_idx}"
     colT2.info(
         f"Un **sous-dossier** sera créé avec le numéro **{dossier_n_str}** "
@@ -139,22 +79,32 @@ col1.text_input("Dossier N", value=dossier_n_str, disabled=True)
 nom = col2.text_input("Nom")
 date_dossier = col3.date_input("Date de création")
 
+# Doublon probable : même client déjà enregistré sous une autre graphie
+# (index des noms par révision, utils/name_matcher.py). Un sous-dossier
+# reprend normalement le nom de son parent : contrôle des parents seulement.
+if nom.strip() and type_dossier == "Dossier parent":
+    doublons = get_name_matcher(db).match(nom, limit=5, threshold=DUPLICATE_THRESHOLD)
+    if doublons:
+        lignes = [
+            f"- **{nom_existant}** ({score:.0%}) : dossier(s) "
+            + ", ".join(str(clients[p].get("Dossier N", "")) for p in positions[:5])
+            for nom_existant, score, positions in doublons
+        ]
+        st.warning("⚠️ Client peut-être déjà enregistré :\n" + "\n".join(lignes))
+
 # ---------------- CATEGORIES & VISA ----------------------
 st.subheader("🧩 Catégorisation")
 
 colA, colB, colC = st.columns(3)
 
 # Catégories
-if not visa_raw.empty and "Categories" in visa_raw.columns:
-    cat_list = ["Choisir..."] + sorted(visa_raw["Categories"].dropna().unique().tolist())
-else:
-    cat_list = ["Choisir..."]
+cat_list = ["Choisir..."] + visa_ref.categories()
 
 categorie = colA.selectbox("Catégorie", cat_list)
 
 # Sous-catégories
 if categorie != "Choisir...":
-    souscats = ["Choisir..."] + get_souscats(visa_raw, categorie)
+    souscats = ["Choisir..."] + visa_ref.souscats(categorie)
 else:
     souscats = ["Choisir..."]
 
@@ -162,7 +112,7 @@ sous_categorie = colB.selectbox("Sous-catégorie", souscats)
 
 # Visa
 if sous_categorie != "Choisir...":
-    visa_list = ["Choisir..."] + get_visas(visa_raw, sous_categorie)
+    visa_list = ["Choisir..."] + visa_ref.visas(souscat=sous_categorie)
 else:
     visa_list = ["Choisir..."]
 
@@ -209,6 +159,18 @@ if st.button("💾 Enregistrer le dossier", type="primary"):
         st.error("❌ Veuillez sélectionner Catégorie, Sous-catégorie et Visa.")
         st.stop()
 
+    # Réservation atomique du numéro (compteur partagé, voir backend/sequences.py)
+    try:
+        if type_dossier == "Dossier parent":
+            dossier_n_str = str(allocate_parent_number(floor=hierarchy.next_parent_number() - 1))
+        else:
+            dossier_n_str = allocate_child_number(
+                int(parent_selected), floor=hierarchy.max_suffix(int(parent_selected))
+            )
+    except Exception as e:
+        st.error(f"❌ Impossible de réserver un numéro de dossier : {e}")
+        st.stop()
+
     # Sécurité : éviter doublon Dossier N
     existing_ids = set(str(c.get("Dossier N", "")).strip() for c in clients)
     if dossier_n_str in existing_ids:
@@ -275,6 +237,7 @@ if st.button("💾 Enregistrer le dossier", type="primary"):
     clients.append(new_entry)
     db["clients"] = clients
     save_database(db)
+    hierarchy_after_insert(db, hierarchy, dossier_n_str)
 
     st.success(f"✔ Dossier **{dossier_n_str}** enregistré avec succès !")
     st.rerun()
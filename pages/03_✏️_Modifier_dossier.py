@@ -4,9 +4,13 @@ import pandas as pd
 from datetime import datetime
 
 from utils.sidebar import render_sidebar
-from backend.dropbox_utils import load_database, save_database
+from backend.dropbox_utils import load_database
+from backend.database import get_database
+from utils.name_matcher import similar_positions
+from utils.search_index import search_dossiers
 from utils.tarif_utils import get_tarif_for_visa
-from utils.status_utils import normalize_status_columns, update_status_row, normalize_bool
+from utils.visa_filters import get_visa_referential
+from utils.status_utils import normalize_status_columns, status_fields, normalize_bool
 
 # ---------------------------------------------------------
 # CONFIG
@@ -19,9 +23,11 @@ st.title("✏️ Modifier un dossier")
 # CHARGEMENT BASE
 # ---------------------------------------------------------
 db = load_database()
+database = get_database(db)
 clients = db.get("clients", [])
 tarifs = db.get("tarifs", [])
-visa_ref = pd.DataFrame(db.get("visa", []))
+# Référentiel Visa nettoyé et indexé une fois par version de la base
+visa_ref = get_visa_referential(db)
 
 if not clients:
     st.error("Aucun dossier trouvé.")
@@ -62,45 +68,26 @@ def to_float(v):
 def to_text(v):
     return "" if v is None else str(v)
 
-def get_souscats(df_visa, categorie):
-    if df_visa.empty or "Categories" not in df_visa.columns or "Sous-categories" not in df_visa.columns:
-        return []
-    return sorted(
-        df_visa[df_visa["Categories"] == categorie]["Sous-categories"]
-        .dropna()
-        .astype(str)
-        .unique()
-        .tolist()
-    )
-
-def get_visas(df_visa, categorie, souscat):
-    if df_visa.empty or "Categories" not in df_visa.columns or "Sous-categories" not in df_visa.columns or "Visa" not in df_visa.columns:
-        return []
-    return sorted(
-        df_visa[(df_visa["Categories"] == categorie) & (df_visa["Sous-categories"] == souscat)]["Visa"]
-        .dropna()
-        .astype(str)
-        .unique()
-        .tolist()
-    )
-
 # ---------------------------------------------------------
 # SÉLECTION DOSSIER (avec recherche Nom ou Dossier N)
 # ---------------------------------------------------------
 st.subheader("🔎 Recherche dossier")
 
-search = st.text_input("Rechercher par Dossier N ou Nom", value="").strip().lower()
+search = st.text_input("Rechercher par Dossier N ou Nom", value="").strip()
 
 df_search = df.copy()
 df_search["Nom"] = df_search.get("Nom", "").astype(str)
 df_search["_label"] = df_search[DOSSIER_COL].astype(str) + " — " + df_search["Nom"].astype(str)
 
 if search:
-    mask = df_search[DOSSIER_COL].astype(str).str.lower().str.contains(search) | df_search["Nom"].astype(str).str.lower().str.contains(search)
-    df_search = df_search[mask]
-
-liste_labels = df_search["_label"].dropna().astype(str).unique().tolist()
-liste_labels = sorted(liste_labels)
+    # Index inversé (utils/search_index.py) : positions classées par pertinence,
+    # puis noms approchants (utils/name_matcher.py)
+    hits = search_dossiers(db, search)
+    found = set(hits)
+    df_search = df_search.loc[hits + [p for p in similar_positions(db, search) if p not in found]]
+    liste_labels = df_search["_label"].dropna().astype(str).unique().tolist()
+else:
+    liste_labels = sorted(df_search["_label"].dropna().astype(str).unique().tolist())
 
 if not liste_labels:
     st.warning("Aucun dossier ne correspond à la recherche.")
@@ -109,8 +96,12 @@ if not liste_labels:
 selected_label = st.selectbox("Sélectionner un dossier", liste_labels)
 selected = selected_label.split(" — ", 1)[0].strip()
 
-row = df[df[DOSSIER_COL] == selected].iloc[0]
-idx = row.name
+# Index « Dossier N » -> position (df suit l'ordre de db["clients"])
+idx = database.position(selected)
+if idx is None:
+    st.error(f"Dossier {selected or '(sans numéro)'} introuvable dans l'index.")
+    st.stop()
+row = df.loc[idx]
 
 # ---------------------------------------------------------
 # INFORMATIONS GÉNÉRALES
@@ -128,16 +119,15 @@ visa_current = to_text(row.get("Visa", ""))
 # ---------------------------------------------------------
 st.subheader("🧩 Catégorisation")
 
-visa_ref = visa_ref.copy()
-for col in ["Categories", "Sous-categories", "Visa"]:
-    if col in visa_ref.columns:
-        visa_ref[col] = visa_ref[col].astype(str)
-
-cat_list = ["Choisir..."]
-if not visa_ref.empty and "Categories" in visa_ref.columns:
-    cat_list += sorted(visa_ref["Categories"].dropna().astype(str).unique().tolist())
+cat_list = ["Choisir..."] + visa_ref.categories()
 
 current_cat = to_text(row.get("Categories", ""))
+current_souscat = to_text(row.get("Sous-categories", ""))
+# Dossier sans catégorisation : chemin retrouvé à partir du visa (index inverse),
+# proposé seulement — rien n'est enregistré tant qu'il n'est pas choisi
+if not current_cat and not current_souscat and visa_ref.path(visa_current):
+    hint_cat, hint_souscat = visa_ref.path(visa_current)
+    st.caption(f"💡 Catégorisation suggérée pour le visa {visa_current} : {hint_cat} › {hint_souscat}")
 if current_cat and current_cat not in cat_list:
     cat_list.append(current_cat)
 cat_list = ["Choisir..."] + sorted([c for c in cat_list if c != "Choisir..."])
@@ -151,9 +141,8 @@ categorie = colA.selectbox(
 
 souscats = ["Choisir..."]
 if categorie != "Choisir...":
-    souscats += get_souscats(visa_ref, categorie)
+    souscats += visa_ref.souscats(categorie)
 
-current_souscat = to_text(row.get("Sous-categories", ""))
 if current_souscat and current_souscat not in souscats:
     souscats.append(current_souscat)
 souscats = ["Choisir..."] + sorted([s for s in souscats if s != "Choisir..."])
@@ -166,7 +155,7 @@ sous_categorie = colB.selectbox(
 
 visa_list = ["Choisir..."]
 if categorie != "Choisir..." and sous_categorie != "Choisir...":
-    visa_list += get_visas(visa_ref, categorie, sous_categorie)
+    visa_list += visa_ref.visas_for(categorie, sous_categorie)
 
 # IMPORTANT : le visa peut être différent même si cat/sous-cat ne matchent pas (compat)
 if visa_current and visa_current not in visa_list:
@@ -287,59 +276,58 @@ date_rfe = d5.date_input("Date RFE", safe_date(row.get("Date reclamation")))
 if st.button("💾 Enregistrer les modifications", type="primary"):
 
     # Infos générales
-    df.loc[idx, "Nom"] = nom
-    df.loc[idx, "Date"] = str(date_dossier)
-    df.loc[idx, "Categories"] = "" if categorie == "Choisir..." else categorie
-    df.loc[idx, "Sous-categories"] = "" if sous_categorie == "Choisir..." else sous_categorie
-    df.loc[idx, "Visa"] = "" if visa == "Choisir..." else visa
-    df.loc[idx, "Commentaire"] = commentaire
+    fields = {
+        "Nom": nom,
+        "Date": str(date_dossier),
+        "Categories": "" if categorie == "Choisir..." else categorie,
+        "Sous-categories": "" if sous_categorie == "Choisir..." else sous_categorie,
+        "Visa": "" if visa == "Choisir..." else visa,
+        "Commentaire": commentaire,
+    }
 
     # Facturation
-    df.loc[idx, "Montant honoraires (US $)"] = float(montant_honoraires)
-    df.loc[idx, "Autres frais (US $)"] = float(autres_frais)
+    fields["Montant honoraires (US $)"] = float(montant_honoraires)
+    fields["Autres frais (US $)"] = float(autres_frais)
 
     # Acomptes + dates + modes (AJOUT)
     for i in range(1, 5):
-        df.loc[idx, f"Acompte {i}"] = float(acomptes[i])
+        fields[f"Acompte {i}"] = float(acomptes[i])
 
         # Date
-        df.loc[idx, f"Date Acompte {i}"] = date_to_str(dates_ac[i])
+        fields[f"Date Acompte {i}"] = date_to_str(dates_ac[i])
 
         # Mode par acompte
-        df.loc[idx, f"Mode Acompte {i}"] = modes_ac[i]
+        fields[f"Mode Acompte {i}"] = modes_ac[i]
 
     # Compat: garde aussi le champ historique "mode de paiement" (lié à Acompte 1)
-    df.loc[idx, "mode de paiement"] = modes_ac[1]
+    fields["mode de paiement"] = modes_ac[1]
 
     # Statuts (centralisé)
-    df = update_status_row(
-        df,
-        idx,
+    fields.update(status_fields(
         envoye=envoye,
         accepte=accepte,
         refuse=refuse,
         annule=annule,
         rfe=rfe,
-    )
+    ))
 
     # Dates statuts (AJOUT)
-    df.loc[idx, "Date envoi"] = date_to_str(date_envoye)
-    df.loc[idx, "Date acceptation"] = date_to_str(date_accepte)
-    df.loc[idx, "Date refus"] = date_to_str(date_refuse)
-    df.loc[idx, "Date annulation"] = date_to_str(date_annule)
-    df.loc[idx, "Date reclamation"] = date_to_str(date_rfe)
+    fields["Date envoi"] = date_to_str(date_envoye)
+    fields["Date acceptation"] = date_to_str(date_accepte)
+    fields["Date refus"] = date_to_str(date_refuse)
+    fields["Date annulation"] = date_to_str(date_annule)
+    fields["Date reclamation"] = date_to_str(date_rfe)
 
     # Escrow (règle claire)
     if escrow_actif:
-        df.loc[idx, "Escrow"] = True
-        df.loc[idx, "Escrow_a_reclamer"] = False
-        df.loc[idx, "Escrow_reclame"] = False
+        fields["Escrow"] = True
+        fields["Escrow_a_reclamer"] = False
+        fields["Escrow_reclame"] = False
     else:
-        df.loc[idx, "Escrow"] = False
+        fields["Escrow"] = False
 
-    # Sauvegarde
-    db["clients"] = df.to_dict(orient="records")
-    save_database(db)
+    # Sauvegarde : seul ce dossier est modifié dans la base
+    database.update_client_at(idx, fields)
 
     st.success("✔ Dossier mis à jour avec succès")
     st.rerun()
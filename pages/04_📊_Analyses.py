@@ -1,8 +1,10 @@
 import streamlit as st
-import pandas as pd
 
 from utils.sidebar import render_sidebar
 from backend.dropbox_utils import load_database
+from utils.analysis_cube import cube_totals, get_cube
+from utils.clients_frame import get_clients_frame
+from utils.facet_index import facet_selectbox, get_clients_facets, get_cube_facets
 
 from components.analysis_charts import (
     monthly_hist,
@@ -35,26 +37,10 @@ if not clients:
     st.warning("Aucune donnée disponible.")
     st.stop()
 
-df = pd.DataFrame(clients).copy()
-
-# =====================================================
-# NORMALISATION
-# =====================================================
-df["Dossier N"] = df["Dossier N"].astype(str)
-
-df["Date"] = pd.to_datetime(df.get("Date"), errors="coerce")
-df["Année"] = df["Date"].dt.year
-df["Mois"] = df["Date"].dt.to_period("M").astype(str)
-
-for col in [
-    "Dossier envoye", "Dossier accepte", "Dossier refuse",
-    "Dossier Annule", "RFE",
-    "Escrow", "Escrow_a_reclamer", "Escrow_reclame"
-]:
-    if col in df.columns:
-        df[col] = df[col].astype(bool)
-    else:
-        df[col] = False
+# Cube d'agrégats (année × mois × catégorie × sous-catégorie × visa ×
+# statuts × escrow), construit une fois par révision (utils/analysis_cube.py) :
+# filtres, indicateurs et graphiques ne lisent que le cube
+cube = get_cube(db)
 
 # =====================================================
 # FILTRES
@@ -63,25 +49,20 @@ st.subheader("🎛️ Filtres")
 
 f1, f2, f3, f4, f5 = st.columns(5)
 
-years = sorted(df["Année"].dropna().unique())
-year = f1.selectbox("Année", ["Toutes"] + years)
-
-categories = sorted(df["Categories"].dropna().unique())
-categorie = f2.selectbox("Catégorie", ["Toutes"] + categories)
+# Options, nombres de dossiers et filtrage par intersection de bitmaps
+# (utils/facet_index.py) sur les lignes du cube, puis des dossiers
+facets = get_cube_facets(db)
 
-if categorie != "Toutes":
-    souscats = sorted(df[df["Categories"] == categorie]["Sous-categories"].dropna().unique())
-else:
-    souscats = sorted(df["Sous-categories"].dropna().unique())
+year = facet_selectbox(f1, "Année", facets, "Année")
+selection = facets.select({"Année": year})
 
-souscat = f3.selectbox("Sous-catégorie", ["Toutes"] + souscats)
+categorie = facet_selectbox(f2, "Catégorie", facets, "Categories", selection)
+selection = facets.select({"Categories": categorie}, selection)
 
-if souscat != "Toutes":
-    visas = sorted(df[df["Sous-categories"] == souscat]["Visa"].dropna().unique())
-else:
-    visas = sorted(df["Visa"].dropna().unique())
+souscat = facet_selectbox(f3, "Sous-catégorie", facets, "Sous-categories", selection)
+selection = facets.select({"Sous-categories": souscat}, selection)
 
-visa = f4.selectbox("Visa", ["Tous"] + visas)
+visa = facet_selectbox(f4, "Visa", facets, "Visa", selection, all_label="Tous")
 
 statut = f5.selectbox(
     "Statut",
@@ -90,30 +71,25 @@ statut = f5.selectbox(
 
 # =====================================================
 # APPLICATION FILTRES
-# =====================================================
-df_f = df.copy()
-
-if year != "Toutes":
-    df_f = df_f[df_f["Année"] == year]
-
-if categorie != "Toutes":
-    df_f = df_f[df_f["Categories"] == categorie]
-
-if souscat != "Toutes":
-    df_f = df_f[df_f["Sous-categories"] == souscat]
-
-if visa != "Tous":
-    df_f = df_f[df_f["Visa"] == visa]
-
+# (mêmes colonnes dans le cube et dans les dossiers)
+# =====================================================
+col_map = {
+    "Envoyé": "Dossier envoye",
+    "Accepté": "Dossier accepte",
+    "Refusé": "Dossier refuse",
+    "Annulé": "Dossier Annule",
+    "RFE": "RFE"
+}
+filters = {
+    "Année": year,
+    "Categories": categorie,
+    "Sous-categories": souscat,
+    "Visa": visa,
+}
 if statut != "Tous":
-    col_map = {
-        "Envoyé": "Dossier envoye",
-        "Accepté": "Dossier accepte",
-        "Refusé": "Dossier refuse",
-        "Annulé": "Dossier Annule",
-        "RFE": "RFE"
-    }
-    df_f = df_f[df_f[col_map[statut]]]
+    filters[col_map[statut]] = True
+
+cube_f = cube.iloc[facets.rows(facets.select(filters))]
 
 # =====================================================
 # KPI
@@ -121,31 +97,17 @@ if statut != "Tous":
 st.markdown("---")
 st.subheader("📈 Indicateurs clés")
 
-def to_float(v):
-    try:
-        return float(v or 0)
-    except:
-        return 0.0
-
-hon = df_f.get("Montant honoraires (US $)", 0).apply(to_float).sum()
-frais = df_f.get("Autres frais (US $)", 0).apply(to_float).sum()
-total_facture = hon + frais
-
-total_encaisse = 0.0
-for i in range(1, 5):
-    total_encaisse += df_f.get(f"Acompte {i}", 0).apply(to_float).sum()
-
-solde = total_facture - total_encaisse
+kpi = cube_totals(cube_f)
 
 k1, k2, k3, k4, k5, k6, k7 = st.columns(7)
 
-k1.metric("Dossiers", len(df_f))
-k2.metric("Acceptés", df_f["Dossier accepte"].sum())
-k3.metric("Refusés", df_f["Dossier refuse"].sum())
-k4.metric("Annulés", df_f["Dossier Annule"].sum())
-k5.metric("Total facturé", f"${total_facture:,.2f}")
-k6.metric("Total encaissé", f"${total_encaisse:,.2f}")
-k7.metric("Solde dû", f"${solde:,.2f}")
+k1.metric("Dossiers", kpi["dossiers"])
+k2.metric("Acceptés", kpi["acceptes"])
+k3.metric("Refusés", kpi["refuses"])
+k4.metric("Annulés", kpi["annules"])
+k5.metric("Total facturé", f"${kpi['total_facture']:,.2f}")
+k6.metric("Total encaissé", f"${kpi['total_encaisse']:,.2f}")
+k7.metric("Solde dû", f"${kpi['solde']:,.2f}")
 
 # =====================================================
 # GRAPHIQUES CLASSIQUES
@@ -162,19 +124,19 @@ t1, t2, t3, t4, t5 = st.tabs([
 ])
 
 with t1:
-    st.plotly_chart(monthly_hist(df_f), use_container_width=True)
+    st.plotly_chart(monthly_hist(cube_f), use_container_width=True)
 
 with t2:
-    st.plotly_chart(multi_year_line(df_f), use_container_width=True)
+    st.plotly_chart(multi_year_line(cube_f), use_container_width=True)
 
 with t3:
-    st.plotly_chart(category_donut(df_f), use_container_width=True)
+    st.plotly_chart(category_donut(cube_f), use_container_width=True)
 
 with t4:
-    st.plotly_chart(heatmap_month(df_f), use_container_width=True)
+    st.plotly_chart(heatmap_month(cube_f), use_container_width=True)
 
 with t5:
-    st.plotly_chart(category_bars(df_f), use_container_width=True)
+    st.plotly_chart(category_bars(cube_f), use_container_width=True)
 
 # =====================================================
 # ANALYSES ESCROW
@@ -190,18 +152,18 @@ e1, e2, e3 = st.tabs([
 
 with e1:
     st.plotly_chart(
-        escrow_state_donut(df_f),
+        escrow_state_donut(cube_f),
         use_container_width=True
     )
 
 with e2:
     st.plotly_chart(
-        escrow_aging_bar(df_f),
+        escrow_aging_bar(cube_f),
         use_container_width=True
     )
 
 with e3:
-    fig = escrow_monthly_line(df_f)
+    fig = escrow_monthly_line(cube_f)
     if fig:
         st.plotly_chart(fig, use_container_width=True)
     else:
@@ -213,6 +175,10 @@ with e3:
 st.markdown("---")
 st.subheader("📋 Dossiers filtrés")
 
+# Seule vue au niveau dossier : DataFrame partagé (utils/clients_frame.py)
+client_facets = get_clients_facets(db)
+df_f = get_clients_frame(db).iloc[client_facets.rows(client_facets.select(filters))]
+
 cols = [
     "Dossier N", "Nom", "Date",
     "Categories", "Sous-categories", "Visa",
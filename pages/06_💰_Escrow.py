@@ -3,7 +3,9 @@ import pandas as pd
 from datetime import datetime
 
 from utils.sidebar import render_sidebar
-from backend.dropbox_utils import load_database, save_database
+from backend.dropbox_utils import load_database
+from backend.database import get_database
+from utils.clients_frame import get_clients_frame
 
 # =====================================================
 # CONFIG
@@ -23,40 +25,15 @@ if not clients:
     st.error("Aucun dossier trouvé.")
     st.stop()
 
-df = pd.DataFrame(clients).copy()
-df["Dossier N"] = df["Dossier N"].astype(str)
-
-# =====================================================
-# UTILS
 # =====================================================
-def to_float(v):
-    try:
-        return float(v or 0)
-    except Exception:
-        return 0.0
-
-def is_true(v):
-    return str(v).strip().lower() in ["true", "1", "yes", "oui"]
-
-# =====================================================
-# CALCUL MONTANT ESCROW (LOGIQUE VALIDÉE)
+# MONTANT ESCROW (LOGIQUE VALIDÉE)
 # Tant que dossier NON accepté / refusé / annulé :
 # 👉 TOUS les acomptes sont en escrow
+# Colonne « Escrow Montant », calculée une fois par révision
+# de la base (utils/clients_frame.py)
 # =====================================================
-def escrow_amount(row):
-    if (
-        is_true(row.get("Dossier accepte"))
-        or is_true(row.get("Dossier refuse"))
-        or is_true(row.get("Dossier Annule"))
-    ):
-        return 0.0
-
-    total = 0.0
-    for i in range(1, 5):
-        total += to_float(row.get(f"Acompte {i}", 0))
-    return total
-
-df["Escrow Montant"] = df.apply(escrow_amount, axis=1)
+df = get_clients_frame(db)
+database = get_database(db)
 
 # =====================================================
 # ONGLET
@@ -71,7 +48,7 @@ tab1, tab2 = st.tabs([
 # =====================================================
 with tab1:
 
-    escrow_df = df[df["Escrow Montant"] > 0].copy()
+    escrow_df = df[df["Escrow Montant"] > 0]
 
     st.subheader("📋 Dossiers avec montants en Escrow")
 
@@ -115,13 +92,16 @@ with tab1:
 
     if dossier_action:
         row = escrow_df[escrow_df["Dossier N"] == dossier_action].iloc[0]
-        idx = df[df["Dossier N"] == dossier_action].index[0]
-        montant = row["Escrow Montant"]
+        # Index du DataFrame = position du dossier dans db["clients"]
+        idx = int(row.name)
+        montant = float(row["Escrow Montant"])
 
         if st.button("📤 Passer en Escrow à réclamer"):
-            df.loc[idx, "Escrow"] = False
-            df.loc[idx, "Escrow_a_reclamer"] = True
-            df.loc[idx, "Escrow_reclame"] = False
+            fields = {
+                "Escrow": False,
+                "Escrow_a_reclamer": True,
+                "Escrow_reclame": False,
+            }
 
             escrow_history.append({
                 "Dossier N": dossier_action,
@@ -130,18 +110,19 @@ with tab1:
                 "Date": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
             })
 
-            db["clients"] = df.to_dict(orient="records")
             db["escrow_history"] = escrow_history
-            save_database(db)
+            database.update_client_at(idx, fields)
 
             st.success("✔ Escrow passé à réclamer")
             st.rerun()
 
-        if is_true(row.get("Escrow_a_reclamer")):
+        if row["Escrow_a_reclamer"]:
             if st.button("✅ Marquer comme Escrow réclamé"):
-                df.loc[idx, "Escrow"] = False
-                df.loc[idx, "Escrow_a_reclamer"] = False
-                df.loc[idx, "Escrow_reclame"] = True
+                fields = {
+                    "Escrow": False,
+                    "Escrow_a_reclamer": False,
+                    "Escrow_reclame": True,
+                }
 
                 escrow_history.append({
                     "Dossier N": dossier_action,
@@ -150,9 +131,8 @@ with tab1:
                     "Date": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
                 })
 
-                db["clients"] = df.to_dict(orient="records")
                 db["escrow_history"] = escrow_history
-                save_database(db)
+                database.update_client_at(idx, fields)
 
                 st.success("✔ Escrow marqué comme réclamé")
                 st.rerun()
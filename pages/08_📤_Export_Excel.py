@@ -7,7 +7,7 @@ from io import BytesIO
 
 from utils.sidebar import render_sidebar
 from backend.dropbox_utils import load_database
-from utils.status_utils import normalize_bool
+from utils.clients_frame import get_clients_frame
 
 # =====================================================
 # CONFIG
@@ -21,8 +21,10 @@ render_sidebar()
 st.title("📤 Export JSON → Excel (multi-feuilles)")
 
 st.info(
-    "Cet export génère un fichier Excel **complet, horodaté**, "
-    "fidèle à la base JSON, prêt pour audit ou archivage."
+    "Cet export génère un fichier Excel **complet, horodaté**, prêt pour audit "
+    "ou archivage. La feuille **Clients** reprend les dossiers tels qu'enregistrés "
+    "dans la base JSON, avec en plus les colonnes Dossier Parent, Dossier Index, "
+    "Est Parent, Est Fils et Escrow Montant."
 )
 
 # =====================================================
@@ -30,73 +32,44 @@ st.info(
 # =====================================================
 db = load_database()
 
-clients = pd.DataFrame(db.get("clients", []))
 visa = pd.DataFrame(db.get("visa", []))
 tarifs = pd.DataFrame(db.get("tarifs", []))
 tarifs_history = pd.DataFrame(db.get("tarifs_history", []))
 
-if clients.empty:
+if not db.get("clients"):
     st.error("Aucun dossier à exporter.")
     st.stop()
 
 # =====================================================
-# NORMALISATION DOSSIERS (parents / fils)
+# NORMALISATION DOSSIERS (parents / fils) + ESCROW
+# La feuille Clients part des enregistrements bruts de db["clients"]
+# (dates, textes et statuts tels quels). Dossier Parent / Dossier Index
+# et « Escrow Montant » (somme des acomptes tant que dossier NON
+# accepté / refusé / annulé) viennent du DataFrame partagé
+# (utils/clients_frame.py), aligné par position : seules ces colonnes
+# sont ajoutées. Les feuilles Groupes et Escrow, calculées, utilisent
+# les montants typés du DataFrame partagé.
 # =====================================================
-clients["Dossier N"] = clients["Dossier N"].astype(str).str.strip()
-
-def get_parent(dn):
-    return dn.split("-", 1)[0] if "-" in dn else dn
-
-def get_index(dn):
-    if "-" not in dn:
-        return 0
-    try:
-        return int(dn.split("-", 1)[1])
-    except:
-        return 0
-
-clients["Dossier Parent"] = clients["Dossier N"].apply(get_parent)
-clients["Dossier Index"] = clients["Dossier N"].apply(get_index)
-clients["Est Parent"] = clients["Dossier Index"] == 0
-clients["Est Fils"] = clients["Dossier Index"] > 0
-
-# =====================================================
-# ESCROW — REGLE METIER OFFICIELLE
-# Montant = somme des acomptes tant que dossier
-# NON accepté / refusé / annulé
-# =====================================================
-def compute_escrow(row):
-    if (
-        normalize_bool(row.get("Dossier accepte"))
-        or normalize_bool(row.get("Dossier refuse"))
-        or normalize_bool(row.get("Dossier Annule"))
-    ):
-        return 0.0
-
-    total = 0.0
-    for i in range(1, 5):
-        try:
-            total += float(row.get(f"Acompte {i}", 0) or 0)
-        except:
-            pass
-    return total
-
-clients["Escrow Montant"] = clients.apply(compute_escrow, axis=1)
+frame = get_clients_frame(db)
+clients = pd.DataFrame(db["clients"])
+clients["Dossier Parent"] = frame["Dossier Parent"]
+clients["Dossier Index"] = frame["Dossier Index"]
+clients["Est Parent"] = frame["Dossier Index"] == 0
+clients["Est Fils"] = frame["Dossier Index"] > 0
+clients["Escrow Montant"] = frame["Escrow Montant"]
 
 # =====================================================
 # FEUILLE GROUPES (parent + fils)
 # =====================================================
 groups = []
-for parent in clients.loc[clients["Est Fils"], "Dossier Parent"].unique():
-    subset = clients[clients["Dossier Parent"] == parent]
+for parent in frame.loc[frame["Dossier Index"] > 0, "Dossier Parent"].unique():
+    subset = frame[frame["Dossier Parent"] == parent]
     groups.append({
         "Dossier Parent": parent,
         "Nombre dossiers": len(subset),
-        "Honoraires total": subset["Montant honoraires (US $)"].fillna(0).sum(),
-        "Autres frais total": subset["Autres frais (US $)"].fillna(0).sum(),
-        "Total encaissé": sum(
-            subset.get(f"Acompte {i}", 0).fillna(0).sum() for i in range(1, 5)
-        ),
+        "Honoraires total": subset["Montant honoraires (US $)"].sum(),
+        "Autres frais total": subset["Autres frais (US $)"].sum(),
+        "Total encaissé": subset["Total encaissé"].sum(),
         "Escrow total": subset["Escrow Montant"].sum()
     })
 
@@ -105,8 +78,8 @@ groups_df = pd.DataFrame(groups)
 # =====================================================
 # FEUILLE ESCROW
 # =====================================================
-escrow_df = clients[
-    clients["Escrow Montant"] > 0
+escrow_df = frame[
+    frame["Escrow Montant"] > 0
 ][[
     "Dossier N", "Nom", "Visa",
     "Escrow Montant",
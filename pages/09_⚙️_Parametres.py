@@ -4,9 +4,19 @@ import json
 from datetime import datetime
 
 from utils.sidebar import render_sidebar
-from backend.dropbox_utils import get_dbx, load_database, save_database
+from backend.dropbox_utils import (
+    get_format_stats,
+    get_token_stats,
+    json_path,
+    list_database_versions,
+    save_database,
+)
+from backend.storage import get_storage
+from backend import codec
+from backend.file_format import compare_formats, decode_document
+from backend.kpi_store import rebuild_kpis
 from backend.migrate_excel_to_json import convert_all_excels_to_json
-from backend.json_validator import validate_and_fix_json, analyse_incoherences
+from backend.json_validator import boot_database, analyse_incoherences
 
 # ---------------------------------------------------------
 # CONFIG PAGE
@@ -25,7 +35,8 @@ st.title("⚙️ Paramètres & Outils avancés")
 # =========================================================
 st.markdown("### 🧹 Validation automatique de la base")
 
-fixed = validate_and_fix_json()
+# Chargement unique de la page : les onglets réutilisent `boot_db`
+boot_db, fixed = boot_database()
 if fixed:
     st.warning(
         "⚠️ La base JSON contenait des incohérences techniques "
@@ -64,23 +75,75 @@ with tab1:
 with tab2:
     st.subheader("🧪 Diagnostic Dropbox")
 
+    storage = get_storage()
     try:
-        dbx = get_dbx()
-        st.success("Connexion Dropbox OK ✔")
+        storage.metadata(json_path())
+        storage_ok = True
+        st.success(f"Connexion au stockage `{storage.name}` OK ✔")
     except Exception as e:
-        dbx = None
-        st.error(f"❌ Erreur connexion Dropbox : {e}")
+        storage_ok = False
+        st.error(f"❌ Erreur connexion au stockage `{storage.name}` : {e}")
+
+    token_stats = get_token_stats()
+    t1, t2, t3 = st.columns(3)
+    t1.metric("Tokens générés", token_stats["refresh_count"])
+    t2.metric("Rafraîchissements évités", token_stats["refresh_avoided"])
+    t3.metric("Expiration du token (s)", token_stats["expires_in"])
 
     st.write("### 📄 Fichier JSON utilisé")
-    st.code(st.secrets["paths"]["DROPBOX_JSON"])
+    st.code(json_path())
+
+    st.write(f"### 🗄️ Stockage actif : `{storage.name}`")
+    try:
+        versions = list_database_versions(limit=10)
+        st.dataframe(
+            pd.DataFrame([
+                {"Révision": v.rev, "Taille (octets)": v.size, "Modifié le": v.modified}
+                for v in versions
+            ]),
+            use_container_width=True,
+            hide_index=True,
+        )
+    except Exception as e:
+        st.error(f"❌ Impossible de lister les versions : {e}")
+
+    format_stats = get_format_stats()
+    st.write(f"### 📦 Format d'écriture : `{format_stats['active']}` (codec JSON : `{codec.BACKEND}`)")
+    if format_stats["formats"]:
+        st.dataframe(
+            pd.DataFrame([
+                {
+                    "Format": fmt,
+                    "Taille (octets)": v.get("size"),
+                    "Encodage (ms)": round(v["encode_ms"], 2) if "encode_ms" in v else None,
+                    "Décodage (ms)": round(v["decode_ms"], 2) if "decode_ms" in v else None,
+                }
+                for fmt, v in format_stats["formats"].items()
+            ]),
+            use_container_width=True,
+            hide_index=True,
+        )
 
-    if dbx:
+    if st.button("⏱️ Comparer les formats sur la base actuelle"):
+        rows = compare_formats(boot_db)
+        st.dataframe(
+            pd.DataFrame(rows).rename(columns={
+                "format": "Format",
+                "size": "Taille (octets)",
+                "encode_ms": "Encodage (ms)",
+                "decode_ms": "Décodage (ms)",
+            }),
+            use_container_width=True,
+            hide_index=True,
+        )
+        st.caption("Réglage : `FORMAT = \"json-gzip\"` dans la section [storage] des secrets.")
+
+    if storage_ok:
         try:
-            meta, res = dbx.files_download(st.secrets["paths"]["DROPBOX_JSON"])
-            content = res.content.decode("utf-8")
-            json_content = json.loads(content)
+            meta, payload = storage.read(json_path())
+            json_content, fmt = decode_document(payload)
 
-            st.success("Lecture JSON Dropbox OK ✔")
+            st.success(f"Lecture JSON OK ✔ (stockage : {storage.name}, format : {fmt})")
             st.json(json_content)
 
         except Exception as e:
@@ -136,7 +199,8 @@ with tab4:
     st.subheader("📤 Export complet du JSON")
 
     try:
-        db = load_database()
+        # Clés internes (_schema, _rev...) : propres à l'application, pas au fichier
+        db = {k: v for k, v in boot_db.items() if not k.startswith("_")}
 
         export_name = f"database_export_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
 
@@ -158,8 +222,8 @@ with tab4:
 with tab5:
     st.subheader("🩺 Analyse des incohérences métier")
 
+    db = boot_db
     try:
-        db = load_database()
         alerts = analyse_incoherences(db)
 
         if alerts:
@@ -172,6 +236,28 @@ with tab5:
     except Exception as e:
         st.error(f"Erreur analyse JSON : {e}")
 
+    st.markdown("---")
+    st.subheader("📊 Indicateurs du tableau de bord")
+    st.caption("Tenus à jour à chaque enregistrement ; le recalcul complet vérifie qu'ils n'ont pas dérivé.")
+
+    if st.button("🔁 Recalculer les indicateurs"):
+        try:
+            kpis, diffs = rebuild_kpis(db)
+            if diffs:
+                st.warning(f"⚠️ {len(diffs)} indicateur(s) corrigé(s) :")
+                st.dataframe(
+                    pd.DataFrame([
+                        {"Indicateur": k, "Tenu à jour": old, "Recalculé": new}
+                        for k, (old, new) in diffs.items()
+                    ]),
+                    use_container_width=True,
+                    hide_index=True,
+                )
+            else:
+                st.success("✔ Indicateurs identiques au recalcul complet.")
+        except Exception as e:
+            st.error(f"Erreur recalcul des indicateurs : {e}")
+
     st.markdown("---")
     st.subheader("🕓 Historique des modifications")
 
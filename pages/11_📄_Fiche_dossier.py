@@ -3,7 +3,8 @@ import pandas as pd
 
 from utils.sidebar import render_sidebar
 from backend.dropbox_utils import load_database
-from utils.timeline_builder import build_timeline
+from backend.database import get_database
+from utils.timeline_builder import get_event_store
 from utils.pdf_export import export_dossier_pdf
 
 
@@ -66,7 +67,12 @@ labels = sorted(labels, key=lambda x: x.lower())
 selected_label = st.selectbox("Rechercher / sélectionner un dossier", labels)
 selected_dossier_n = selected_label.split(" — ", 1)[0].strip()
 
-dossier = df[df["Dossier N"] == selected_dossier_n].iloc[0].to_dict()
+# Index « Dossier N » : df suit l'ordre de db["clients"]
+pos = get_database(db).position(selected_dossier_n)
+if pos is None:
+    st.error(f"Dossier {selected_dossier_n or '(sans numéro)'} introuvable dans l'index.")
+    st.stop()
+dossier = df.loc[pos].to_dict()
 
 # ---------------------------------------------------------
 # INFOS GÉNÉRALES
@@ -165,7 +171,8 @@ st.dataframe(status_df, use_container_width=True, hide_index=True)
 st.markdown("---")
 st.subheader("🕓 Timeline du dossier (faits datés)")
 
-timeline = build_timeline(dossier)
+# Tranche du journal d'événements de la base (construit une fois par révision)
+timeline = get_event_store(db).timeline(int(pos))
 
 if not timeline:
     st.info("Aucun événement daté enregistré.")
@@ -5,6 +5,7 @@ import pandas as pd
 
 from utils.sidebar import render_sidebar
 from backend.dropbox_utils import load_database
+from utils.dossier_hierarchy import get_hierarchy
 from utils.status_utils import normalize_bool
 from utils.pdf_export_groupe import export_groupe_pdf
 
@@ -51,20 +52,13 @@ df["Dossier Index"] = df["Dossier N"].apply(get_index)
 df["Est Parent"] = df["Dossier Index"] == 0
 df["Est Fils"] = df["Dossier Index"] > 0
 
+# Index parent -> sous-dossiers (construit une fois par version de la base)
+hierarchy = get_hierarchy(db)
+
 # =====================================================
 # PARENTS AYANT AU MOINS UN FILS
 # =====================================================
-parents_avec_fils = (
-    df[df["Est Fils"]]["Dossier Parent"]
-    .dropna()
-    .unique()
-    .tolist()
-)
-
-def sort_parent(x):
-    return int(x) if x.isdigit() else x
-
-parents_avec_fils = sorted(parents_avec_fils, key=sort_parent)
+parents_avec_fils = [str(p) for p in hierarchy.parents_with_children()]
 
 if not parents_avec_fils:
     st.info("Aucun groupe parent + fils détecté.")
@@ -74,14 +68,10 @@ if not parents_avec_fils:
 # LABELS FILTRE : Dossier N + Nom
 # =====================================================
 def label_parent(pid):
-    parent = df[(df["Dossier N"] == pid) & (df["Est Parent"])]
-    if not parent.empty:
-        nom = parent.iloc[0].get("Nom", "")
-        return f"{pid} — {nom}" if nom else pid
-
-    fils = df[(df["Dossier Parent"] == pid) & (df["Est Fils"])]
-    if not fils.empty:
-        nom = fils.iloc[0].get("Nom", "")
+    # Parent s'il existe, sinon premier fils (positions = lignes de df)
+    positions = hierarchy.family_positions(pid)
+    if positions:
+        nom = clients[positions[0]].get("Nom", "")
         return f"{pid} — {nom}" if nom else pid
 
     return pid
@@ -95,7 +85,7 @@ parent_selected = st.selectbox(
 # =====================================================
 # GROUPE SELECTIONNE
 # =====================================================
-group_df = df[df["Dossier Parent"] == parent_selected].copy()
+group_df = df.iloc[hierarchy.family_positions(parent_selected)].copy()
 group_df = group_df.sort_values(["Dossier Index", "Dossier N"])
 
 parent_df = group_df[group_df["Est Parent"]]
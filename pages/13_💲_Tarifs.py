@@ -5,6 +5,10 @@ from datetime import datetime
 
 from utils.sidebar import render_sidebar
 from backend.dropbox_utils import load_database, save_database
+from backend.database import Database
+from utils.clients_frame import get_clients_frame
+from utils.tarif_utils import FEE_COLUMN, get_tariff_index, impact_totals, price_frame, tariff_impact
+from utils.visa_filters import get_visa_referential
 
 # =====================================================
 # CONFIG
@@ -24,15 +28,13 @@ db = load_database()
 
 tarifs = db.get("tarifs", [])
 history = db.get("tarifs_history", [])
-visa_ref = pd.DataFrame(db.get("visa", []))
 
-# Liste unique des visas existants
-if visa_ref.empty or "Visa" not in visa_ref.columns:
+# Liste unique des visas existants (référentiel indexé par version de la base)
+visa_list = get_visa_referential(db).visas()
+if not visa_list:
     st.error("Aucun référentiel Visa trouvé dans la base (db['visa'] est vide ou invalide).")
     st.stop()
 
-visa_list = sorted(visa_ref["Visa"].dropna().astype(str).str.strip().unique().tolist())
-
 # =====================================================
 # OUTILS DOSSIERS (PARENTS & FILS)
 # =====================================================
@@ -104,13 +106,22 @@ if st.button("💾 Enregistrer le tarif", type="primary"):
                 "Modifie_le": now
             })
 
-    # Ajouter le nouveau
-    tarifs.append({
-        "Visa": str(visa),
-        "Tarif": float(tarif_actuel),
-        "Date_effet": str(date_effet),
-        "Actif": True
-    })
+    # Ajouter le nouveau. Même visa et même date d'effet qu'un tarif existant :
+    # celui-ci est remplacé (à date égale, la recherche retient le premier)
+    same_date = next(
+        (t for t in tarifs
+         if str(t.get("Visa", "")).strip() == str(visa).strip() and t.get("Date_effet") == str(date_effet)),
+        None
+    )
+    if same_date is not None:
+        same_date.update({"Tarif": float(tarif_actuel), "Actif": True})
+    else:
+        tarifs.append({
+            "Visa": str(visa),
+            "Tarif": float(tarif_actuel),
+            "Date_effet": str(date_effet),
+            "Actif": True
+        })
 
     db["tarifs"] = tarifs
     db["tarifs_history"] = history
@@ -119,6 +130,50 @@ if st.button("💾 Enregistrer le tarif", type="primary"):
     st.success("✔ Tarif mis à jour avec historique conservé")
     st.rerun()
 
+# =====================================================
+# IMPACT DU TARIF SAISI (dossiers ouverts à partir de la date d'effet)
+# =====================================================
+st.markdown("---")
+st.subheader("📈 Impact du tarif saisi")
+
+inclure_clos = st.checkbox("Inclure les dossiers acceptés / refusés / annulés", value=False)
+
+# Jointure DataFrame enrichi × index des tarifs, en une passe vectorisée
+impact = tariff_impact(
+    get_clients_frame(db), get_tariff_index(db),
+    visa, tarif_actuel, date_effet, only_open=not inclure_clos,
+)
+
+if impact.empty:
+    st.info(f"Aucun dossier facturé différemment de ${tarif_actuel:,.2f} à partir du {date_effet}.")
+else:
+    totaux = impact_totals(impact)
+    i1, i2, i3 = st.columns(3)
+    i1.metric("Dossiers concernés", totaux["dossiers"])
+    i2.metric("Honoraires actuels", f"${totaux['honoraires_actuels']:,.2f}")
+    i3.metric("Variation si appliqué", f"${totaux['delta']:+,.2f}")
+    st.caption(f"Répartition : {totaux['parents']} parent(s) | {totaux['fils']} sous-dossier(s).")
+
+    edited = st.data_editor(
+        impact.assign(Appliquer=False),
+        disabled=list(impact.columns),
+        hide_index=True,
+        use_container_width=True,
+        key=f"impact_{visa}_{tarif_actuel}_{date_effet}",
+    )
+    selection = edited[edited["Appliquer"]]
+
+    if st.button(
+        f"✅ Appliquer ${tarif_actuel:,.2f} aux {len(selection)} dossier(s) cochés",
+        disabled=selection.empty,
+    ):
+        # Un seul enregistrement pour tout le lot
+        count = Database(db).update_many(
+            {num: {FEE_COLUMN: float(tarif_actuel)} for num in selection["Dossier N"]}
+        )
+        st.success(f"✔ Honoraires mis à jour pour {count} dossier(s)")
+        st.rerun()
+
 # =====================================================
 # DOSSIERS CONCERNÉS PAR CE VISA (PARENTS & FILS)
 # =====================================================
@@ -180,6 +235,12 @@ else:
         else:
             df_v = df_v.sort_values(["Date_sort", "Dossier N"], ascending=[False, True])
 
+        # Contrôle : honoraires facturés vs tarif catalogue à la date du dossier
+        # (index des tarifs par visa et date d'effet, un seul appel pour la table ;
+        # vide si aucun tarif n'était en vigueur à cette date)
+        df_v["Tarif_catalogue"] = price_frame(df_v, get_tariff_index(db), date_col="Date_sort", default=float("nan"))
+        df_v["Ecart_tarif"] = df_v["Montant_honoraires_num"] - df_v["Tarif_catalogue"]
+
         # Tableau affiché
         table = df_v[[
             "Dossier Parent",
@@ -189,8 +250,12 @@ else:
             "Nom",
             "Date",
             "Montant_honoraires_num",
+            "Tarif_catalogue",
+            "Ecart_tarif",
         ]].rename(columns={
-            "Montant_honoraires_num": "Montant honoraires (US $)"
+            "Montant_honoraires_num": "Montant honoraires (US $)",
+            "Tarif_catalogue": "Tarif catalogue (US $)",
+            "Ecart_tarif": "Écart (US $)",
         })
 
         st.dataframe(table, use_container_width=True, hide_index=True)
@@ -209,6 +274,10 @@ else:
         nb_fils = int((df_v["Dossier Index"] > 0).sum())
         st.caption(f"Répartition : {nb_parents} parent(s) | {nb_fils} sous-dossier(s).")
 
+        nb_ecarts = int((table["Écart (US $)"].abs() > 0.005).sum())
+        if nb_ecarts:
+            st.caption(f"{nb_ecarts} dossier(s) facturé(s) à un montant différent du tarif catalogue.")
+
 # =====================================================
 # HISTORIQUE
 # =====================================================
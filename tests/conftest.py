@@ -0,0 +1,44 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend import dropbox_utils as du  # noqa: E402
+from backend.storage import LocalBackend, set_storage, storage_config  # noqa: E402
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    """Stockage local vide, snapshot et file d'écriture remis à zéro."""
+    backend = LocalBackend(str(tmp_path))
+    set_storage(backend)
+    du.invalidate_snapshot()
+    du._BASES.clear()
+    du._PENDING_BASES.clear()
+    monkeypatch.setattr(du, "_WRITE_QUEUE", None)
+    yield backend
+    if du._WRITE_QUEUE is not None:
+        du._WRITE_QUEUE.stop(5)
+    set_storage(None)
+
+
+@pytest.fixture
+def write_behind(store, monkeypatch):
+    """Écriture différée activée, délais courts."""
+    cfg = storage_config()["storage"]
+    monkeypatch.setitem(cfg, "WRITE_BEHIND", True)
+    monkeypatch.setitem(cfg, "WRITE_BEHIND_DELAY", 0.05)
+    monkeypatch.setitem(cfg, "WRITE_BEHIND_MAX_DELAY", 0.5)
+    return store
+
+
+@pytest.fixture
+def streamlit_messages(monkeypatch):
+    """Messages st.warning / st.error émis par backend.dropbox_utils."""
+    messages = []
+    monkeypatch.setattr(du.st, "warning", lambda m: messages.append(("warning", m)))
+    monkeypatch.setattr(du.st, "error", lambda m: messages.append(("error", m)))
+    return messages
+
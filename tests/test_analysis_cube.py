@@ -0,0 +1,80 @@
+# Cube d'agrégats de la page Analyses (utils/analysis_cube.py).
+import pytest
+
+from utils import analysis_cube as ac
+from utils import clients_frame as cf
+from utils.analysis_cube import build_cube, cube_totals, get_cube
+from utils.clients_frame import build_clients_frame
+
+
+def _c(n, date, visa, fee, paid, **flags):
+    return {
+        "Dossier N": n, "Date": date, "Categories": "Travail", "Sous-categories": "H",
+        "Visa": visa, "Montant honoraires (US $)": fee, "Autres frais (US $)": 10.0,
+        "Acompte 1": paid, **flags,
+    }
+
+
+CLIENTS = [
+    _c("1", "2024-01-10", "H1B", 1000.0, 400.0),
+    _c("2", "2024-01-20", "H1B", 2000.0, 500.0),
+    _c("3", "2024-02-01", "O1", 3000.0, 3000.0, **{"Dossier accepte": True}),
+    _c("4", "", "O1", 500.0, 0.0, **{"Dossier refuse": True}),
+]
+
+
+@pytest.fixture(autouse=True)
+def empty_caches(monkeypatch):
+    monkeypatch.setitem(ac._CUBE, "key", None)
+    monkeypatch.setitem(cf._FRAME, "key", None)
+
+
+def _cube():
+    return build_cube(build_clients_frame(CLIENTS), today="2024-03-01")
+
+
+def test_identical_dimensions_share_a_row():
+    cube = _cube()
+    h1b = cube[cube["Visa"] == "H1B"]
+    assert len(cube) == 3 and len(h1b) == 1
+    assert h1b["Dossiers"].iloc[0] == 2
+    assert h1b["Montant honoraires (US $)"].iloc[0] == 3000.0
+
+
+def test_totals_match_the_dossiers():
+    frame = build_clients_frame(CLIENTS)
+    totals = cube_totals(_cube())
+    assert totals == {
+        "dossiers": 4,
+        "acceptes": 1,
+        "refuses": 1,
+        "annules": 0,
+        "total_facture": float(frame["Total facturé"].sum()),
+        "total_encaisse": float(frame["Total encaissé"].sum()),
+        "solde": float(frame["Solde"].sum()),
+    }
+
+
+def test_slice_totals():
+    cube = _cube()
+    totals = cube_totals(cube[cube["Visa"] == "O1"])
+    assert (totals["dossiers"], totals["total_encaisse"]) == (2, 3000.0)
+
+
+def test_undated_dossiers_get_an_empty_period():
+    cube = _cube()
+    undated = cube[cube["Année"] == 0]
+    assert undated["Mois"].tolist() == [""]
+    assert sorted(cube.loc[cube["Année"] > 0, "Mois"]) == ["2024-01", "2024-02"]
+
+
+def test_escrow_aging_uses_today():
+    cube = _cube()
+    assert cube.loc[cube["Visa"] == "H1B", "Ancienneté escrow"].iloc[0] == "31–60 jours"
+
+
+def test_cube_is_shared_per_revision():
+    db = {"clients": CLIENTS, "_rev": "r1"}
+    cube = get_cube(db)
+    assert get_cube({"clients": CLIENTS, "_rev": "r1"}) is cube
+    assert get_cube({"clients": CLIENTS, "_rev": "r2"}) is not cube
@@ -0,0 +1,26 @@
+# Moteur colonne (backend/clean_columnar.py) : même résultat que clean_record.
+from backend.clean_columnar import clean_records_columnar
+from backend.clean_json import clean_record
+
+
+def test_integer_overflow_matches_row_path():
+    rows = [{"Dossier N": str(i), "Acompte 1": i, "Acompte 2": True} for i in range(50)]
+    rows[3]["Acompte 1"] = 10 ** 400
+    out = clean_records_columnar(rows)
+    assert out == [clean_record(r) for r in rows]
+    assert out[3]["Acompte 1"] == 0.0
+    assert out[4]["Acompte 1"] == 4.0
+
+
+def test_non_finite_amounts_match_row_path():
+    from backend.clean_json import VALID_COLUMNS
+
+    clean = clean_record({"Dossier N": "1"})
+    rows = [dict(clean, **{"Dossier N": str(i)}) for i in range(50)]
+    rows[1]["Acompte 1"] = float("nan")
+    rows[2]["Acompte 2"] = float("inf")
+    rows[3]["Acompte 3"] = "nan"
+    out = clean_records_columnar(rows)
+    assert out == [clean_record(r) for r in rows]
+    assert [out[i][c] for i, c in ((1, "Acompte 1"), (2, "Acompte 2"), (3, "Acompte 3"))] == [0.0] * 3
+    assert list(out[1]) == list(VALID_COLUMNS)
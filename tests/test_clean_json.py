@@ -0,0 +1,82 @@
+# Nettoyage de la base (backend/clean_json.py) : confiance dans le tampon du schéma.
+import math
+
+import pytest
+
+from backend import clean_json, codec
+from backend import dropbox_utils as du
+from backend.clean_json import SCHEMA_KEY, SCHEMA_STAMP, clean_database, clean_record
+
+
+def _stamped(*clients):
+    return {"clients": list(clients), SCHEMA_KEY: SCHEMA_STAMP}
+
+
+def test_stamped_clean_records_are_kept_as_is():
+    item = clean_record({"Dossier N": "1", "Nom": "a", "Acompte 1": 100})
+    out = clean_database(_stamped(item), trusted=True)
+    assert out["clients"][0] is item
+    assert out[SCHEMA_KEY] == SCHEMA_STAMP
+
+
+@pytest.mark.parametrize(
+    "col, bad, expected",
+    [
+        ("Acompte 1", "150.5", 150.5),
+        ("Acompte 1", 100, 100.0),
+        ("Acompte 1", float("nan"), 0.0),
+        ("Montant honoraires (US $)", float("inf"), 0.0),
+        ("Escrow", "oui", True),
+        ("RFE", 0, False),
+        ("Commentaire", None, ""),
+    ],
+)
+def test_stamp_does_not_hide_bad_values(col, bad, expected):
+    item = dict(clean_record({"Dossier N": "1"}), **{col: bad})
+    out = clean_database(_stamped(item), trusted=True)["clients"][0]
+    assert out[col] == expected
+    assert type(out[col]) is type(expected)
+
+
+def test_wrong_stamp_is_not_trusted():
+    item = dict(clean_record({"Dossier N": "1"}), Escrow="oui")
+    doc = {"clients": [item], SCHEMA_KEY: "0:ancien"}
+    assert clean_database(doc, trusted=True)["clients"][0]["Escrow"] is True
+
+
+def test_unchanged_reference_record_is_not_recleaned():
+    ref = clean_record({"Dossier N": "1", "Nom": "a"})
+    edited = dict(ref, Acompte2=None)
+    out = clean_database({"clients": [dict(ref), edited]}, reference={"clients": [ref]})
+    assert out["clients"][0] == ref
+    assert "Acompte2" not in out["clients"][1]
+
+
+def test_clean_record_replaces_nan_amounts():
+    out = clean_record({"Dossier N": "1", "Acompte 4": float("nan")})
+    assert out["Acompte 4"] == 0.0 and not math.isnan(out["Acompte 4"])
+
+
+def test_saved_file_carries_the_stamp(store):
+    du.save_database({"clients": [{"Dossier N": "1", "Escrow": "oui"}]})
+    saved = codec.loads(store.read(du.json_path())[1])
+    assert saved[SCHEMA_KEY] == SCHEMA_STAMP
+    assert saved["clients"][0]["Escrow"] is True
+
+
+def test_unstamped_file_is_cleaned_on_load(store):
+    clean = clean_record({"Dossier N": "1"})
+    store.write(du.json_path(), codec.dumps({"clients": [dict(clean, Escrow="oui")]}))
+    assert du.load_database()["clients"][0]["Escrow"] is True
+
+
+def test_only_changed_records_are_recleaned(monkeypatch):
+    ref = [clean_record({"Dossier N": str(i)}) for i in range(5)]
+    edited = [dict(r) for r in ref]
+    edited[2]["Acompte 1"] = "10"
+    seen = []
+    monkeypatch.setattr(clean_json, "clean_record", lambda r: seen.append(r["Dossier N"]) or clean_record(r))
+
+    out = clean_database({"clients": edited}, reference={"clients": ref})
+    assert seen == ["2"]
+    assert out["clients"][2]["Acompte 1"] == 10.0
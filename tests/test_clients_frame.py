@@ -0,0 +1,75 @@
+# DataFrame enrichi des dossiers (utils/clients_frame.py).
+import math
+
+import pandas as pd
+import pytest
+
+from utils import clients_frame as cf
+from utils.clients_frame import DERIVED_COLUMNS, build_clients_frame, clients_frame_copy, get_clients_frame
+
+CLIENTS = [
+    {
+        "Dossier N": 12937, "Nom": " Alice ", "Date": "2024-03-05", "Visa": "H1B",
+        "Montant honoraires (US $)": "1000", "Autres frais (US $)": 50.0,
+        "Acompte 1": 300.0, "Acompte 2": "200", "Escrow": "oui",
+    },
+    {
+        "Dossier N": "12937-1", "Nom": "Bob", "Date": "pas une date",
+        "Montant honoraires (US $)": None, "Acompte 1": 100.0,
+        "Dossier accepté": True, "Escrow_a_reclamer": True,
+    },
+]
+
+
+@pytest.fixture(autouse=True)
+def empty_cache(monkeypatch):
+    monkeypatch.setitem(cf._FRAME, "key", None)
+
+
+def test_types_and_totals():
+    df = build_clients_frame(CLIENTS)
+    assert df["Dossier N"].tolist() == ["12937", "12937-1"]
+    assert df["Nom"].tolist() == ["Alice", "Bob"]
+    assert df["Montant honoraires (US $)"].tolist() == [1000.0, 0.0]
+    assert df["Total facturé"].tolist() == [1050.0, 0.0]
+    assert df["Total encaissé"].tolist() == [500.0, 100.0]
+    assert df["Solde"].tolist() == [550.0, -100.0]
+    assert df["Escrow"].tolist() == [True, False]
+    assert set(DERIVED_COLUMNS) <= set(df.columns)
+
+
+def test_dates_and_periods():
+    df = build_clients_frame(CLIENTS)
+    assert df["Date"].iloc[0] == pd.Timestamp("2024-03-05")
+    assert pd.isna(df["Date"].iloc[1])
+    assert df["Année"].iloc[0] == 2024 and math.isnan(df["Année"].iloc[1])
+    assert df["Mois"].iloc[0] == "2024-03"
+
+
+def test_status_aliases_and_family():
+    df = build_clients_frame(CLIENTS)
+    assert df["Dossier accepte"].tolist() == [False, True]
+    assert df["Dossier Parent"].tolist() == ["12937", "12937"]
+    assert df["Dossier Index"].tolist() == [0, 1]
+    assert df["Escrow Montant"].tolist() == [500.0, 0.0]
+    assert df["Escrow État"].tolist() == ["Escrow actif", "Escrow à réclamer"]
+
+
+def test_empty_base():
+    df = build_clients_frame([])
+    assert df.empty and "Escrow Montant" in df.columns
+
+
+def test_frame_is_shared_per_revision():
+    db = {"clients": CLIENTS, "_rev": "r1"}
+    frame = get_clients_frame(db)
+    assert get_clients_frame({"clients": CLIENTS, "_rev": "r1"}) is frame
+    assert get_clients_frame({"clients": CLIENTS, "_rev": "r2"}) is not frame
+    assert get_clients_frame({"clients": CLIENTS}) is not get_clients_frame({"clients": CLIENTS})
+
+
+def test_copy_is_independent():
+    db = {"clients": CLIENTS, "_rev": "r1"}
+    copy = clients_frame_copy(db)
+    copy.loc[0, "Nom"] = "modifié"
+    assert get_clients_frame(db).loc[0, "Nom"] == "Alice"
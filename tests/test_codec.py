@@ -0,0 +1,83 @@
+# Codec JSON (backend/codec.py) : orjson s'il est installé, sinon json.
+import importlib
+import math
+import sys
+from datetime import date, datetime
+from decimal import Decimal
+
+import numpy as np
+import pytest
+
+from backend import codec
+from backend import dropbox_utils as du
+
+
+@pytest.fixture(params=["installed", "stdlib"])
+def json_codec(request):
+    """Le codec tel qu'importé, puis rechargé sans orjson (repli json)."""
+    if request.param == "installed":
+        yield codec
+        return
+    saved = sys.modules.get("orjson")
+    sys.modules["orjson"] = None
+    try:
+        yield importlib.reload(codec)
+    finally:
+        if saved is None:
+            del sys.modules["orjson"]
+        else:
+            sys.modules["orjson"] = saved
+        importlib.reload(codec)
+
+
+def test_round_trip(json_codec):
+    doc = {"clients": [{"Dossier N": "1", "Nom": "Élodie", "Acompte 1": 150.5, "RFE": True}]}
+    assert json_codec.loads(json_codec.dumps(doc)) == doc
+    assert json_codec.loads(json_codec.dumps(doc, indent=True)) == doc
+
+
+def test_unusual_types_are_serialised(json_codec):
+    doc = {
+        "date": date(2024, 1, 2),
+        "datetime": datetime(2024, 1, 2, 3, 4, 5),
+        "decimal": Decimal("1.5"),
+        "set": {1},
+        "np_float": np.float64(2.5),
+        "np_bool": np.bool_(True),
+    }
+    out = json_codec.loads(json_codec.dumps(doc))
+    assert out == {
+        "date": "2024-01-02",
+        "datetime": "2024-01-02T03:04:05",
+        "decimal": 1.5,
+        "set": [1],
+        "np_float": 2.5,
+        "np_bool": True,
+    }
+
+
+def test_unknown_type_is_refused(json_codec):
+    with pytest.raises(TypeError):
+        json_codec.dumps({"x": object()})
+
+
+def test_nan_and_infinity_files_are_readable(json_codec):
+    # Fichier écrit par json.dumps (allow_nan) : orjson le refuse, repli json
+    out = json_codec.loads(b'{"a": NaN, "b": Infinity, "c": 1}')
+    assert math.isnan(out["a"]) and out["b"] == math.inf and out["c"] == 1
+
+
+def test_nan_written_by_either_backend_is_readable(json_codec):
+    raw = json_codec.dumps({"a": float("nan")})
+    value = json_codec.loads(raw)["a"]
+    # orjson écrit null, json écrit NaN : les deux se relisent
+    assert value is None or math.isnan(value)
+
+
+def test_nan_amount_is_cleaned_on_load(store):
+    du.save_database({"clients": [{"Dossier N": "1", "Acompte 1": float("nan")}]})
+    du.invalidate_snapshot()
+    assert du.load_database()["clients"][0]["Acompte 1"] == 0.0
+
+    store.write(du.json_path(), b'{"clients": [{"Dossier N": "2", "Acompte 1": NaN}]}', overwrite=True)
+    assert du.load_database()["clients"][0]["Acompte 1"] == 0.0
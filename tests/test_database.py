@@ -0,0 +1,84 @@
+# Index « Dossier N » de backend/database.py.
+import pytest
+
+from backend import database as dbmod
+from backend.database import Database, get_database, normalize_key
+
+
+def _db(*nums, rev="r1"):
+    return {"clients": [{"Dossier N": n, "Nom": f"n{i}"} for i, n in enumerate(nums)], "_rev": rev}
+
+
+@pytest.fixture(autouse=True)
+def no_save(monkeypatch):
+    saves = []
+    monkeypatch.setattr(dbmod, "save_database", lambda db: saves.append(db))
+    monkeypatch.setitem(dbmod._INDEX, "key", None)
+    return saves
+
+
+def test_normalize_key():
+    assert normalize_key(12937) == normalize_key(" 12937 ") == "12937"
+    assert normalize_key(None) == ""
+
+
+def test_lookup_by_number():
+    d = Database(_db("1", 2, " 3-1 ", None))
+    assert d.position("2") == 1
+    assert d.get_client("3-1")["Nom"] == "n2"
+    assert "4" not in d and 1 in d
+    assert d.position(None) is None
+    assert d.get_many(["1", "3-1", "9"]) == {"1": d.db["clients"][0], "3-1": d.db["clients"][2]}
+
+
+def test_first_duplicate_wins():
+    d = Database(_db("1", "1"))
+    assert d.position("1") == 0
+
+
+def test_renumbering_moves_the_index_entry(no_save):
+    d = Database(_db("1", "2"))
+    d.update_client("1", {"Dossier N": "5"})
+    assert d.position("5") == 0 and d.position("1") is None
+    assert len(no_save) == 1
+
+
+def test_update_many_saves_once(no_save):
+    d = Database(_db("1", "2", "3"))
+    count = d.update_many({"1": {"Nom": "a"}, "3": {"Nom": "c"}, "9": {"Nom": "x"}})
+    assert count == 2 and len(no_save) == 1
+    assert [c["Nom"] for c in d.db["clients"]] == ["a", "n1", "c"]
+    assert d.update_many([]) == 0 and len(no_save) == 1
+
+
+def test_add_and_delete_keep_positions():
+    d = Database(_db("1", "2", "3"))
+    d.add_client({"Dossier N": "4"})
+    assert d.position("4") == 3
+    d.delete_client("2")
+    assert [d.position(n) for n in ("1", "3", "4")] == [0, 1, 2]
+    assert "2" not in d
+
+
+def test_index_is_shared_per_revision():
+    db = _db("1", "2")
+    first = get_database(db)
+    second = get_database(_db("1", "2"))
+    assert second._index is first._index
+    assert get_database(_db("1", "2", rev="r2"))._index is not first._index
+    assert get_database(_db("1", "2", "3"))._index is not first._index
+
+
+def test_changes_do_not_touch_the_shared_index():
+    shared = get_database(_db("1", "2"))._index
+    d = get_database(_db("1", "2"))
+    d.update_client("1", {"Dossier N": "7"})
+    d.add_client({"Dossier N": "8"})
+    assert shared == {"1": 0, "2": 1}
+    assert get_database(_db("1", "2")).position("7") is None
+    assert d.position("7") == 0 and d.position("8") == 2
+
+
+def test_database_without_revision_is_not_cached():
+    get_database({"clients": [{"Dossier N": "1"}]})
+    assert dbmod._INDEX["key"] is None
@@ -0,0 +1,13 @@
+# Index parent -> sous-dossiers (utils/dossier_hierarchy.py).
+import pytest
+
+from utils.dossier_hierarchy import DossierHierarchy
+
+
+@pytest.mark.parametrize("parent", [12937, "12937", "12937.0", 12937.0, " 12937 "])
+def test_family_accepts_float_like_parent_numbers(parent):
+    hierarchy = DossierHierarchy([
+        {"Dossier N": "12937"}, {"Dossier N": "12937-1"}, {"Dossier N": "129370"},
+    ])
+    assert hierarchy.family_ids(parent) == ["12937", "12937-1"]
+    assert hierarchy.next_child_number(parent) == "12937-2"
@@ -0,0 +1,55 @@
+# Moteur Escrow vectorisé (utils/escrow_utils.py).
+import pandas as pd
+
+from utils.escrow_utils import (
+    ESCROW_A_RECLAMER,
+    ESCROW_ACTIF,
+    ESCROW_NONE,
+    ESCROW_RECLAME,
+    compute_escrow,
+    compute_escrow_amount,
+    escrow_aging,
+    escrow_totals,
+)
+
+ROWS = [
+    {"Acompte 1": 100.0, "Acompte 2": "50"},                                     # ouvert
+    {"Acompte 1": 200.0, "Dossier accepte": True, "Escrow_a_reclamer": True},    # à réclamer
+    {"Acompte 1": 300.0, "Dossier refuse": "oui", "Escrow_reclame": True},       # réclamé
+    {"Acompte 1": 400.0, "Dossier Annule": True},                                # hors escrow
+]
+
+
+def test_amount_and_state_per_dossier():
+    out = compute_escrow(pd.DataFrame(ROWS, index=[10, 11, 12, 13]))
+    assert out.index.tolist() == [10, 11, 12, 13]
+    assert out["Escrow Montant"].tolist() == [150.0, 0.0, 0.0, 0.0]
+    assert out["Escrow État"].tolist() == [ESCROW_ACTIF, ESCROW_A_RECLAMER, ESCROW_RECLAME, ESCROW_NONE]
+
+
+def test_totals_by_state():
+    assert escrow_totals(pd.DataFrame(ROWS)) == {
+        ESCROW_ACTIF: 150.0,
+        ESCROW_A_RECLAMER: 200.0,
+        ESCROW_RECLAME: 300.0,
+    }
+
+
+def test_missing_columns():
+    out = compute_escrow(pd.DataFrame([{"Nom": "a"}]))
+    assert out["Escrow Montant"].tolist() == [0.0]
+    assert out["Escrow État"].tolist() == [ESCROW_ACTIF]
+
+
+def test_single_dossier_matches_frame():
+    assert [compute_escrow_amount(r) for r in ROWS] == [150.0, 0.0, 0.0, 0.0]
+
+
+def test_aging_uses_send_date_then_dossier_date():
+    df = pd.DataFrame([
+        {"Date envoi": "2024-06-20", "Date": "2024-01-01"},
+        {"Date envoi": "", "Date": "2024-05-15"},
+        {"Date envoi": None, "Date": "2024-01-01"},
+        {"Date envoi": None, "Date": None},
+    ])
+    assert escrow_aging(df, today="2024-07-01").tolist() == ["0–30 jours", "31–60 jours", "60+ jours", ""]
@@ -0,0 +1,71 @@
+# Index de facettes des filtres en cascade (utils/facet_index.py).
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils import clients_frame as cf
+from utils import facet_index as fi
+from utils.facet_index import FacetIndex, get_clients_facets
+
+# 70 lignes : les bitmaps couvrent plus d'un mot de 64 bits
+DF = pd.DataFrame({
+    "Categories": (["Travail", "Famille", ""] * 24)[:70],
+    "Visa": (["H1B", "O1", "K1", "H1B", "E2"] * 14)[:70],
+    "RFE": [i % 4 == 0 for i in range(70)],
+    "Dossiers": [i % 3 + 1 for i in range(70)],
+})
+
+
+def _expected(mask, weights=None):
+    return int(mask.sum()) if weights is None else int(DF.loc[mask, weights].sum())
+
+
+@pytest.fixture
+def facets():
+    return FacetIndex(DF, ["Categories", "Visa", "RFE"])
+
+
+def test_select_matches_pandas_masks(facets):
+    bm = facets.select({"Categories": "Travail", "Visa": "H1B"})
+    mask = (DF["Categories"] == "Travail") & (DF["Visa"] == "H1B")
+    assert facets.count(bm) == _expected(mask)
+    assert facets.rows(bm).tolist() == np.flatnonzero(mask).tolist()
+
+
+def test_no_filter_and_unknown_value(facets):
+    assert facets.count(facets.select({"Visa": None})) == 70
+    assert facets.count(facets.select({"Visa": "inconnu"})) == 0
+
+
+def test_options_are_counted_within_the_selection(facets):
+    within = facets.select({"Categories": "Famille"})
+    expected = DF[DF["Categories"] == "Famille"]["Visa"].value_counts()
+    assert facets.options("Visa", within) == sorted(expected.items())
+
+
+def test_empty_values_are_not_options(facets):
+    assert [v for v, _ in facets.options("Categories")] == ["Famille", "Travail"]
+    # False est « vide » : seul True est proposé pour un statut
+    assert facets.options("RFE") == [(True, int(DF["RFE"].sum()))]
+
+
+def test_labels(facets):
+    assert facets.labels("Visa")["E2"] == "E2 (14)"
+
+
+def test_weighted_counts():
+    facets = FacetIndex(DF, ["Visa"], weights="Dossiers")
+    bm = facets.select({"Visa": "O1"})
+    assert facets.count(bm) == _expected(DF["Visa"] == "O1", "Dossiers")
+
+
+def test_clients_facets_follow_the_shared_frame(monkeypatch):
+    monkeypatch.setitem(cf._FRAME, "key", None)
+    monkeypatch.setattr(fi, "_FACETS", {})
+    clients = [{"Dossier N": str(i), "Visa": "H1B", "Date": "2024-01-01" if i else ""} for i in range(3)]
+    db = {"clients": clients, "_rev": "r1"}
+
+    facets = get_clients_facets(db)
+    assert get_clients_facets({"clients": clients, "_rev": "r1"}) is facets
+    assert facets.options("Année") == [(2024, 2)]
+    assert get_clients_facets({"clients": clients, "_rev": "r2"}) is not facets
@@ -0,0 +1,67 @@
+# Formats d'écriture de database.json (backend/file_format.py).
+import gzip
+
+import pytest
+
+from backend import codec
+from backend import dropbox_utils as du
+from backend.file_format import (
+    MAGIC,
+    available_formats,
+    compare_formats,
+    decode_document,
+    encode_document,
+)
+from backend.storage import StorageError, storage_config
+
+DOC = {
+    "clients": [{"Dossier N": "1", "Nom": "Élodie", "Acompte 1": 150.5, "RFE": True}],
+    "visa": [],
+}
+
+
+@pytest.mark.parametrize("fmt", available_formats())
+def test_round_trip(fmt):
+    raw = encode_document(DOC, fmt)
+    # JSON compact : sans en-tête, relu comme du JSON ordinaire
+    assert decode_document(raw) == (DOC, "json" if fmt == "json-compact" else fmt)
+
+
+def test_json_formats_have_no_header():
+    assert codec.loads(encode_document(DOC, "json")) == DOC
+    compact = encode_document(DOC, "json-compact")
+    assert not compact.startswith(MAGIC) and b"\n" not in compact
+
+
+def test_compressed_formats_carry_a_header():
+    assert encode_document(DOC, "json-gzip").startswith(MAGIC + b"json-gzip\n")
+
+
+def test_headerless_gzip_is_detected():
+    raw = gzip.compress(codec.dumps(DOC))
+    assert decode_document(raw) == (DOC, "json-gzip")
+
+
+def test_unknown_format_is_refused():
+    with pytest.raises(StorageError):
+        encode_document(DOC, "xml")
+    with pytest.raises(StorageError):
+        decode_document(MAGIC + b"xml\n{}")
+
+
+def test_compare_formats_lists_available_formats():
+    rows = compare_formats(DOC, repeat=1)
+    assert [r["format"] for r in rows] == available_formats()
+    assert all(r["size"] > 0 for r in rows)
+
+
+def test_saved_file_follows_the_configured_format(store, monkeypatch):
+    monkeypatch.setitem(storage_config()["storage"], "FORMAT", "json-gzip")
+    du.save_database({"clients": [{"Dossier N": "1", "Nom": "a"}]})
+    raw = store.read(du.json_path())[1]
+    assert raw.startswith(MAGIC + b"json-gzip\n")
+
+    # Un ancien fichier JSON reste lisible quel que soit le réglage
+    du.invalidate_snapshot()
+    store.write(du.json_path(), codec.dumps({"clients": [{"Dossier N": "2"}]}), overwrite=True)
+    assert [c["Dossier N"] for c in du.load_database()["clients"]] == ["2"]
@@ -0,0 +1,92 @@
+# Mode journal (backend/journal.py, backend/dropbox_utils.py) : rejeu des
+# patchs et report du journal lors de la réécriture de la base.
+import pytest
+
+from backend import dropbox_utils as du
+from backend.clean_json import clean_database
+from backend.journal import apply_journal, diff_database, encode_patches, journal_header, parse_journal
+from backend.storage import StorageConflict
+
+
+def _set(key, **fields):
+    return {"ts": "2026-01-01 00:00:00", "op": "set", "key": key, "fields": fields}
+
+
+def test_partial_patch_on_deleted_dossier_is_skipped():
+    base = clean_database({"clients": [{"Dossier N": "1", "Nom": "a"}, {"Dossier N": "2", "Nom": "b"}]})
+    patches = [
+        {"ts": "2026-01-01 00:00:00", "op": "delete", "key": "2"},
+        _set("2", **{"Acompte 1": 100.0}),       # session qui ne savait pas
+        _set("3", **{"Dossier N": "3", "Nom": "c"}),  # création : dossier complet
+    ]
+    out = apply_journal(base, patches)
+    assert [c["Dossier N"] for c in out["clients"]] == ["1", "3"]
+
+
+def test_replayed_journal_is_cleaned():
+    base = clean_database({"clients": [{"Dossier N": "1", "Nom": "a"}]})
+    out = du._replay(base, [_set("2", **{"Dossier N": "2", "Nom": "b", "Acompte 1": "12.5"})])
+    created = out["clients"][1]
+    assert created["Acompte 1"] == 12.5
+    assert set(created) == set(out["clients"][0])
+
+
+def _journal(header, patches):
+    return journal_header(header) + encode_patches(patches)
+
+
+@pytest.fixture
+def old_state():
+    # Snapshot lu sur la base "OLD", journal vide
+    return {"base_rev": "OLD", "journal": journal_header("OLD"), "journal_rev": None}
+
+
+def test_reset_journal_carries_patches_added_since_read(store, old_state):
+    store.write(du.journal_path(), _journal("OLD", [_set("1", Nom="x")]))
+    _, body, carried = du._reset_journal(store, "NEW", old_state)
+    assert carried == [_set("1", Nom="x")]
+    assert parse_journal(body) == ("NEW", carried)
+
+
+def test_reset_journal_keeps_journal_already_on_new_base(store, old_state):
+    store.write(du.journal_path(), _journal("NEW", [_set("1", Nom="x"), _set("1", Nom="y")]))
+    _, body, carried = du._reset_journal(store, "NEW", old_state)
+    assert carried == [_set("1", Nom="x"), _set("1", Nom="y")]
+    assert parse_journal(body) == ("NEW", carried)
+
+
+def test_reset_journal_on_unknown_base_raises(store, old_state):
+    store.write(du.journal_path(), _journal("OTHER", [_set("1", Nom="x")]))
+    with pytest.raises(StorageConflict):
+        du._reset_journal(store, "NEW", old_state)
+    # Le journal de l'autre session est intact
+    assert parse_journal(store.read(du.journal_path())[1])[1] == [_set("1", Nom="x")]
+
+
+def test_duplicate_numbers_need_a_full_write():
+    old = {"clients": [{"Dossier N": "1", "Nom": "a"}]}
+    new = {"clients": [{"Dossier N": "1", "Nom": "a"}, {"Dossier N": "1", "Nom": "doublon"}]}
+    assert diff_database(old, new) is None
+    assert diff_database(new, old) is None
+
+
+@pytest.fixture
+def journal_mode(store, monkeypatch):
+    monkeypatch.setitem(du.storage_config()["storage"], "JOURNAL", True)
+    return store
+
+
+def test_first_save_initialises_an_empty_store(journal_mode, streamlit_messages):
+    du.save_database({"clients": [{"Dossier N": "1", "Nom": "a"}]})
+    assert streamlit_messages == []
+
+    du.invalidate_snapshot()
+    db = du.load_database()
+    assert [c["Nom"] for c in db["clients"]] == ["a"]
+
+    # Les enregistrements suivants passent par le journal
+    db["clients"][0]["Nom"] = "b"
+    du.save_database(db)
+    du.invalidate_snapshot()
+    assert [c["Nom"] for c in du.load_database()["clients"]] == ["b"]
+    assert parse_journal(journal_mode.read(du.journal_path())[1])[1]
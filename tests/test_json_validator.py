@@ -0,0 +1,37 @@
+# Validation au démarrage (backend/json_validator.py).
+import json
+
+from backend import dropbox_utils as du
+from backend import json_validator
+from backend.storage import StorageError
+
+BROKEN = {"clients": [{"Dossier N": "1", "Nom": "a", "Date envoi": "pas une date"}]}
+
+
+def _write(store, doc):
+    store.write(du.json_path(), json.dumps(doc).encode("utf-8"), overwrite=True)
+
+
+def test_failed_repair_is_not_reported_as_fixed(store, streamlit_messages, monkeypatch):
+    _write(store, BROKEN)
+    monkeypatch.setattr(json_validator, "_VALIDATED_REVS", set())
+
+    write = store.write
+    failures = [StorageError("indisponible")]
+
+    def flaky_write(*args, **kwargs):
+        if failures:
+            raise failures.pop()
+        return write(*args, **kwargs)
+
+    monkeypatch.setattr(store, "write", flaky_write)
+    db, fixed = json_validator.boot_database()
+    assert not fixed
+    assert db.get(du.REV_KEY) not in json_validator._VALIDATED_REVS
+    assert [kind for kind, _ in streamlit_messages] == ["error"]
+
+    # Stockage revenu : la réparation est refaite et enregistrée
+    db, fixed = json_validator.boot_database()
+    assert fixed
+    assert db["clients"][0]["Date envoi"] in ("", None)
+    assert db.get(du.REV_KEY) in json_validator._VALIDATED_REVS
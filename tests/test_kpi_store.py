@@ -0,0 +1,55 @@
+# Indicateurs du tableau de bord (backend/kpi_store.py) : tenus à jour en
+# mémoire à l'enregistrement, écrits à la première lecture.
+import pytest
+
+from backend import dropbox_utils as du
+from backend import kpi_store
+from backend.codec import sample_document
+
+
+@pytest.fixture
+def kpi_writes(store, monkeypatch):
+    kpi_store._KPIS.clear()
+    monkeypatch.setitem(kpi_store._UNPERSISTED, "rev", None)
+    writes = []
+    write = store.write
+
+    def spy(path, *args, **kwargs):
+        if path == kpi_store.kpi_path():
+            writes.append(path)
+        return write(path, *args, **kwargs)
+
+    monkeypatch.setattr(store, "write", spy)
+    return writes
+
+
+def test_save_does_not_write_kpi_file(kpi_writes, streamlit_messages):
+    du.save_database(sample_document(50))
+    db = du.load_database()
+    db["clients"][0]["Acompte 1"] = 1234.0
+    du.save_database(db)
+    assert kpi_writes == []
+
+    db = du.load_database()
+    kpis = kpi_store.get_kpis(db)
+    assert kpis == kpi_store.compute_kpis(db["clients"])
+    assert len(kpi_writes) == 1
+
+    # Déjà écrit pour cette révision
+    kpi_store.get_kpis(db)
+    assert len(kpi_writes) == 1
+    assert streamlit_messages == []
+
+
+def test_persisted_kpis_are_read_back(kpi_writes, streamlit_messages):
+    du.save_database(sample_document(50))
+    db = du.load_database()
+    db["clients"][1]["Dossier accepte"] = True
+    du.save_database(db)
+    db = du.load_database()
+    kpis = kpi_store.get_kpis(db)
+
+    # Autre process : rien en mémoire, le fichier correspond à la révision
+    kpi_store._KPIS.clear()
+    assert kpi_store.get_kpis(db) == kpis
+    assert len(kpi_writes) == 1
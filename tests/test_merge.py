@@ -0,0 +1,63 @@
+# Fusion à trois voies (backend/merge.py).
+import pytest
+
+from backend.merge import merge_clients, merge_databases
+
+
+def _c(n, nom, **fields):
+    return {"Dossier N": n, "Nom": nom, **fields}
+
+
+def test_duplicate_numbers_are_kept():
+    base = [_c("1", "a"), _c("1", "doublon"), _c("2", "b")]
+    local = [_c("1", "a"), _c("1", "doublon-local"), _c("2", "b")]
+    remote = [_c("1", "a-remote"), _c("1", "doublon"), _c("2", "b")]
+
+    merged, conflicts = merge_clients(base, local, remote)
+    assert merged == [_c("1", "a-remote"), _c("1", "doublon-local"), _c("2", "b")]
+    assert conflicts == []
+
+
+def test_duplicate_conflict_is_labelled():
+    base = [_c("1", "a"), _c("1", "doublon")]
+    local = [_c("1", "a"), _c("1", "local")]
+    remote = [_c("1", "a"), _c("1", "remote")]
+
+    merged, conflicts = merge_clients(base, local, remote)
+    assert merged == [_c("1", "a"), _c("1", "local")]
+    assert conflicts == ["1 (2e)"]
+
+
+def test_merge_requires_a_base():
+    with pytest.raises(ValueError):
+        merge_databases(None, {"clients": []}, {"clients": []})
+
+
+def test_table_changed_on_both_sides_is_a_conflict():
+    base = {"clients": [], "visa": [{"Visa": "A"}]}
+    local = {"clients": [], "visa": [{"Visa": "A-local"}]}
+    remote = {"clients": [], "visa": [{"Visa": "A-remote"}]}
+
+    merged, conflicts = merge_databases(base, local, remote)
+    assert merged["visa"] == [{"Visa": "A-local"}]
+    assert conflicts == ["table visa"]
+
+
+def test_append_only_tables_keep_both_additions():
+    base = {"clients": [], "history": [1]}
+    local = {"clients": [], "history": [1, 2]}
+    remote = {"clients": [], "history": [1, 3]}
+
+    merged, conflicts = merge_databases(base, local, remote)
+    assert merged["history"] == [1, 3, 2]
+    assert conflicts == []
+
+
+def test_dossiers_without_number_are_kept_from_both_sides():
+    base = [_c("", "ancien")]
+    local = [_c("", "ancien"), _c("", "local")]
+    remote = [_c("", "ancien"), _c("", "distant")]
+
+    merged, conflicts = merge_clients(base, local, remote)
+    assert [c["Nom"] for c in merged] == ["ancien", "local", "distant"]
+    assert conflicts == []
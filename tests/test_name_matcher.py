@@ -0,0 +1,93 @@
+# Rapprochement approximatif des noms (utils/name_matcher.py).
+import random
+
+import pytest
+
+from utils import name_matcher as nm
+from utils.name_matcher import (
+    DUPLICATE_THRESHOLD,
+    NameMatcher,
+    get_name_matcher,
+    levenshtein,
+    name_key,
+    similar_positions,
+    similarity,
+)
+
+CLIENTS = [
+    {"Nom": "Jean Dupont"},
+    {"Nom": "DUPONT, jean"},
+    {"Nom": "Jeanne Dupond"},
+    {"Nom": "Marie-Hélène Martin"},
+    {"Nom": None},
+    {"Nom": "Paul Durand"},
+]
+
+
+@pytest.fixture(autouse=True)
+def empty_cache(monkeypatch):
+    monkeypatch.setattr(nm, "_MATCHER", {"key": None, "matcher": None})
+
+
+def _reference_levenshtein(a, b):
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i]
+        for j, cb in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ca != cb)))
+        previous = current
+    return previous[-1]
+
+
+def test_name_key_ignores_order_case_and_accents():
+    assert name_key("DUPONT, jean") == name_key(" Jean  Dupont") == "dupont jean"
+    assert name_key("Marie-Hélène") == "helene marie"
+    assert name_key(None) == ""
+
+
+def test_banded_levenshtein_matches_the_full_computation():
+    rng = random.Random(7)
+    for _ in range(300):
+        a = "".join(rng.choice("abc ") for _ in range(rng.randint(0, 9)))
+        b = "".join(rng.choice("abc ") for _ in range(rng.randint(0, 9)))
+        exact = _reference_levenshtein(a, b)
+        assert levenshtein(a, b) == exact
+        for max_dist in range(4):
+            assert levenshtein(a, b, max_dist) == min(exact, max_dist + 1)
+
+
+def test_similarity():
+    assert similarity("dupont jean", "dupont jean") == 1.0
+    assert similarity("", "dupont jean") == 0.0
+    # Une lettre de différence
+    assert similarity("dupond jean", "dupont jean") == pytest.approx(1 - 1 / 11)
+    # Un mot commun sur deux : Dice 0.5
+    assert similarity("dupont jean", "dupont paul", threshold=0.9) == 0.5
+
+
+def test_match_groups_spellings_of_the_same_name():
+    matches = NameMatcher(CLIENTS).match("jean dupont", threshold=DUPLICATE_THRESHOLD)
+    assert matches[0] == ("Jean Dupont", 1.0, [0, 1])
+    assert [name for name, _, _ in matches] == ["Jean Dupont"]
+
+
+def test_typos_are_found_below_exact_matches():
+    matches = NameMatcher(CLIENTS).match("Jeanne Dupont", limit=3)
+    assert [name for name, _, _ in matches] == ["Jeanne Dupond", "Jean Dupont", "Paul Durand"]
+    assert all(score < 1.0 for _, score, _ in matches)
+    assert [s for _, s, _ in matches] == sorted((s for _, s, _ in matches), reverse=True)
+
+
+def test_empty_names_are_not_indexed():
+    matcher = NameMatcher(CLIENTS)
+    assert len(matcher) == 4
+    assert matcher.match("") == []
+
+
+def test_similar_positions():
+    db = {"clients": CLIENTS, "_rev": "r1"}
+    # Meilleurs noms d'abord, seuil 0.75 par défaut
+    assert similar_positions(db, "dupont jean") == [0, 1, 2]
+    assert similar_positions(db, "dupont jean", threshold=0.9) == [0, 1]
+    assert similar_positions(db, "12937") == []
+    assert get_name_matcher(db) is get_name_matcher({"clients": CLIENTS, "_rev": "r1"})
@@ -0,0 +1,60 @@
+# Enregistrement optimiste (backend/dropbox_utils.py) : une session partie
+# d'une version ancienne ne doit jamais écraser les enregistrements suivants.
+import json
+
+import pytest
+
+from backend import dropbox_utils as du
+from backend.storage import storage_config
+
+CLIENTS = [
+    {"Dossier N": "1", "Nom": "a", "Acompte 1": 0.0},
+    {"Dossier N": "2", "Nom": "b", "Acompte 1": 0.0},
+]
+
+
+def _reload():
+    du.invalidate_snapshot()
+    return du.load_database()
+
+
+def _stale_session_saves(store, monkeypatch, journal):
+    monkeypatch.setitem(storage_config()["storage"], "JOURNAL", journal)
+    store.write(du.json_path(), json.dumps({"clients": CLIENTS}).encode("utf-8"))
+
+    stale = du.load_database()
+
+    db = du.load_database()
+    db["clients"][0]["Nom"] = "X-edit"
+    du.save_database(db)
+    # Plus d'enregistrements que de versions gardées en mémoire (_MAX_BASES)
+    for i in range(1, du._MAX_BASES + 3):
+        db = du.load_database()
+        db["clients"][1]["Acompte 1"] = float(i)
+        du.save_database(db)
+
+    assert stale[du.REV_KEY] not in du._BASES
+    stale["clients"][1]["Nom"] = "Y-edit"
+    du.save_database(stale)
+    return _reload()
+
+
+@pytest.mark.parametrize("journal", [False, True])
+def test_stale_session_is_merged_against_its_stored_base(store, streamlit_messages, monkeypatch, journal):
+    store.keep_versions = 20
+    db = _stale_session_saves(store, monkeypatch, journal)
+
+    assert [c["Nom"] for c in db["clients"]] == ["X-edit", "Y-edit"]
+    assert db["clients"][1]["Acompte 1"] == float(du._MAX_BASES + 2)
+    assert streamlit_messages == []
+
+
+def test_stale_session_without_stored_base_is_refused(store, streamlit_messages, monkeypatch):
+    store.keep_versions = 2
+    db = _stale_session_saves(store, monkeypatch, journal=False)
+
+    # Rien d'écrasé : l'enregistrement est refusé avec un message
+    assert [c["Nom"] for c in db["clients"]] == ["X-edit", "b"]
+    assert db["clients"][1]["Acompte 1"] == float(du._MAX_BASES + 2)
+    assert [kind for kind, _ in streamlit_messages] == ["error"]
+    assert "introuvable" in streamlit_messages[0][1]
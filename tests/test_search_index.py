@@ -0,0 +1,79 @@
+# Index de recherche plein texte (utils/search_index.py).
+import pytest
+
+from utils import search_index as si
+from utils.search_index import SearchIndex, fold, get_search_index
+
+CLIENTS = [
+    {"Dossier N": "12937", "Nom": "Hélène Dupont", "Visa": "H1B", "Commentaire": "urgent"},
+    {"Dossier N": "12938", "Nom": "Marc Hélène", "Visa": "O1"},
+    {"Dossier N": "13000", "Nom": "Dupontel", "Visa": "H1B", "Categories": "Travail"},
+    {"Dossier N": "13001-1", "Nom": "Zoé", "Visa": "E2", "Commentaire": None},
+]
+
+
+@pytest.fixture(autouse=True)
+def empty_cache(monkeypatch):
+    monkeypatch.setattr(si, "_INDEX", {"key": None, "index": None})
+
+
+def test_fold():
+    assert fold("  Hélène   DUPONT ") == "helene dupont"
+    assert fold(None) == ""
+
+
+def test_accents_and_case_are_ignored():
+    assert SearchIndex(CLIENTS).search("HELENE") == [0, 1]
+
+
+def test_ranking_by_match_kind_and_field():
+    index = SearchIndex(CLIENTS)
+    # Début du nom avant début d'un mot
+    assert index.search("helene") == [0, 1]
+    # Début du nom > début d'un mot du nom
+    assert index.search("dupont") == [2, 0]
+    # Début du numéro de dossier
+    assert index.search("1293") == [0, 1]
+
+
+def test_all_terms_are_required():
+    index = SearchIndex(CLIENTS)
+    assert index.search("dupont h1b") == [2, 0]
+    assert index.search("dupont o1") == []
+    assert index.search("zoe e2") == [3]
+
+
+def test_short_terms_and_limit():
+    index = SearchIndex(CLIENTS)
+    assert index.search("e2") == [3]
+    assert len(index.search("h", limit=2)) == 2
+    assert index.search("   ") == []
+
+
+def test_equal_scores_keep_the_base_order():
+    assert SearchIndex(CLIENTS).search("1") == [0, 1, 2, 3]
+
+
+def test_updated_index_matches_a_rebuild():
+    # Assez de dossiers pour une réindexation partielle (pas de reconstruction)
+    base = CLIENTS + [{"Dossier N": str(20000 + i), "Nom": f"Client {i}"} for i in range(16)]
+    index = SearchIndex(base)
+    clients = [dict(c) for c in base]
+    clients[1]["Nom"] = "Marc Durand"
+    clients.append({"Dossier N": "13002", "Nom": "Hélène Roy"})
+    updated = index.updated(clients)
+    rebuilt = SearchIndex(clients)
+    assert updated._postings is not index._postings
+    for query in ["helene", "durand", "marc", "1300", "h1b", "roy", "client"]:
+        assert updated.search(query) == rebuilt.search(query)
+    # L'ancien index n'est pas modifié
+    assert index.search("durand") == []
+    assert index.search("helene") == [0, 1]
+
+
+def test_shared_index_is_derived_per_revision():
+    first = get_search_index({"clients": CLIENTS, "_rev": "r1"})
+    assert get_search_index({"clients": CLIENTS, "_rev": "r1"}) is first
+    clients = CLIENTS + [{"Dossier N": "14000", "Nom": "Nouveau"}]
+    second = get_search_index({"clients": clients, "_rev": "r2"})
+    assert second is not first and second.search("nouveau") == [4]
@@ -0,0 +1,92 @@
+# Compteurs de numéros de dossier (backend/sequences.py).
+import threading
+
+import pytest
+
+from backend import codec, sequences
+from backend.sequences import (
+    allocate_child_number,
+    allocate_child_suffixes,
+    allocate_parent_number,
+    allocate_parent_numbers,
+    sequences_path,
+)
+from backend.storage import StorageConflict
+
+
+def test_numbers_follow_each_other(store):
+    assert allocate_parent_number() == 1
+    assert allocate_parent_numbers(3) == [2, 3, 4]
+    assert allocate_parent_number() == 5
+    assert codec.loads(store.read(sequences_path())[1])["parent"] == 5
+
+
+def test_floor_skips_existing_numbers(store):
+    assert allocate_parent_number(floor=13070) == 13071
+    # Le compteur ne redescend pas avec un plancher plus bas
+    assert allocate_parent_number(floor=10) == 13072
+
+
+def test_child_suffixes_are_per_parent(store):
+    assert allocate_child_number(12937) == "12937-1"
+    assert allocate_child_number("12937", floor=4) == "12937-5"
+    assert allocate_child_suffixes(13000, 2) == [1, 2]
+    assert allocate_child_number(12937) == "12937-6"
+
+
+def test_concurrent_write_is_retried(store, monkeypatch):
+    allocate_parent_number()
+    write = store.write
+    raced = []
+
+    def racing_write(path, payload, rev=None, overwrite=False):
+        # Une autre session attribue un numéro entre lecture et écriture
+        if not raced:
+            raced.append(True)
+            allocate_parent_number()
+        return write(path, payload, rev, overwrite)
+
+    monkeypatch.setattr(store, "write", racing_write)
+    assert allocate_parent_number() == 3
+
+
+def test_creation_race_is_retried(store, monkeypatch):
+    write = store.write
+    raced = []
+
+    def racing_write(path, payload, rev=None, overwrite=False):
+        if not raced:
+            raced.append(True)
+            write(path, codec.dumps({"parent": 40, "children": {}}))
+        return write(path, payload, rev, overwrite)
+
+    monkeypatch.setattr(store, "write", racing_write)
+    assert allocate_parent_number() == 41
+
+
+def test_too_many_conflicts_raise(store, monkeypatch):
+    def always_conflict(*args, **kwargs):
+        raise StorageConflict("occupé")
+
+    monkeypatch.setattr(store, "write", always_conflict)
+    with pytest.raises(StorageConflict):
+        allocate_parent_number()
+
+
+def test_threads_never_share_a_number(store, monkeypatch):
+    monkeypatch.setattr(sequences, "ALLOCATE_MAX_ATTEMPTS", 1000)
+    got = []
+    lock = threading.Lock()
+
+    def worker():
+        for _ in range(5):
+            n = allocate_parent_number()
+            with lock:
+                got.append(n)
+
+    threads = [threading.Thread(target=worker) for _ in range(6)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert sorted(got) == list(range(1, 31))
@@ -0,0 +1,69 @@
+# Snapshot partagé par process (backend/dropbox_utils.py) : une lecture par révision.
+from backend import codec
+from backend import dropbox_utils as du
+
+
+def _doc(*names):
+    return {"clients": [{"Dossier N": str(i), "Nom": n} for i, n in enumerate(names, 1)]}
+
+
+def _count_reads(store, monkeypatch):
+    reads = []
+    read = store.read
+    monkeypatch.setattr(store, "read", lambda path: reads.append(path) or read(path))
+    return reads
+
+
+def test_unchanged_revision_is_not_downloaded_again(store, monkeypatch):
+    du.save_database(_doc("a"))
+    du.invalidate_snapshot()
+    reads = _count_reads(store, monkeypatch)
+
+    first = du.load_database()
+    second = du.load_database()
+    assert len(reads) == 1
+    assert first == second
+    assert first[du.REV_KEY] == store.metadata(du.json_path()).rev
+
+
+def test_pages_get_independent_copies(store):
+    du.save_database(_doc("a"))
+    db = du.load_database()
+    db["clients"][0]["Nom"] = "modifié"
+    db["clients"].append({"Dossier N": "9"})
+
+    again = du.load_database()
+    assert [c["Nom"] for c in again["clients"]] == ["a"]
+
+
+def test_external_write_is_picked_up(store, monkeypatch):
+    du.save_database(_doc("a"))
+    du.load_database()
+    store.write(du.json_path(), codec.dumps(_doc("b", "c")), overwrite=True)
+    reads = _count_reads(store, monkeypatch)
+
+    db = du.load_database()
+    assert len(reads) == 1
+    assert [c["Nom"] for c in db["clients"]] == ["b", "c"]
+
+
+def test_invalidate_forces_a_download(store, monkeypatch):
+    du.save_database(_doc("a"))
+    du.load_database()
+    du.invalidate_snapshot()
+    reads = _count_reads(store, monkeypatch)
+    du.load_database()
+    assert len(reads) == 1
+
+
+def test_merge_bases_are_bounded(store):
+    revs = []
+    for i in range(du._MAX_BASES + 3):
+        db = du.load_database() if revs else {}
+        db["clients"] = [{"Dossier N": "1", "Nom": f"v{i}"}]
+        du.save_database(db)
+        revs.append(du.load_database()[du.REV_KEY])
+
+    assert len(du._BASES) == du._MAX_BASES
+    assert list(du._BASES) == revs[-du._MAX_BASES:]
+    assert du._base_for(revs[0]) is None
@@ -0,0 +1,137 @@
+# Backends de stockage (backend/storage.py).
+import dropbox
+import pytest
+
+from backend.storage import DropboxBackend, LocalBackend, StorageConflict, StorageNotFound
+
+PATH = "/Apps/test/database.json"
+
+
+@pytest.fixture
+def local(tmp_path):
+    return LocalBackend(str(tmp_path), keep_versions=3)
+
+
+def test_missing_file(local):
+    assert local.metadata(PATH) is None
+    assert local.list_versions(PATH) == []
+    with pytest.raises(StorageNotFound):
+        local.read(PATH)
+
+
+def test_write_then_read(local):
+    meta = local.write(PATH, b"v1")
+    read_meta, payload = local.read(PATH)
+    assert payload == b"v1"
+    assert read_meta.rev == meta.rev == local.metadata(PATH).rev
+    assert meta.size == 2
+
+
+def test_empty_file_reads_as_empty_bytes(local):
+    local.write(PATH, b"")
+    assert local.read(PATH)[1] == b""
+
+
+def test_create_refuses_an_existing_file(local):
+    local.write(PATH, b"v1")
+    with pytest.raises(StorageConflict):
+        local.write(PATH, b"v2")
+    local.write(PATH, b"v2", overwrite=True)
+    assert local.read(PATH)[1] == b"v2"
+
+
+def test_write_with_revision_is_compare_and_swap(local):
+    first = local.write(PATH, b"v1")
+    second = local.write(PATH, b"v2", rev=first.rev)
+    assert second.rev != first.rev
+    with pytest.raises(StorageConflict):
+        local.write(PATH, b"v3", rev=first.rev)
+    with pytest.raises(StorageConflict):
+        local.write("/Apps/test/absent.json", b"x", rev=first.rev)
+    assert local.read(PATH)[1] == b"v2"
+
+
+def test_versions_are_archived_and_bounded(local):
+    revs = [local.write(PATH, b"v0").rev]
+    for i in range(1, 6):
+        revs.append(local.write(PATH, f"v{i}".encode(), rev=revs[-1]).rev)
+
+    versions = local.list_versions(PATH, limit=10)
+    # Version courante + keep_versions archives, plus récente d'abord
+    assert [v.rev for v in versions] == revs[::-1][:4]
+    assert local.list_versions(PATH, limit=2)[1].rev == revs[-2]
+
+
+def test_read_version(local):
+    revs = [local.write(PATH, b"v0").rev]
+    revs.append(local.write(PATH, b"v1", rev=revs[0]).rev)
+
+    assert local.read_version(PATH, revs[1])[1] == b"v1"
+    meta, payload = local.read_version(PATH, revs[0])
+    assert (meta.rev, payload) == (revs[0], b"v0")
+    with pytest.raises(StorageNotFound):
+        local.read_version(PATH, "inconnue")
+
+
+def test_evicted_version_is_not_found(tmp_path):
+    local = LocalBackend(str(tmp_path), keep_versions=1)
+    revs = [local.write(PATH, b"v0").rev]
+    for i in range(1, 3):
+        revs.append(local.write(PATH, f"v{i}".encode(), rev=revs[-1]).rev)
+    assert local.read_version(PATH, revs[1])[1] == b"v1"
+    with pytest.raises(StorageNotFound):
+        local.read_version(PATH, revs[0])
+
+
+# ---------------------------------------------------------
+# Dropbox : modes d'écriture et révisions, client factice
+# ---------------------------------------------------------
+class _Meta:
+    def __init__(self, rev):
+        self.rev = rev
+        self.path_display = PATH
+        self.size = 1
+
+
+class _Result:
+    content = b"payload"
+
+
+class _Client:
+    def __init__(self):
+        self.calls = []
+
+    def files_upload(self, payload, path, mode=None):
+        self.calls.append(("upload", mode))
+        return _Meta("015f0000002")
+
+    def files_download(self, path, rev=None):
+        self.calls.append(("download", rev))
+        return _Meta(rev or "015f0000001"), _Result()
+
+
+class _Tokens:
+    def __init__(self, client):
+        self.client = client
+
+    def get_client(self):
+        return self.client
+
+
+def test_dropbox_write_modes_and_versions():
+    client = _Client()
+    backend = DropboxBackend(_Tokens(client))
+
+    assert backend.write(PATH, b"x", rev="015f0000001").rev == "015f0000002"
+    backend.write(PATH, b"x", overwrite=True)
+    backend.write(PATH, b"x")
+    modes = [mode for _, mode in client.calls]
+    assert modes == [
+        dropbox.files.WriteMode.update("015f0000001"),
+        dropbox.files.WriteMode("overwrite"),
+        dropbox.files.WriteMode("add"),
+    ]
+
+    meta, payload = backend.read_version(PATH, "015f0000000")
+    assert (meta.rev, payload) == ("015f0000000", b"payload")
+    assert client.calls[-1] == ("download", "015f0000000")
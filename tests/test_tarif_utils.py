@@ -0,0 +1,130 @@
+# Tarifs datés (utils/tarif_utils.py) : index par visa et impact d'un nouveau tarif.
+import random
+from datetime import date
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils import tarif_utils as tu
+from utils.clients_frame import build_clients_frame
+from utils.tarif_utils import (
+    TariffIndex,
+    get_tarif_for_visa,
+    get_tariff_index,
+    impact_totals,
+    price_frame,
+    tariff_impact,
+)
+
+TARIFS = [
+    {"Visa": "H1B", "Date_effet": "2023-01-01", "Tarif": 1000},
+    {"Visa": "H1B", "Date_effet": "2024-01-01", "Tarif": "1200"},
+    {"Visa": "H1B", "Date_effet": "2024-01-01", "Tarif": 9999},   # même date : le premier l'emporte
+    {"Visa": "H1B", "Date_effet": "pas une date", "Tarif": 5},
+    {"Visa": "O1", "Date_effet": "2024-06-01", "Tarif": "gratuit"},
+    {"Visa": "O1", "Date_effet": "2024-06-01", "Tarif": 800},
+    {"Date_effet": "2020-01-01", "Tarif": 1},
+]
+
+
+@pytest.fixture
+def index():
+    return TariffIndex(TARIFS)
+
+
+def test_price_in_force_at_a_date(index):
+    assert index.price("H1B", date(2022, 12, 31)) == 0.0
+    assert index.price("H1B", "2023-01-01") == 1000.0
+    assert index.price("H1B", "2023-12-31") == 1000.0
+    assert index.price("H1B", "2024-01-01") == 1200.0
+    assert index.price("O1", "2025-01-01") == 800.0
+    assert index.price("E2", "2025-01-01") == 0.0
+    assert index.price("H1B", None, default=-1) == -1
+
+
+def test_history(index):
+    assert index.history("H1B") == [(date(2023, 1, 1), 1000.0), (date(2024, 1, 1), 1200.0)]
+    assert sorted(index.visas()) == ["H1B", "O1"]
+
+
+def test_vectorised_prices_match_single_lookups(index):
+    rng = random.Random(3)
+    visas = [rng.choice(["H1B", "O1", "E2", None]) for _ in range(200)]
+    dates = [rng.choice(["2022-06-01", "2023-01-01", "2024-01-01", "2024-07-01", "", None]) for _ in range(200)]
+    expected = [index.price(v, d, default=np.nan) for v, d in zip(visas, dates)]
+    got = index.prices(visas, dates, default=np.nan)
+    np.testing.assert_array_equal(got, expected)
+
+
+def test_price_frame_is_aligned_on_the_frame_index(index):
+    df = pd.DataFrame({"Visa": ["O1", "H1B"], "Date": ["2024-07-01", "2023-02-01"]}, index=[7, 3])
+    assert price_frame(df, index).to_dict() == {7: 800.0, 3: 1000.0}
+    assert price_frame(df.iloc[:0], index).empty
+
+
+def test_raw_list_lookup_matches_the_index_without_building_it(index, monkeypatch):
+    expected = [get_tarif_for_visa(v, d, index) for v in ["H1B", "O1", "E2"] for d in ["2023-06-01", "2024-06-01"]]
+
+    def no_build(self, tarifs=()):
+        raise AssertionError("index construit pour une recherche isolée")
+
+    monkeypatch.setattr(TariffIndex, "__init__", no_build)
+    got = [get_tarif_for_visa(v, d, TARIFS) for v in ["H1B", "O1", "E2"] for d in ["2023-06-01", "2024-06-01"]]
+    assert got == expected == [1000.0, 1200.0, 0.0, 800.0, 0.0, 0.0]
+
+
+def test_index_is_shared_per_revision(monkeypatch):
+    monkeypatch.setattr(tu, "_INDEX", {"key": None, "index": None})
+    first = get_tariff_index({"tarifs": TARIFS, "_rev": "r1"})
+    assert get_tariff_index({"tarifs": TARIFS, "_rev": "r1"}) is first
+    assert get_tariff_index({"tarifs": TARIFS, "_rev": "r2"}) is not first
+
+
+# ---------------------------------------------------------
+# Impact d'un nouveau tarif
+# ---------------------------------------------------------
+def _dossier(n, visa, day, fee, **flags):
+    return {"Dossier N": n, "Nom": f"client {n}", "Visa": visa, "Date": day,
+            "Montant honoraires (US $)": fee, **flags}
+
+
+CLIENTS = [
+    _dossier("100", "H1B", "2024-02-01", 1200.0),                         # touché
+    _dossier("100-1", "H1B", "2024-03-01", 1000.0),                       # fils touché
+    _dossier("101", "H1B", "2023-12-31", 1000.0),                         # avant la date d'effet
+    _dossier("102", "H1B", "2024-04-01", 1500.0),                         # déjà au nouveau tarif
+    _dossier("103", "H1B", "2024-04-01", 900.0, **{"Dossier accepte": True}),  # clos
+    _dossier("104", "O1", "2024-04-01", 100.0),                           # autre visa
+]
+
+
+@pytest.fixture
+def frame():
+    return build_clients_frame(CLIENTS)
+
+
+def test_impact_lists_open_dossiers_priced_differently(frame, index):
+    impact = tariff_impact(frame, index, " H1B ", 1500, "2024-01-01")
+    assert impact.index.tolist() == [0, 1]
+    assert impact["Dossier N"].tolist() == ["100", "100-1"]
+    assert impact["Type"].tolist() == ["Parent", "Fils"]
+    assert impact["Tarif catalogue actuel"].tolist() == [1200.0, 1200.0]
+    assert impact["Écart"].tolist() == [300.0, 500.0]
+    assert impact["Date"].tolist() == [date(2024, 2, 1), date(2024, 3, 1)]
+
+
+def test_closed_dossiers_on_request(frame, index):
+    impact = tariff_impact(frame, index, "H1B", 1500, date(2024, 1, 1), only_open=False)
+    assert impact["Dossier N"].tolist() == ["100", "100-1", "103"]
+
+
+def test_impact_totals(frame, index):
+    totals = impact_totals(tariff_impact(frame, index, "H1B", 1500, "2024-01-01"))
+    assert totals == {"dossiers": 2, "parents": 1, "fils": 1, "honoraires_actuels": 2200.0, "delta": 800.0}
+
+
+def test_no_impact(frame, index):
+    impact = tariff_impact(frame, index, "E2", 10, "2020-01-01")
+    assert impact.empty
+    assert impact_totals(impact)["dossiers"] == 0
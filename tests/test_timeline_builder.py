@@ -0,0 +1,27 @@
+# Journal d'événements (utils/timeline_builder.py) : mêmes événements que
+# build_timeline, dossier par dossier.
+from utils.clients_frame import build_clients_frame
+from utils.timeline_builder import EventStore, build_events, build_timeline
+
+
+def _events(timeline):
+    return [(e["date"], e["label"], e.get("amount"), e.get("meta")) for e in timeline]
+
+
+def test_mixed_timezones_and_text_flags_match_build_timeline():
+    clients = [
+        {"Dossier N": "1", "Nom": "a", "Date": "2024-01-05", "Acompte 1": 100.0,
+         "Date Acompte 1": "2024-01-02T10:00:00+02:00", "Date envoi": "2024-01-03",
+         "Escrow": "oui"},
+        {"Dossier N": "2", "Nom": "b", "Date": "2024-02-01", "Acompte 1": 50.0,
+         "Date Acompte 1": "2024-03-01T00:30:00Z", "Date acceptation": "2024-02-10",
+         "Escrow": "false", "Escrow_a_reclamer": "1"},
+    ]
+    store = EventStore(build_events(clients, build_clients_frame(clients)))
+    for pos, dossier in enumerate(clients):
+        assert _events(store.timeline(pos)) == _events(build_timeline(dossier))
+
+    labels = [e["label"] for e in store.timeline(0)]
+    assert "Escrow actif" in labels
+    # Date avec fuseau ramenée en UTC
+    assert store.timeline(0)[0]["date"].hour == 8
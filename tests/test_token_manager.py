@@ -0,0 +1,81 @@
+# Réutilisation du token Dropbox (backend/storage.py, DropboxTokenManager).
+import dropbox
+import pytest
+
+from backend import storage
+from backend.storage import DropboxBackend, DropboxTokenManager
+
+
+class _Response:
+    def __init__(self, payload):
+        self._payload = payload
+
+    def json(self):
+        return self._payload
+
+
+class _Session:
+    """Session HTTP factice : compte les appels à oauth2/token."""
+
+    def __init__(self, expires_in=14400, token="tok"):
+        self.posts = 0
+        self.expires_in = expires_in
+        self.token = token
+
+    def post(self, url, data=None, timeout=None):
+        self.posts += 1
+        return _Response({"access_token": self.token and f"{self.token}-{self.posts}", "expires_in": self.expires_in})
+
+
+@pytest.fixture
+def manager(monkeypatch):
+    monkeypatch.setattr(storage.dropbox, "Dropbox", lambda token, session=None: ("client", token))
+    tokens = DropboxTokenManager("key", "secret", "refresh")
+    tokens._session = _Session()
+    return tokens
+
+
+def test_token_is_reused_until_expiry(manager):
+    first = manager.get_client()
+    assert manager.get_client() is first
+    assert manager.get_client() is first
+    assert manager._session.posts == 1
+    stats = manager.stats()
+    assert (stats["refresh_count"], stats["refresh_avoided"]) == (1, 2)
+    assert stats["expires_in"] > 0
+
+
+def test_token_is_refreshed_near_expiry(manager):
+    # Durée de vie plus courte que la marge : chaque appel rafraîchit
+    manager._session.expires_in = DropboxTokenManager.REFRESH_MARGIN - 1
+    assert manager.get_client() == ("client", "tok-1")
+    assert manager.get_client() == ("client", "tok-2")
+    assert manager.refresh_count == 2
+
+
+def test_invalidate_forces_a_new_token(manager):
+    manager.get_client()
+    manager.invalidate()
+    assert manager.get_client() == ("client", "tok-2")
+    assert manager.stats()["refresh_count"] == 2
+
+
+def test_missing_token_raises(manager):
+    manager._session.token = None
+    with pytest.raises(Exception, match="token"):
+        manager.get_client()
+    assert manager.refresh_count == 0
+
+
+def test_auth_error_invalidates_the_token(manager):
+    manager.get_client()
+    backend = DropboxBackend(manager)
+
+    def rejected(*args, **kwargs):
+        raise dropbox.exceptions.AuthError("req", "expired_access_token")
+
+    with pytest.raises(dropbox.exceptions.AuthError):
+        backend._call(rejected)
+    assert manager.stats()["expires_in"] == 0
+    manager.get_client()
+    assert manager.refresh_count == 2
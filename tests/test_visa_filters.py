@@ -0,0 +1,82 @@
+# Référentiel Visa compilé (utils/visa_filters.py).
+import pandas as pd
+import pytest
+
+from utils import visa_filters as vf
+from utils.visa_filters import (
+    VisaReferential,
+    clean_visa_df,
+    get_all_lists,
+    get_categories,
+    get_souscats,
+    get_visa_referential,
+    get_visas,
+)
+
+RECORDS = [
+    {"Categories": " Travail ", "Sous-categories": "Temporaire", "Visa": "H1B", "Catégories": "parasite"},
+    {"Categories": "Travail", "Sous-categories": "Temporaire", "Visa": "O1"},
+    {"Categories": "Travail", "Sous-categories": "Permanent", "Visa": "EB2"},
+    {"Categories": "Famille", "Sous-categories": "Permanent", "Visa": "IR1"},
+    {"Categories": "Famille", "Sous-categories": "Fiancé", "Visa": None},
+    {"Categories": "Travail", "Sous-categories": "Temporaire", "Visa": "H1B"},
+    {"Categories": None, "Sous-categories": None, "Visa": None},
+]
+
+
+@pytest.fixture
+def ref():
+    return VisaReferential.from_records(RECORDS)
+
+
+def test_clean_visa_df_renames_and_drops_empty_rows():
+    df = clean_visa_df(pd.DataFrame(RECORDS))
+    assert list(df.columns) == ["Categories", "Sous-categories", "Visa"]
+    assert len(df) == 5
+    assert "nan" not in df["Visa"].tolist()
+
+
+def test_cascade(ref):
+    assert ref.categories() == ["Famille", "Travail"]
+    assert ref.souscats("Travail") == ["Permanent", "Temporaire"]
+    assert ref.souscats("Famille") == ["Fiancé", "Permanent"]
+    assert ref.souscats("Toutes") == ["Fiancé", "Permanent", "Temporaire"]
+    assert ref.visas(souscat="Permanent") == ["EB2", "IR1"]
+    assert ref.visas(category="Travail") == ["EB2", "H1B", "O1"]
+    assert ref.visas() == ["EB2", "H1B", "IR1", "O1"]
+    assert ref.visas_for("Famille", "Permanent") == ["IR1"]
+    assert ref.visas_for("Famille", "Fiancé") == []
+
+
+def test_reverse_path(ref):
+    assert ref.path(" H1B ") == ("Travail", "Temporaire")
+    assert ref.paths("IR1") == [("Famille", "Permanent")]
+    assert ref.path("inconnu") is None
+    assert ref.path(None) is None
+
+
+def test_returned_lists_are_copies(ref):
+    ref.categories().append("x")
+    ref.visas(category="Travail").clear()
+    assert ref.categories() == ["Famille", "Travail"]
+    assert ref.visas(category="Travail") == ["EB2", "H1B", "O1"]
+
+
+def test_helpers_accept_a_dataframe_or_a_referential(ref):
+    df = pd.DataFrame(RECORDS)
+    assert get_categories(df) == get_categories(ref)
+    assert get_souscats(df, "Travail") == get_souscats(ref, "Travail")
+    assert get_visas(df, "Travail", "Temporaire") == get_visas(ref, "Travail", "Temporaire") == ["H1B", "O1"]
+    assert get_all_lists(df) == get_all_lists(ref)
+
+
+def test_empty_table():
+    ref = VisaReferential.from_records(None)
+    assert (ref.categories(), ref.visas(), ref.path("H1B")) == ([], [], None)
+
+
+def test_referential_is_shared_per_revision(monkeypatch):
+    monkeypatch.setattr(vf, "_REFERENTIAL", {"key": None, "referential": None})
+    first = get_visa_referential({"visa": RECORDS, "_rev": "r1"})
+    assert get_visa_referential({"visa": RECORDS, "_rev": "r1"}) is first
+    assert get_visa_referential({"visa": RECORDS[:2], "_rev": "r1"}) is not first
@@ -0,0 +1,142 @@
+# Écriture différée (backend/write_behind.py, backend/dropbox_utils.py) :
+# coalescence des rafales, rejeu des enregistrements arrivés pendant un
+# upload, conflits et erreurs du thread de fond.
+import json
+import threading
+
+import pytest
+
+from backend import dropbox_utils as du
+from backend.storage import StorageError, storage_config
+
+CLIENTS = [{"Dossier N": "1", "Nom": "a"}, {"Dossier N": "2", "Nom": "b"}]
+
+
+def write_document(store, doc, rev=None):
+    return store.write(du.json_path(), json.dumps(doc).encode("utf-8"), rev, overwrite=True)
+
+
+def stored_names():
+    """Noms relus depuis le stockage (base + journal), sans le snapshot."""
+    du.invalidate_snapshot()
+    return names(du.load_database())
+
+
+def names(db):
+    return [c["Nom"] for c in db["clients"]]
+
+
+@pytest.mark.parametrize("journal", [False, True])
+def test_burst_is_coalesced_into_one_upload(write_behind, streamlit_messages, monkeypatch, journal):
+    monkeypatch.setitem(storage_config()["storage"], "JOURNAL", journal)
+    write_document(write_behind, {"clients": CLIENTS})
+    db = du.load_database()
+
+    for i in range(10):
+        db["clients"][0]["Nom"] = f"a{i}"
+        du.save_database(db)
+
+    # Les pages voient tout de suite la dernière version
+    assert names(du.load_database()) == ["a9", "b"]
+    assert du.flush_writes(5)
+
+    status = du.write_status()
+    assert status["saves"] == 1
+    assert status["coalesced"] == 9
+    assert stored_names() == ["a9", "b"]
+    assert streamlit_messages == []
+
+
+@pytest.mark.parametrize("journal", [False, True])
+def test_edits_made_during_upload_stay_visible_and_are_rebased(write_behind, streamlit_messages, monkeypatch, journal):
+    monkeypatch.setitem(storage_config()["storage"], "JOURNAL", journal)
+    write_document(write_behind, {"clients": CLIENTS})
+    db = du.load_database()
+
+    uploading, release = threading.Event(), threading.Event()
+    write = write_behind.write
+
+    def slow_write(*args, **kwargs):
+        uploading.set()
+        release.wait(5)
+        return write(*args, **kwargs)
+
+    monkeypatch.setattr(write_behind, "write", slow_write)
+
+    # Entre la fin de l'upload et le rejeu, les lectures doivent encore
+    # voir les enregistrements en attente
+    seen_after_upload = []
+    record_save = du.record_save
+
+    def spy(*args, **kwargs):
+        if threading.current_thread().name == "write-behind":
+            seen_after_upload.append(names(du.load_database()))
+        return record_save(*args, **kwargs)
+
+    monkeypatch.setattr(du, "record_save", spy)
+
+    db["clients"][0]["Nom"] = "a1"
+    du.save_database(db)
+    assert uploading.wait(5)
+
+    db["clients"][1]["Nom"] = "b1"
+    du.save_database(db)
+    release.set()
+
+    assert du.flush_writes(5)
+    assert seen_after_upload[0] == ["a1", "b1"]
+    assert names(du.load_database()) == ["a1", "b1"]
+    assert du.write_status()["saves"] == 2
+    assert stored_names() == ["a1", "b1"]
+    assert streamlit_messages == []
+
+
+def test_background_conflicts_are_reported_in_status(write_behind, streamlit_messages):
+    meta = write_document(write_behind, {"clients": CLIENTS})
+    db = du.load_database()
+
+    # Une autre session modifie le même dossier avant notre upload
+    write_document(write_behind, {"clients": [{"Dossier N": "1", "Nom": "remote"}, CLIENTS[1]]}, meta.rev)
+
+    db["clients"][0]["Nom"] = "local"
+    du.save_database(db)
+    assert du.flush_writes(5)
+
+    status = du.write_status()
+    assert status["conflicts"] == ["1"]
+    assert stored_names() == ["local", "b"]
+    # Pas d'appel Streamlit depuis le thread de fond
+    assert streamlit_messages == []
+
+    du.clear_write_conflicts()
+    assert du.write_status()["conflicts"] == []
+
+
+def test_background_errors_are_kept_until_retry_succeeds(write_behind, streamlit_messages, monkeypatch):
+    write_document(write_behind, {"clients": CLIENTS})
+    db = du.load_database()
+
+    write = write_behind.write
+    failures = [StorageError("indisponible")]
+
+    def flaky_write(*args, **kwargs):
+        if failures:
+            raise failures.pop()
+        return write(*args, **kwargs)
+
+    monkeypatch.setattr(write_behind, "write", flaky_write)
+    queue = du._write_queue()
+    queue.retry_delay = 0.2
+
+    db["clients"][0]["Nom"] = "a1"
+    du.save_database(db)
+    assert not du.flush_writes(0.15)
+
+    status = du.write_status()
+    assert status["state"] == "error"
+    assert "indisponible" in status["last_error"]
+
+    assert du.flush_writes(5)
+    assert du.write_status()["last_error"] is None
+    assert stored_names() == ["a1", "b"]
+    assert streamlit_messages == []
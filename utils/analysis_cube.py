@@ -0,0 +1,117 @@
+# utils/analysis_cube.py
+# Cube d'agrégats de la page Analyses, construit une fois par révision.
+#
+# Une ligne par combinaison présente de :
+#   Année × MoisNum × Categories × Sous-categories × Visa
+#   × statuts (envoyé, accepté, refusé, annulé, RFE)
+#   × drapeaux Escrow (à réclamer, réclamé) × ancienneté escrow × mois escrow
+# avec les mesures : Dossiers (nombre), honoraires, autres frais, acomptes.
+#
+# Les filtres de la page sont des masques sur le cube, les indicateurs et
+# graphiques des sommes sur la tranche obtenue : changer un filtre ne
+# réagrège plus les dossiers. Les mesures gardent les noms des colonnes
+# brutes, les fonctions de components/analysis_charts.py et
+# components/analysis_escrow_charts.py acceptent donc indifféremment
+# dossiers ou tranche du cube (pondération par « Dossiers »).
+import threading
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+from backend.dropbox_utils import REV_KEY
+from utils.clients_frame import get_clients_frame
+from utils.escrow_utils import escrow_aging, first_date
+
+STATUS_DIMENSIONS = ["Dossier envoye", "Dossier accepte", "Dossier refuse", "Dossier Annule", "RFE"]
+ESCROW_DIMENSIONS = ["Escrow_a_reclamer", "Escrow_reclame", "Ancienneté escrow", "Mois escrow"]
+DIMENSIONS = (
+    ["Année", "MoisNum", "Categories", "Sous-categories", "Visa"]
+    + STATUS_DIMENSIONS
+    + ESCROW_DIMENSIONS
+)
+MEASURES = ["Montant honoraires (US $)", "Autres frais (US $)", "Total encaissé"]
+
+
+# ---------------------------------------------------------
+# 🔹 Construction
+# ---------------------------------------------------------
+def build_cube(frame: pd.DataFrame, today=None) -> pd.DataFrame:
+    """
+    Agrège le DataFrame enrichi (utils/clients_frame.py).
+    `today` fixe la date de référence de l'ancienneté escrow.
+    """
+    escrow_dates = first_date(frame, "Date", "Date envoi")
+    rows = pd.DataFrame({
+        # Dossiers sans date : Année / MoisNum à 0 (NaN casserait les groupes)
+        "Année": frame["Date"].dt.year.fillna(0).astype(int),
+        "MoisNum": frame["Date"].dt.month.fillna(0).astype(int),
+        **{col: frame[col] for col in ["Categories", "Sous-categories", "Visa"]},
+        **{col: frame[col] for col in STATUS_DIMENSIONS},
+        "Escrow_a_reclamer": frame["Escrow_a_reclamer"],
+        "Escrow_reclame": frame["Escrow_reclame"],
+        "Ancienneté escrow": escrow_aging(frame, today),
+        "Mois escrow": escrow_dates.dt.to_period("M").astype(str).where(escrow_dates.notna(), ""),
+        **{col: frame[col] for col in MEASURES},
+    })
+
+    cube = (
+        rows.groupby(DIMENSIONS, sort=False)
+        .agg(
+            Dossiers=("Année", "size"),
+            **{col: (col, "sum") for col in MEASURES},
+        )
+        .reset_index()
+    )
+
+    # Libellé de période "YYYY-MM" (lu par les graphiques), vide sans date
+    dated = cube["Année"] > 0
+    cube["Mois"] = np.where(
+        dated,
+        cube["Année"].astype(str) + "-" + cube["MoisNum"].astype(str).str.zfill(2),
+        "",
+    )
+    cube["Total facturé"] = cube[MEASURES[0]] + cube[MEASURES[1]]
+    return cube
+
+
+# ---------------------------------------------------------
+# 🔹 Cache par révision (et par jour : l'ancienneté escrow en dépend)
+# ---------------------------------------------------------
+_CUBE = {"key": None, "cube": None}
+_CUBE_LOCK = threading.Lock()
+
+
+def get_cube(db) -> pd.DataFrame:
+    """Cube de la base chargée, partagé tant que la révision et le jour ne changent pas."""
+    rev = db.get(REV_KEY)
+    key = None if rev is None else (rev, len(db.get("clients", [])), date.today())
+    with _CUBE_LOCK:
+        if key is not None and _CUBE["key"] == key:
+            return _CUBE["cube"]
+
+    cube = build_cube(get_clients_frame(db))
+    if key is not None:
+        with _CUBE_LOCK:
+            _CUBE.update(key=key, cube=cube)
+    return cube
+
+
+# ---------------------------------------------------------
+# 🔹 Lecture
+# ---------------------------------------------------------
+def cube_totals(cube: pd.DataFrame) -> dict:
+    """Indicateurs d'une tranche du cube."""
+    n = cube["Dossiers"]
+    total_facture = float(cube["Total facturé"].sum())
+    total_encaisse = float(cube["Total encaissé"].sum())
+    return {
+        "dossiers": int(n.sum()),
+        "acceptes": int(n[cube["Dossier accepte"]].sum()),
+        "refuses": int(n[cube["Dossier refuse"]].sum()),
+        "annules": int(n[cube["Dossier Annule"]].sum()),
+        "total_facture": total_facture,
+        "total_encaisse": total_encaisse,
+        "solde": total_facture - total_encaisse,
+    }
+
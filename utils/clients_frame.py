@@ -0,0 +1,174 @@
+# utils/clients_frame.py
+# DataFrame « enrichi » des dossiers, construit une fois par révision de la base.
+#
+# Toutes les pages partaient de pd.DataFrame(clients) puis recalculaient les
+# mêmes colonnes ligne à ligne (apply(to_float), apply(axis=1), iterrows).
+# Ici le calcul est vectorisé et fait une seule fois : tant que la révision
+# ne change pas, toutes les pages (et toutes les sessions) reçoivent le
+# MÊME objet, et un rerun ne coûte plus que le filtrage.
+#
+# Le DataFrame partagé est en lecture seule : filtrer (masques, .loc) ne le
+# modifie pas ; pour changer des valeurs, passer par clients_frame_copy()
+# (copie complète : une copie superficielle partage encore les données
+# avec l'objet partagé tant que le copy-on-write n'est pas actif, pandas < 3).
+import threading
+
+import numpy as np
+import pandas as pd
+
+from backend.dropbox_utils import REV_KEY
+from utils.escrow_utils import compute_escrow
+from utils.status_utils import STATUS_ALIAS_GROUPS, normalize_bool
+
+MONEY_COLUMNS = ["Montant honoraires (US $)", "Autres frais (US $)"]
+ACOMPTE_COLUMNS = [f"Acompte {i}" for i in range(1, 5)]
+TEXT_COLUMNS = ["Nom", "Categories", "Sous-categories", "Visa"]
+ESCROW_COLUMNS = ["Escrow", "Escrow_a_reclamer", "Escrow_reclame"]
+
+# Colonnes ajoutées par build_clients_frame (absentes du JSON)
+DERIVED_COLUMNS = [
+    "Total facturé", "Total encaissé", "Solde",
+    "Année", "Mois",
+    "Dossier Parent", "Dossier Index",
+    "Escrow Montant", "Escrow État",
+]
+
+
+# ---------------------------------------------------------
+# 🔹 Conversions vectorisées
+# ---------------------------------------------------------
+def _float_column(df, col):
+    if col not in df.columns:
+        return pd.Series(0.0, index=df.index)
+    return pd.to_numeric(df[col], errors="coerce").fillna(0.0).astype(float)
+
+
+def _bool_column(df, col):
+    if col not in df.columns:
+        return pd.Series(False, index=df.index)
+    s = df[col]
+    if s.dtype == bool:
+        return s
+    # Colonne hétérogène : normalize_bool une fois par valeur distincte
+    values = s.tolist()
+    cache = {}
+    out = []
+    for v in values:
+        try:
+            r = cache.get((v.__class__, v), cache)
+            if r is cache:
+                r = cache[(v.__class__, v)] = normalize_bool(v)
+        except TypeError:
+            r = normalize_bool(v)
+        out.append(r)
+    return pd.Series(out, index=df.index, dtype=bool)
+
+
+def _text_column(df, col):
+    if col not in df.columns:
+        return pd.Series("", index=df.index, dtype=object)
+    return df[col].fillna("").astype(str).str.strip()
+
+
+# ---------------------------------------------------------
+# 🔹 Construction
+# ---------------------------------------------------------
+def build_clients_frame(clients) -> pd.DataFrame:
+    """
+    DataFrame typé des dossiers :
+      - Dossier N en texte, Nom / Categories / Sous-categories / Visa nettoyés
+      - montants et acomptes en float (0.0 si vide ou invalide)
+      - statuts canoniques (alias fusionnés) et drapeaux Escrow en bool
+      - Date en datetime, Année, Mois ("YYYY-MM")
+      - Total facturé, Total encaissé, Solde
+      - Dossier Parent (texte), Dossier Index (0 pour un parent)
+      - Escrow Montant, Escrow État (voir utils/escrow_utils.py)
+    L'index est la position du dossier dans db["clients"].
+    """
+    df = pd.DataFrame(clients)
+    if df.empty:
+        df = pd.DataFrame(columns=["Dossier N"])
+
+    cols = {}
+    if "Dossier N" in df.columns:
+        cols["Dossier N"] = df["Dossier N"].fillna("").astype(str).str.strip()
+    else:
+        cols["Dossier N"] = pd.Series("", index=df.index, dtype=object)
+
+    for col in TEXT_COLUMNS:
+        cols[col] = _text_column(df, col)
+
+    for col in MONEY_COLUMNS + ACOMPTE_COLUMNS:
+        cols[col] = _float_column(df, col)
+
+    for canonical, aliases in STATUS_ALIAS_GROUPS.items():
+        combined = pd.Series(False, index=df.index)
+        for alias in aliases:
+            if alias in df.columns:
+                combined = combined | _bool_column(df, alias)
+        cols[canonical] = combined
+
+    for col in ESCROW_COLUMNS:
+        cols[col] = _bool_column(df, col)
+
+    dates = pd.to_datetime(df["Date"], errors="coerce") if "Date" in df.columns \
+        else pd.Series(pd.NaT, index=df.index, dtype="datetime64[ns]")
+    cols["Date"] = dates
+    cols["Année"] = dates.dt.year
+    cols["Mois"] = dates.dt.to_period("M").astype(str)
+
+    facture = cols[MONEY_COLUMNS[0]] + cols[MONEY_COLUMNS[1]]
+    encaisse = pd.Series(
+        np.column_stack([cols[c].to_numpy() for c in ACOMPTE_COLUMNS]).sum(axis=1),
+        index=df.index,
+    )
+    cols["Total facturé"] = facture
+    cols["Total encaissé"] = encaisse
+    cols["Solde"] = facture - encaisse
+
+    parts = cols["Dossier N"].str.split("-", n=1)
+    cols["Dossier Parent"] = parts.str[0].fillna("")
+    cols["Dossier Index"] = pd.to_numeric(parts.str[1], errors="coerce").fillna(0).astype(int)
+
+    # Les colonnes d'origine non retouchées restent à leur place
+    for col, values in cols.items():
+        df[col] = values
+
+    escrow = compute_escrow(df)
+    df["Escrow Montant"] = escrow["Escrow Montant"]
+    df["Escrow État"] = escrow["Escrow État"]
+    return df
+
+
+# ---------------------------------------------------------
+# 🔹 Cache par révision
+# ---------------------------------------------------------
+_FRAME = {"key": None, "frame": None}
+_FRAME_LOCK = threading.Lock()
+
+
+def _snapshot_key(db):
+    rev = db.get(REV_KEY)
+    return None if rev is None else (rev, len(db.get("clients", [])))
+
+
+def get_clients_frame(db) -> pd.DataFrame:
+    """
+    DataFrame enrichi de la base chargée, partagé tant que la révision ne
+    change pas. Ne pas le modifier : voir clients_frame_copy().
+    """
+    key = _snapshot_key(db)
+    with _FRAME_LOCK:
+        if key is not None and _FRAME["key"] == key:
+            return _FRAME["frame"]
+
+    frame = build_clients_frame(db.get("clients", []))
+    if key is not None:
+        with _FRAME_LOCK:
+            _FRAME.update(key=key, frame=frame)
+    return frame
+
+
+def clients_frame_copy(db) -> pd.DataFrame:
+    """Copie modifiable, indépendante du DataFrame partagé."""
+    return get_clients_frame(db).copy(deep=True)
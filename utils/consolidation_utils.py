@@ -1,15 +1,22 @@
 import pandas as pd
 
+from utils.dossier_hierarchy import DossierHierarchy
 
-def get_family(df: pd.DataFrame, parent_id) -> pd.DataFrame:
+
+def get_family(df: pd.DataFrame, parent_id, hierarchy=None) -> pd.DataFrame:
     """
     Retourne le dossier parent + tous ses sous-dossiers (ex: 12937, 12937-1, 12937-2)
+    hierarchy : index déjà construit sur les mêmes dossiers (get_hierarchy)
     """
-    parent_id = str(parent_id)
-    df = df.copy()
-    df["Dossier N"] = df["Dossier N"].astype(str)
+    if hierarchy is None:
+        hierarchy = DossierHierarchy(df[["Dossier N"]].to_dict(orient="records"))
+    ids = hierarchy.family_ids(parent_id)
 
-    return df[df["Dossier N"].str.startswith(parent_id)]
+    # Numéros exacts de la famille (12937 ne ramène plus 129370)
+    keys = df["Dossier N"].astype(str).str.strip()
+    out = df[keys.isin(ids)].copy()
+    out["Dossier N"] = out["Dossier N"].astype(str)
+    return out
 
 
 def compute_consolidated_metrics(df: pd.DataFrame) -> dict:
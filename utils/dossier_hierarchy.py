@@ -1,5 +1,12 @@
+import bisect
+import threading
+
 import pandas as pd
 
+from backend.database import normalize_key
+from backend.dropbox_utils import REV_KEY
+
+
 def add_hierarchy_columns(df: pd.DataFrame) -> pd.DataFrame:
     df = df.copy()
 
@@ -25,3 +32,185 @@ def add_hierarchy_columns(df: pd.DataFrame) -> pd.DataFrame:
     df["Dossier Index"] = indexes
 
     return df
+
+
+# =====================================================
+# INDEX HIÉRARCHIQUE (parent -> sous-dossiers)
+# Construit une fois par version de la base (révision du snapshot),
+# puis tenu à jour à chaque création de dossier.
+# =====================================================
+def parse_dossier_id(dossier_n):
+    """
+    Retourne (parent:int|None, index:int|None)
+      "12937"   -> (12937, 0)
+      "12937-1" -> (12937, 1)
+      12937.0   -> (12937, 0)
+    """
+    if dossier_n is None:
+        return None, None
+    s = str(dossier_n).strip()
+    if s == "":
+        return None, None
+    try:
+        if "-" in s:
+            p, i = s.split("-", 1)
+            return int(float(p)), int(float(i))
+        return int(float(s)), 0
+    except Exception:
+        return None, None
+
+
+def _parent_number(parent) -> int:
+    """Numéro parent tel que saisi ou lu (12937, "12937", "12937.0") -> 12937."""
+    p, _ = parse_dossier_id(normalize_key(parent))
+    if p is None:
+        raise ValueError(f"Numéro de dossier parent invalide : {parent!r}")
+    return p
+
+
+class DossierHierarchy:
+    """
+    parent -> suffixes des sous-dossiers (triés), positions dans db["clients"].
+    Les listes ne sont jamais modifiées en place : une copie (copy()) partagée
+    avec une autre session n'est pas affectée par add().
+    """
+
+    def __init__(self, clients=()):
+        self._children = {}    # parent -> [suffixes triés] (> 0)
+        self._positions = {}   # (parent, suffixe) -> position
+        self._ids = {}         # (parent, suffixe) -> "Dossier N" d'origine
+        self._parents = set()
+        self._max_parent = None
+        self._sorted_parents = None
+        self.size = 0
+
+        children = {}
+        for pos, c in enumerate(clients):
+            p, i = parse_dossier_id(c.get("Dossier N") if isinstance(c, dict) else None)
+            self.size += 1
+            if p is None:
+                continue
+            self._register(p, i, pos, c.get("Dossier N"))
+            if i > 0:
+                children.setdefault(p, set()).add(i)
+        self._children = {p: sorted(s) for p, s in children.items()}
+
+    def _register(self, p, i, pos, dossier_n):
+        key = (p, i)
+        if key not in self._positions:
+            self._positions[key] = pos
+            self._ids[key] = str(dossier_n).strip()
+        if p not in self._parents:
+            self._parents.add(p)
+            self._sorted_parents = None
+        if self._max_parent is None or p > self._max_parent:
+            self._max_parent = p
+
+    def copy(self):
+        other = DossierHierarchy()
+        other._children = dict(self._children)
+        other._positions = dict(self._positions)
+        other._ids = dict(self._ids)
+        other._parents = set(self._parents)
+        other._max_parent = self._max_parent
+        other._sorted_parents = self._sorted_parents
+        other.size = self.size
+        return other
+
+    # -------------------------
+    # Mise à jour
+    # -------------------------
+    def add(self, dossier_n, position=None):
+        """Enregistre un dossier ajouté en fin de db["clients"]."""
+        pos = self.size if position is None else position
+        self.size = max(self.size, pos + 1)
+        p, i = parse_dossier_id(dossier_n)
+        if p is None:
+            return
+        self._register(p, i, pos, dossier_n)
+        if i > 0:
+            kids = list(self._children.get(p, []))
+            j = bisect.bisect_left(kids, i)
+            if j == len(kids) or kids[j] != i:
+                kids.insert(j, i)
+            self._children[p] = kids
+
+    # -------------------------
+    # Lectures
+    # -------------------------
+    def parents(self):
+        """Numéros parents existants (triés)."""
+        if self._sorted_parents is None:
+            self._sorted_parents = sorted(self._parents)
+        return self._sorted_parents
+
+    def parents_with_children(self):
+        return sorted(p for p, kids in self._children.items() if kids)
+
+    def children(self, parent):
+        return self._children.get(_parent_number(parent), [])
+
+    def max_suffix(self, parent):
+        kids = self.children(parent)
+        return kids[-1] if kids else 0
+
+    def next_child_index(self, parent):
+        return self.max_suffix(parent) + 1
+
+    def next_child_number(self, parent):
+        return f"{_parent_number(parent)}-{self.next_child_index(parent)}"
+
+    def next_parent_number(self, default=13057):
+        return self._max_parent + 1 if self._max_parent is not None else default
+
+    def position(self, parent, index=0):
+        return self._positions.get((_parent_number(parent), int(index)))
+
+    def family_keys(self, parent):
+        """[(parent, 0), (parent, 1), ...] présents dans la base, parent en tête."""
+        parent = _parent_number(parent)
+        keys = [(parent, 0)] if (parent, 0) in self._positions else []
+        return keys + [(parent, i) for i in self.children(parent)]
+
+    def family_positions(self, parent):
+        return [self._positions[k] for k in self.family_keys(parent)]
+
+    def family_ids(self, parent):
+        return [self._ids[k] for k in self.family_keys(parent)]
+
+
+_HIERARCHY = {"key": None, "index": None}
+_HIERARCHY_LOCK = threading.Lock()
+
+
+def _snapshot_key(db):
+    rev = db.get(REV_KEY)
+    return None if rev is None else (rev, len(db.get("clients", [])))
+
+
+def get_hierarchy(db):
+    """Index de la base chargée, partagé entre sessions tant que la révision ne change pas."""
+    key = _snapshot_key(db)
+    with _HIERARCHY_LOCK:
+        if key is not None and _HIERARCHY["key"] == key:
+            return _HIERARCHY["index"]
+
+    index = DossierHierarchy(db.get("clients", []))
+    if key is not None:
+        with _HIERARCHY_LOCK:
+            _HIERARCHY.update(key=key, index=index)
+    return index
+
+
+def hierarchy_after_insert(db, hierarchy, dossier_n):
+    """
+    À appeler après clients.append(...) + save_database(db) : l'index est
+    complété (sur une copie) et associé à la nouvelle révision, sans reconstruction.
+    """
+    index = hierarchy.copy()
+    index.add(dossier_n, len(db.get("clients", [])) - 1)
+    key = _snapshot_key(db)
+    if key is not None:
+        with _HIERARCHY_LOCK:
+            _HIERARCHY.update(key=key, index=index)
+    return index
@@ -1,5 +1,7 @@
 import re
 
+from utils.dossier_hierarchy import DossierHierarchy
+
 
 def split_dossier_id(dossier_id: str):
     """
@@ -21,19 +23,11 @@ def sort_dossiers(ids):
     return sorted(ids, key=lambda x: split_dossier_id(x))
 
 
-def next_sub_dossier(existing_ids, parent_id):
+def next_sub_dossier(existing_ids, parent_id, hierarchy=None):
     """
     Calcule le prochain suffixe disponible pour un parent
+    hierarchy : index déjà construit (utils.dossier_hierarchy.get_hierarchy) -> O(1)
     """
-    parent_id = str(parent_id)
-    suffixes = []
-
-    for d in existing_ids:
-        d = str(d)
-        if d.startswith(parent_id + "-"):
-            try:
-                suffixes.append(int(d.split("-")[1]))
-            except:
-                pass
-
-    return max(suffixes) + 1 if suffixes else 1
+    if hierarchy is None:
+        hierarchy = DossierHierarchy({"Dossier N": d} for d in existing_ids)
+    return hierarchy.next_child_index(parent_id)
@@ -1,5 +1,7 @@
 import re
 
+from utils.dossier_hierarchy import DossierHierarchy
+
 def parse_dossier_number(dossier_n):
     """
     Retourne (parent:int, index:int)
@@ -21,16 +23,11 @@ def parse_dossier_number(dossier_n):
     return parent, index
 
 
-def next_sub_dossier_number(clients, parent):
+def next_sub_dossier_number(clients, parent, hierarchy=None):
     """
     Retourne le prochain numéro disponible : parent-X
+    hierarchy : index déjà construit (utils.dossier_hierarchy.get_hierarchy) -> O(1)
     """
-    indexes = []
-
-    for c in clients:
-        p, i = parse_dossier_number(c.get("Dossier N"))
-        if p == parent:
-            indexes.append(i)
-
-    next_index = max(indexes) + 1 if indexes else 1
-    return f"{parent}-{next_index}"
+    if hierarchy is None:
+        hierarchy = DossierHierarchy(clients)
+    return hierarchy.next_child_number(parent)
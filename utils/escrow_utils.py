@@ -1,3 +1,113 @@
+# utils/escrow_utils.py
+# Règle Escrow, calculée pour tout un DataFrame à coups de masques NumPy.
+#
+#   Escrow Montant : tant que le dossier n'est PAS accepté / refusé / annulé,
+#                    tous les acomptes sont en escrow ; ensuite 0.
+#   Escrow État    : Escrow réclamé     -> drapeau Escrow_reclame
+#                    Escrow actif       -> pas encore accepté / refusé / annulé
+#                    Escrow à réclamer  -> accepté / refusé / annulé et
+#                                          drapeau Escrow_a_reclamer
+#                    ""                 -> hors escrow
+# Les montants par état sont la somme des acomptes des dossiers concernés
+# (même logique que le Dashboard).
+import numpy as np
+import pandas as pd
+
+from utils.status_utils import normalize_bool
+
+ESCROW_NONE = ""
+ESCROW_ACTIF = "Escrow actif"
+ESCROW_A_RECLAMER = "Escrow à réclamer"
+ESCROW_RECLAME = "Escrow réclamé"
+ESCROW_STATES = [ESCROW_ACTIF, ESCROW_A_RECLAMER, ESCROW_RECLAME]
+
+ACOMPTE_COLUMNS = [f"Acompte {i}" for i in range(1, 5)]
+CLOSING_COLUMNS = ["Dossier accepte", "Dossier refuse", "Dossier Annule"]
+
+
+def _flags(df, col):
+    """Colonne booléenne -> tableau NumPy (valeurs texte « oui », "1"... acceptées)."""
+    if col not in df.columns:
+        return np.zeros(len(df), dtype=bool)
+    s = df[col]
+    if s.dtype == bool:
+        return s.to_numpy()
+    return np.fromiter(map(normalize_bool, s.tolist()), dtype=bool, count=len(s))
+
+
+def _amounts(df, col):
+    if col not in df.columns:
+        return np.zeros(len(df))
+    s = df[col]
+    if s.dtype == float:
+        return s.to_numpy()
+    return pd.to_numeric(s, errors="coerce").fillna(0.0).to_numpy(dtype=float)
+
+
+def escrow_arrays(df):
+    """
+    Retourne (acomptes, montant escrow, état) sous forme de tableaux NumPy
+    alignés sur les lignes de df.
+    """
+    if "Total encaissé" in df.columns and df["Total encaissé"].dtype == float:
+        acomptes = df["Total encaissé"].to_numpy()
+    else:
+        acomptes = np.zeros(len(df))
+        for col in ACOMPTE_COLUMNS:
+            acomptes = acomptes + _amounts(df, col)
+
+    closed = np.zeros(len(df), dtype=bool)
+    for col in CLOSING_COLUMNS:
+        closed |= _flags(df, col)
+
+    reclame = _flags(df, "Escrow_reclame")
+    a_reclamer = _flags(df, "Escrow_a_reclamer")
+
+    montant = np.where(closed, 0.0, acomptes)
+    state = np.select(
+        [reclame, ~closed, a_reclamer],
+        [ESCROW_RECLAME, ESCROW_ACTIF, ESCROW_A_RECLAMER],
+        default=ESCROW_NONE,
+    ).astype(object)
+    return acomptes, montant, state
+
+
+# Ancienneté d'un escrow en cours (depuis la date d'envoi, à défaut la date du dossier)
+ESCROW_AGING_BUCKETS = ["0–30 jours", "31–60 jours", "60+ jours"]
+
+
+def first_date(df, first, second):
+    """Date `first`, à défaut `second` (colonnes texte ou datetime)."""
+    d1 = pd.to_datetime(df[first], errors="coerce") if first in df.columns else None
+    d2 = pd.to_datetime(df[second], errors="coerce") if second in df.columns else None
+    if d1 is None:
+        return d2 if d2 is not None else pd.Series(pd.NaT, index=df.index)
+    return d1 if d2 is None else d1.fillna(d2)
+
+
+def escrow_aging(df, today=None):
+    """Tranche d'ancienneté de chaque dossier ("" sans date valide)."""
+    today = pd.Timestamp.today() if today is None else pd.Timestamp(today)
+    days = (today - first_date(df, "Date envoi", "Date")).dt.days.to_numpy(dtype=float)
+    return np.select(
+        [days <= 30, days <= 60, days > 60],
+        ESCROW_AGING_BUCKETS,
+        default="",
+    ).astype(object)
+
+
+def compute_escrow(df) -> pd.DataFrame:
+    """Colonnes « Escrow Montant » et « Escrow État » pour chaque dossier de df."""
+    _, montant, state = escrow_arrays(df)
+    return pd.DataFrame({"Escrow Montant": montant, "Escrow État": state}, index=df.index)
+
+
+def escrow_totals(df) -> dict:
+    """{état: somme des acomptes} pour les trois états Escrow."""
+    acomptes, _, state = escrow_arrays(df)
+    return {s: float(acomptes[state == s].sum()) for s in ESCROW_STATES}
+
+
 def compute_escrow_amount(dossier: dict) -> float:
     """
     Tant que le dossier n'est PAS accepté / refusé / annulé :
@@ -5,24 +115,5 @@ def compute_escrow_amount(dossier: dict) -> float:
     Dès qu'un de ces statuts est TRUE :
     -> escrow = 0
     """
-
-    def to_float(v):
-        try:
-            return float(v or 0)
-        except:
-            return 0.0
-
-    # Statuts finaux = sortie d'escrow
-    if (
-        dossier.get("Dossier accepte")
-        or dossier.get("Dossier refuse")
-        or dossier.get("Dossier Annule")
-    ):
-        return 0.0
-
-    # Sinon : tous les acomptes vont en escrow
-    total = 0.0
-    for i in range(1, 5):
-        total += to_float(dossier.get(f"Acompte {i}"))
-
-    return total
+    _, montant, _ = escrow_arrays(pd.DataFrame([dossier]))
+    return float(montant[0])
@@ -0,0 +1,171 @@
+# utils/facet_index.py
+# Index de facettes des filtres en cascade (Année, Catégorie, Sous-catégorie, Visa...).
+#
+# Pour chaque colonne filtrable et chaque valeur, un bitmap des lignes qui
+# la portent (bits empaquetés dans des uint64). Une sélection est
+# l'intersection (&) des bitmaps choisis ; les options d'un niveau et
+# leur nombre de dossiers viennent de l'intersection avec chaque valeur,
+# sans refiltrer le DataFrame. Les lignes retenues ne sont extraites
+# qu'une fois, à la fin (rows()).
+#
+# Construit sur le DataFrame partagé (utils/clients_frame.py) ou sur le
+# cube (utils/analysis_cube.py) : dans ce cas, chaque ligne compte pour
+# sa colonne « Dossiers ».
+import threading
+
+import numpy as np
+import pandas as pd
+
+from utils.analysis_cube import get_cube
+from utils.clients_frame import get_clients_frame
+
+_POPCOUNT8 = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+
+def _popcount(words) -> int:
+    if hasattr(np, "bitwise_count"):  # NumPy >= 2.0
+        return int(np.bitwise_count(words).sum())
+    return int(_POPCOUNT8[words.view(np.uint8)].sum())
+
+
+def _pack(mask) -> np.ndarray:
+    """Masque booléen -> bitmap uint64 (bits de bourrage à 0)."""
+    bits = np.packbits(np.asarray(mask, dtype=bool), bitorder="little")
+    pad = (-len(bits)) % 8
+    if pad:
+        bits = np.concatenate([bits, np.zeros(pad, dtype=np.uint8)])
+    return bits.view(np.uint64)
+
+
+class FacetIndex:
+    """
+    Bitmaps {colonne: {valeur: bitmap}} sur les lignes de df.
+    weights : colonne de pondération (« Dossiers » pour le cube), sinon 1 par ligne.
+    """
+
+    def __init__(self, df: pd.DataFrame, columns, weights=None):
+        self.n = len(df)
+        self.columns = list(columns)
+        self._weights = None if weights is None else df[weights].to_numpy()
+        self._full = _pack(np.ones(self.n, dtype=bool))
+        self._empty = np.zeros_like(self._full)
+        self._bitmaps = {}
+
+        for col in self.columns:
+            codes, uniques = pd.factorize(df[col], use_na_sentinel=True)
+            self._bitmaps[col] = {
+                value: _pack(codes == i) for i, value in enumerate(uniques.tolist())
+            }
+
+    # ------------------------
+    # BITMAPS
+    # ------------------------
+    def all(self):
+        return self._full
+
+    def bitmap(self, col, value):
+        return self._bitmaps[col].get(value, self._empty)
+
+    def select(self, selections: dict, base=None):
+        """
+        Intersection des valeurs choisies : {colonne: valeur}.
+        None (ou colonne absente) = pas de filtre sur cette colonne.
+        """
+        out = self._full if base is None else base
+        for col, value in selections.items():
+            if value is not None:
+                out = out & self.bitmap(col, value)
+        return out
+
+    def _bits(self, bitmap):
+        return np.unpackbits(bitmap.view(np.uint8), bitorder="little", count=self.n)
+
+    def count(self, bitmap) -> int:
+        if self._weights is None:
+            return _popcount(bitmap)
+        return int(self._bits(bitmap) @ self._weights)
+
+    def rows(self, bitmap) -> np.ndarray:
+        """Positions des lignes du bitmap (pour df.iloc[...])."""
+        return np.flatnonzero(self._bits(bitmap))
+
+    # ------------------------
+    # OPTIONS DES FILTRES
+    # ------------------------
+    def options(self, col, within=None):
+        """
+        [(valeur, nombre)] des valeurs de `col` présentes dans `within`
+        (toutes les lignes par défaut), triées par valeur. Les valeurs
+        vides ("" ou 0 pour une année inconnue) sont écartées.
+        """
+        within = self._full if within is None else within
+        out = []
+        for value, bm in self._bitmaps[col].items():
+            if not value:
+                continue
+            n = self.count(within & bm)
+            if n:
+                out.append((value, n))
+        return sorted(out, key=lambda item: item[0])
+
+    def labels(self, col, within=None):
+        """{valeur: "valeur (nombre)"} pour format_func des selectbox."""
+        return {value: f"{value} ({n})" for value, n in self.options(col, within)}
+
+
+def facet_selectbox(container, label, facets, col, within=None, all_label="Toutes"):
+    """
+    Selectbox d'un niveau de filtre : options présentes dans `within`,
+    affichées avec leur nombre de dossiers. Retourne None pour `all_label`.
+    """
+    labels = facets.labels(col, within)
+    choice = container.selectbox(
+        label,
+        options=[all_label] + list(labels),
+        format_func=lambda v: labels.get(v, v),
+    )
+    return None if choice == all_label else choice
+
+
+# ---------------------------------------------------------
+# 🔹 Index partagés par révision
+# ---------------------------------------------------------
+# Les DataFrames source (frame, cube) sont eux-mêmes partagés par révision :
+# l'index est donc valable tant que la source est le même objet.
+_FACETS = {}
+_FACETS_LOCK = threading.Lock()
+
+CLIENT_FACETS = [
+    "Année", "Categories", "Sous-categories", "Visa",
+    "Dossier envoye", "Dossier accepte", "Dossier refuse", "Dossier Annule", "RFE",
+]
+
+
+def _facets_for(name, source, build):
+    with _FACETS_LOCK:
+        hit = _FACETS.get(name)
+        if hit is not None and hit[0] is source:
+            return hit[1]
+
+    index = build()
+    with _FACETS_LOCK:
+        _FACETS[name] = (source, index)
+    return index
+
+
+def get_clients_facets(db):
+    """Index des dossiers (lignes du DataFrame partagé), pour la liste des dossiers."""
+    frame = get_clients_frame(db)
+
+    def build():
+        # Années entières (0 = date inconnue) plutôt que flottants avec NaN
+        years = frame["Année"].fillna(0).astype(int)
+        return FacetIndex(frame.assign(Année=years), CLIENT_FACETS)
+
+    return _facets_for("clients", frame, build)
+
+
+def get_cube_facets(db):
+    """Index des lignes du cube d'analyse, pondérées par leur nombre de dossiers."""
+    cube = get_cube(db)
+    return _facets_for("cube", cube, lambda: FacetIndex(cube, CLIENT_FACETS, weights="Dossiers"))
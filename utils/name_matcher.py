@@ -0,0 +1,176 @@
+# utils/name_matcher.py
+# Rapprochement approximatif des noms de clients (doublons, fautes de frappe).
+#
+# Les noms sont saisis de façon hétérogène : casse, accents, prénom et nom
+# inversés ("Dupont Jean" / "jean DUPONT"), lettres manquantes. Chaque nom
+# est réduit à une clé : texte replié (utils/search_index.fold), mots triés.
+# Un index trigramme -> clés limite la comparaison aux noms qui partagent
+# des trigrammes avec la requête ; ceux-ci sont notés par :
+#   - similarité d'édition (1 - distance de Levenshtein / longueur)
+#   - similarité des ensembles de mots (coefficient de Dice)
+# le score retenu étant la meilleure des deux (0 à 1).
+#
+# Index construit une fois par révision de la base.
+import threading
+from collections import Counter
+
+from backend.dropbox_utils import REV_KEY
+from utils.search_index import fold, trigrams
+
+# Score à partir duquel un nom est signalé comme doublon probable
+DUPLICATE_THRESHOLD = 0.85
+# Nombre maximal de noms comparés par requête (les plus de trigrammes communs)
+_MAX_CANDIDATES = 200
+
+
+def name_key(nom) -> str:
+    """Clé de comparaison : texte replié, mots triés (ordre prénom / nom ignoré)."""
+    return " ".join(sorted(fold(nom).replace("-", " ").replace(",", " ").split()))
+
+
+def _grams(key) -> set:
+    # Espaces autour : les débuts et fins de mots comptent aussi
+    return trigrams(f" {key} ")
+
+
+def levenshtein(a: str, b: str, max_dist=None) -> int:
+    """
+    Distance d'édition. Avec `max_dist`, seule la bande |i - j| <= max_dist
+    est calculée et max_dist + 1 est retourné dès qu'elle est dépassée.
+    """
+    if len(a) < len(b):
+        a, b = b, a
+    if max_dist is None:
+        max_dist = len(a)
+    if len(a) - len(b) > max_dist:
+        return max_dist + 1
+
+    over = max_dist + 1
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        lo, hi = max(1, i - max_dist), min(len(b), i + max_dist)
+        current = [i if i <= max_dist else over] + [over] * len(b)
+        row_min = current[0]
+        for j in range(lo, hi + 1):
+            d = min(
+                previous[j] + 1,
+                current[j - 1] + 1,
+                previous[j - 1] + (ca != b[j - 1]),
+            )
+            current[j] = d
+            if d < row_min:
+                row_min = d
+        if row_min > max_dist:
+            return over
+        previous = current
+    return min(previous[-1], over)
+
+
+def similarity(key_a: str, key_b: str, threshold=0.0) -> float:
+    """
+    Score entre deux clés (voir name_key). La distance d'édition n'est
+    calculée que si elle peut dépasser `threshold` et le score des mots.
+    """
+    if not key_a or not key_b:
+        return 0.0
+    if key_a == key_b:
+        return 1.0
+    words_a, words_b = set(key_a.split()), set(key_b.split())
+    dice = 2 * len(words_a & words_b) / (len(words_a) + len(words_b))
+
+    longest = max(len(key_a), len(key_b))
+    floor = max(dice, threshold)
+    max_dist = int((1 - floor) * longest)
+    dist = levenshtein(key_a, key_b, max_dist)
+    if dist > max_dist:
+        return dice
+    return max(1 - dist / longest, dice)
+
+
+class NameMatcher:
+    """Noms distincts (par clé) des dossiers, avec leurs positions dans db["clients"]."""
+
+    def __init__(self, clients=()):
+        self._keys = []       # clé par identifiant
+        self._names = []      # premier libellé rencontré pour la clé
+        self._positions = []  # positions des dossiers portant ce nom
+        self._ids = {}        # clé -> identifiant
+        self._postings = {}   # trigramme -> set(identifiants)
+
+        for pos, dossier in enumerate(clients):
+            nom = dossier.get("Nom") if isinstance(dossier, dict) else None
+            key = name_key(nom)
+            if not key:
+                continue
+            kid = self._ids.get(key)
+            if kid is None:
+                kid = self._ids[key] = len(self._keys)
+                self._keys.append(key)
+                self._names.append(str(nom).strip())
+                self._positions.append([])
+                for gram in _grams(key):
+                    self._postings.setdefault(gram, set()).add(kid)
+            self._positions[kid].append(pos)
+
+    def __len__(self):
+        return len(self._keys)
+
+    def match(self, nom, limit=5, threshold=0.0) -> list:
+        """
+        [(nom, score, [positions])] des noms les plus proches de `nom`,
+        score décroissant, score >= threshold.
+        """
+        key = name_key(nom)
+        if not key:
+            return []
+
+        shared = Counter()
+        for gram in _grams(key):
+            shared.update(self._postings.get(gram, ()))
+
+        scored = []
+        for kid, _ in shared.most_common(_MAX_CANDIDATES):
+            score = similarity(key, self._keys[kid], threshold)
+            if score >= threshold:
+                scored.append((score, kid))
+        scored.sort(key=lambda item: (-item[0], self._keys[item[1]]))
+
+        return [
+            (self._names[kid], round(score, 3), list(self._positions[kid]))
+            for score, kid in scored[:limit]
+        ]
+
+
+# ---------------------------------------------------------
+# 🔹 Index partagé par révision
+# ---------------------------------------------------------
+_MATCHER = {"key": None, "matcher": None}
+_MATCHER_LOCK = threading.Lock()
+
+
+def get_name_matcher(db) -> NameMatcher:
+    rev = db.get(REV_KEY)
+    clients = db.get("clients", [])
+    key = None if rev is None else (rev, len(clients))
+    with _MATCHER_LOCK:
+        if key is not None and _MATCHER["key"] == key:
+            return _MATCHER["matcher"]
+
+    matcher = NameMatcher(clients)
+    if key is not None:
+        with _MATCHER_LOCK:
+            _MATCHER.update(key=key, matcher=matcher)
+    return matcher
+
+
+def similar_positions(db, nom, threshold=0.75, limit=20) -> list:
+    """
+    Positions des dossiers dont le nom ressemble à `nom` (meilleurs noms
+    d'abord). Requête sans lettre (numéro de dossier) : aucun rapprochement.
+    """
+    if not any(c.isalpha() for c in str(nom)):
+        return []
+    out = []
+    for _, _, positions in get_name_matcher(db).match(nom, limit, threshold):
+        out.extend(positions)
+    return out
@@ -0,0 +1,232 @@
+# utils/search_index.py
+# Index de recherche plein texte des dossiers (Recherche universelle, Modifier dossier).
+#
+# Champs indexés : Dossier N, Nom, Visa, Categories, Sous-categories, Commentaire.
+# Les textes sont « repliés » (minuscules, sans accents : "é" == "e") puis
+# découpés en trigrammes ; chaque trigramme pointe vers les positions des
+# dossiers (index inversé). Une requête ne vérifie que les dossiers qui
+# contiennent tous ses trigrammes, puis les classe :
+#   champ égal > début du champ > début d'un mot > sous-chaîne,
+#   pondéré par le champ (Dossier N et Nom d'abord).
+#
+# L'index est construit une fois par révision. Après un enregistrement, le
+# nouvel index est dérivé du précédent : seuls les dossiers dont un champ
+# indexé a changé sont retirés / réindexés.
+import heapq
+import threading
+import unicodedata
+
+from backend.dropbox_utils import REV_KEY
+
+SEARCH_FIELDS = {
+    "Dossier N": 5.0,
+    "Nom": 4.0,
+    "Visa": 2.0,
+    "Categories": 1.0,
+    "Sous-categories": 1.0,
+    "Commentaire": 0.5,
+}
+_WEIGHTS = tuple(SEARCH_FIELDS.values())
+_EXACT, _PREFIX, _WORD, _SUBSTRING = 3.0, 2.0, 1.5, 1.0
+
+
+def fold(text) -> str:
+    """Texte comparable : minuscules, sans accents, espaces simplifiés."""
+    if text is None:
+        return ""
+    text = unicodedata.normalize("NFKD", str(text))
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    return " ".join(text.lower().split())
+
+
+def trigrams(text: str) -> set:
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+def _field_values(dossier) -> tuple:
+    if not isinstance(dossier, dict):
+        return ("",) * len(SEARCH_FIELDS)
+    return tuple(
+        "" if dossier.get(f) is None else str(dossier.get(f))
+        for f in SEARCH_FIELDS
+    )
+
+
+def _match_score(term, value) -> float:
+    if value == term:
+        return _EXACT
+    if value.startswith(term):
+        return _PREFIX
+    if (" " + term) in value or ("-" + term) in value:
+        return _WORD
+    if term in value:
+        return _SUBSTRING
+    return 0.0
+
+
+class SearchIndex:
+    """
+    Index inversé trigramme -> positions dans db["clients"].
+    Les ensembles de positions ne sont jamais modifiés en place après
+    publication : un index dérivé ne touche pas celui des autres sessions.
+    """
+
+    def __init__(self, clients=()):
+        self._raw = []       # valeurs brutes des champs, par position
+        self._folded = []    # valeurs repliées, par position
+        self._postings = {}  # trigramme -> set(positions)
+        for pos, dossier in enumerate(clients):
+            self._raw.append(_field_values(dossier))
+            self._folded.append(tuple(fold(v) for v in self._raw[-1]))
+            for gram in self._doc_grams(pos):
+                self._postings.setdefault(gram, set()).add(pos)
+
+    def __len__(self):
+        return len(self._raw)
+
+    def _doc_grams(self, pos) -> set:
+        grams = set()
+        for value in self._folded[pos]:
+            grams |= trigrams(value)
+        return grams
+
+    # ------------------------
+    # MISE À JOUR
+    # ------------------------
+    def updated(self, clients) -> "SearchIndex":
+        """
+        Index de `clients` dérivé de celui-ci : seuls les dossiers dont un
+        champ indexé diffère (ou ajoutés / supprimés) sont réindexés.
+        """
+        n_old, n_new = len(self._raw), len(clients)
+        changed = [
+            pos for pos in range(max(n_old, n_new))
+            if pos >= n_old or pos >= n_new or _field_values(clients[pos]) != self._raw[pos]
+        ]
+        # Suppression / insertion au milieu : toutes les positions suivantes
+        # changent, une reconstruction coûte alors moins cher
+        if len(changed) > max(n_new, 1) // 4:
+            return SearchIndex(clients)
+
+        new = SearchIndex.__new__(SearchIndex)
+        new._raw = list(self._raw)
+        new._folded = list(self._folded)
+        new._postings = dict(self._postings)
+        copied = set()
+
+        def touch(gram):
+            if gram not in copied:
+                new._postings[gram] = set(new._postings.get(gram, ()))
+                copied.add(gram)
+            return new._postings[gram]
+
+        for pos in changed:
+            raw = _field_values(clients[pos]) if pos < n_new else None
+            if pos < n_old:
+                for gram in new._doc_grams(pos):
+                    touch(gram).discard(pos)
+            if raw is None:
+                continue
+            if pos < n_old:
+                new._raw[pos] = raw
+                new._folded[pos] = tuple(fold(v) for v in raw)
+            else:
+                new._raw.append(raw)
+                new._folded.append(tuple(fold(v) for v in raw))
+            for gram in new._doc_grams(pos):
+                touch(gram).add(pos)
+
+        del new._raw[n_new:]
+        del new._folded[n_new:]
+        for gram in copied:
+            if not new._postings[gram]:
+                del new._postings[gram]
+        return new
+
+    # ------------------------
+    # RECHERCHE
+    # ------------------------
+    def _candidates(self, term):
+        if len(term) < 3:
+            # Terme trop court pour un trigramme : parcours des textes repliés
+            return range(len(self._folded))
+        grams = sorted(trigrams(term), key=lambda g: len(self._postings.get(g, ())))
+        out = None
+        for gram in grams:
+            postings = self._postings.get(gram)
+            if not postings:
+                return ()
+            out = set(postings) if out is None else out & postings
+            if not out:
+                return ()
+        return out
+
+    def score(self, pos, terms) -> float:
+        """Score d'un dossier : chaque terme doit être trouvé dans un champ."""
+        total = 0.0
+        folded = self._folded[pos]
+        for term in terms:
+            best = 0.0
+            for weight, value in zip(_WEIGHTS, folded):
+                if term in value:
+                    best = max(best, weight * _match_score(term, value))
+            if not best:
+                return 0.0
+            total += best
+        return total
+
+    def search(self, query, limit=None) -> list:
+        """
+        Positions des dossiers correspondant à `query` (tous les mots),
+        du plus pertinent au moins pertinent ; `limit` premiers résultats.
+        """
+        terms = fold(query).split()
+        if not terms:
+            return []
+        candidates = None
+        for term in sorted(terms, key=len, reverse=True):
+            found = self._candidates(term)
+            candidates = set(found) if candidates is None else candidates & set(found)
+            if not candidates:
+                return []
+
+        scored = []
+        for pos in candidates:
+            s = self.score(pos, terms)
+            if s:
+                scored.append((s, pos))
+        key = lambda item: (item[0], -item[1])
+        best = heapq.nlargest(limit, scored, key=key) if limit else sorted(scored, key=key, reverse=True)
+        return [pos for _, pos in best]
+
+
+# ---------------------------------------------------------
+# 🔹 Index partagé par révision
+# ---------------------------------------------------------
+_INDEX = {"key": None, "index": None}
+_INDEX_LOCK = threading.Lock()
+
+
+def get_search_index(db) -> SearchIndex:
+    """
+    Index de la base chargée, partagé tant que la révision ne change pas ;
+    à une nouvelle révision, dérivé du précédent (réindexation partielle).
+    """
+    rev = db.get(REV_KEY)
+    clients = db.get("clients", [])
+    key = None if rev is None else (rev, len(clients))
+    with _INDEX_LOCK:
+        if key is not None and _INDEX["key"] == key:
+            return _INDEX["index"]
+        previous = _INDEX["index"]
+
+    index = SearchIndex(clients) if previous is None else previous.updated(clients)
+    if key is not None:
+        with _INDEX_LOCK:
+            _INDEX.update(key=key, index=index)
+    return index
+
+
+def search_dossiers(db, query, limit=None) -> list:
+    """Positions (dans db["clients"]) des dossiers trouvés, classés."""
+    return get_search_index(db).search(query, limit)
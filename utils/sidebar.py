@@ -2,6 +2,7 @@
 import streamlit as st
 from PIL import Image
 import os
+from backend.dropbox_utils import clear_write_conflicts, write_status
 
 def render_sidebar():
     with st.sidebar:
@@ -53,4 +54,29 @@ def render_sidebar():
         st.page_link("pages/10_❓_Aide.py", label="❓ Aide & Mode d’emploi")
 
         st.markdown("---")
+
+        # =========================
+        # ÉCRITURE DIFFÉRÉE (si activée)
+        # =========================
+        status = write_status()
+        if status:
+            if status["conflicts"]:
+                st.warning(
+                    f"⚠️ Dossiers ou tables modifiés simultanément par une autre session ({status['conflicts_at']}) : "
+                    + ", ".join(status["conflicts"])
+                    + ". Vos valeurs ont été conservées pour les champs et tables en conflit."
+                )
+                if st.button("J'ai compris", key="write_conflicts_ok"):
+                    clear_write_conflicts()
+                    st.rerun()
+            if status["state"] == "error":
+                st.error(
+                    f"❌ Enregistrement en échec ({status['last_error_at']}), "
+                    f"nouvel essai automatique : {status['last_error']}"
+                )
+            elif status["state"] in ("pending", "saving"):
+                st.caption("⏳ Enregistrement en cours…")
+            elif status["last_saved_at"]:
+                st.caption(f"💾 Enregistré ({status['last_saved_at']})")
+
         st.caption("© Cabinet – Application interne")
\ No newline at end of file
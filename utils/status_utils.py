@@ -68,6 +68,34 @@ def normalize_status_columns(df: pd.DataFrame) -> pd.DataFrame:
     return df
 
 
+def status_fields(
+    envoye=None,
+    accepte=None,
+    refuse=None,
+    annule=None,
+    rfe=None,
+) -> dict:
+    """
+    Champs à écrire dans UN dossier (dict) pour ces statuts :
+    colonne canonique + tous ses alias, comme update_status_row.
+    """
+    updates = {
+        "Dossier envoye": envoye,
+        "Dossier accepte": accepte,
+        "Dossier refuse": refuse,
+        "Dossier Annule": annule,
+        "RFE": rfe,
+    }
+
+    fields = {}
+    for canonical, value in updates.items():
+        if value is None:
+            continue
+        for col in [canonical] + STATUS_ALIAS_GROUPS.get(canonical, []):
+            fields[col] = bool(value)
+    return fields
+
+
 def update_status_row(
     df: pd.DataFrame,
     idx,
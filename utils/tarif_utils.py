@@ -1,27 +1,229 @@
-from datetime import datetime
+import threading
+from bisect import bisect_right
+from datetime import date, datetime
 
-def get_tarif_for_visa(visa, date_dossier, tarifs):
+import numpy as np
+import pandas as pd
+
+from backend.dropbox_utils import REV_KEY
+
+
+def _parse_effet(v):
+    try:
+        return datetime.strptime(v, "%Y-%m-%d").date()
+    except Exception:
+        return None
+
+
+def _as_date(v):
+    if isinstance(v, datetime):
+        return v.date()
+    if isinstance(v, date):
+        return v
+    d = pd.to_datetime(v, errors="coerce")
+    return None if pd.isna(d) else d.date()
+
+
+# ---------------------------------------------------------
+# 🔹 Index des tarifs par visa et date d'effet
+# ---------------------------------------------------------
+class TariffIndex:
     """
-    Retourne le tarif applicable pour un visa à une date donnée
+    Pour chaque visa, dates d'effet triées et tarifs correspondants :
+    le tarif applicable à une date est trouvé par dichotomie (bisect).
+    Dates invalides ignorées ; pour une même date d'effet, le premier
+    tarif de la liste l'emporte (comme get_tarif_for_visa).
     """
-    applicable = []
 
-    for t in tarifs:
-        if t["Visa"] != visa:
-            continue
+    def __init__(self, tarifs=()):
+        entries = {}
+        for order, t in enumerate(tarifs or []):
+            if not isinstance(t, dict) or "Visa" not in t:
+                continue
+            d_effet = _parse_effet(t.get("Date_effet"))
+            if d_effet is None:
+                continue
+            try:
+                tarif = float(t.get("Tarif"))
+            except (TypeError, ValueError):
+                continue
+            entries.setdefault(t["Visa"], {}).setdefault(d_effet, (order, tarif))
+
+        self._dates = {}
+        self._prices = {}
+        for visa, by_date in entries.items():
+            days = sorted(by_date)
+            self._dates[visa] = days
+            self._prices[visa] = [by_date[d][1] for d in days]
+
+        # Forme « à plat » pour le calcul vectorisé : clé (visa, jour) triée
+        self._visa_ids = {visa: i for i, visa in enumerate(self._dates)}
+        keys, prices = [], []
+        for visa, days in self._dates.items():
+            vid = self._visa_ids[visa]
+            keys.extend((vid, d.toordinal()) for d in days)
+            prices.extend(self._prices[visa])
+        self._flat_visa = np.array([k[0] for k in keys], dtype=np.int64)
+        self._flat_day = np.array([k[1] for k in keys], dtype=np.int64)
+        self._flat_price = np.array(prices, dtype=float)
+
+    def visas(self):
+        return list(self._dates)
+
+    def history(self, visa):
+        """[(date d'effet, tarif)] du visa, par date croissante."""
+        return list(zip(self._dates.get(visa, []), self._prices.get(visa, [])))
+
+    def price(self, visa, date_dossier, default=0.0) -> float:
+        """Tarif du visa en vigueur à `date_dossier` (dernière date d'effet <= date)."""
+        days = self._dates.get(visa)
+        d = _as_date(date_dossier)
+        if not days or d is None:
+            return default
+        i = bisect_right(days, d)
+        return self._prices[visa][i - 1] if i else default
+
+    def prices(self, visas, dates, default=0.0) -> np.ndarray:
+        """
+        Version vectorisée de price() : un tarif par couple (visa, date).
+        `visas` : séquence de libellés ; `dates` : séquence convertible en
+        datetime (dates invalides / NaT -> default).
+        """
+        visas = pd.Series(visas).reset_index(drop=True)
+        dates = pd.to_datetime(pd.Series(dates).reset_index(drop=True), errors="coerce")
+        out = np.full(len(visas), default, dtype=float)
+        if not len(self._flat_price) or not len(visas):
+            return out
+
+        vid = visas.map(self._visa_ids).fillna(-1).to_numpy(dtype=np.int64)
+        valid = (vid >= 0) & dates.notna().to_numpy()
+        if not valid.any():
+            return out
+
+        # Jours depuis l'époque -> ordinal (date.toordinal)
+        epoch = date(1970, 1, 1).toordinal()
+        day = dates[valid].to_numpy().astype("datetime64[D]").astype(np.int64) + epoch
+
+        # Recherche de (visa, jour) dans les clés triées par (visa, jour)
+        span = int(max(self._flat_day.max(), day.max())) + 1
+        flat_keys = self._flat_visa * span + self._flat_day
+        pos = np.searchsorted(flat_keys, vid[valid] * span + day, side="right") - 1
+
+        found = pos >= 0
+        found[found] = self._flat_visa[pos[found]] == vid[valid][found]
+        result = np.full(len(pos), default, dtype=float)
+        result[found] = self._flat_price[pos[found]]
+        out[valid] = result
+        return out
+
+
+def price_frame(df, index, visa_col="Visa", date_col="Date", default=0.0) -> pd.Series:
+    """Tarif catalogue de chaque dossier de df (à sa date), aligné sur df.index."""
+    if df.empty or visa_col not in df.columns or date_col not in df.columns:
+        return pd.Series(default, index=df.index, dtype=float)
+    return pd.Series(index.prices(df[visa_col], df[date_col], default), index=df.index)
 
+
+# ---------------------------------------------------------
+# 🔹 Impact d'un nouveau tarif
+# ---------------------------------------------------------
+CLOSING_COLUMNS = ["Dossier accepte", "Dossier refuse", "Dossier Annule"]
+FEE_COLUMN = "Montant honoraires (US $)"
+
+
+def tariff_impact(frame, index, visa, new_price, date_effet, only_open=True) -> pd.DataFrame:
+    """
+    Dossiers touchés par le tarif `new_price` du visa à partir de `date_effet`,
+    en une passe vectorisée sur le DataFrame enrichi (utils/clients_frame.py) :
+      - même visa, date du dossier >= date d'effet
+      - dossiers ouverts seulement (ni accepté, ni refusé, ni annulé) si only_open
+      - honoraires facturés différents du nouveau tarif
+    Colonnes : Dossier N, Nom, Type, Date, honoraires, tarif catalogue actuel,
+    nouveau tarif, écart (nouveau tarif - honoraires). Index = position du dossier.
+    """
+    effet = pd.Timestamp(_as_date(date_effet))
+    mask = (frame["Visa"] == str(visa).strip()).to_numpy() & (frame["Date"] >= effet).to_numpy()
+    if only_open:
+        for col in CLOSING_COLUMNS:
+            if col in frame.columns:
+                mask &= ~frame[col].to_numpy(dtype=bool)
+
+    rows = frame[mask]
+    fee = rows[FEE_COLUMN]
+    mask = (fee - float(new_price)).abs() > 0.005
+    rows, fee = rows[mask], fee[mask]
+
+    return pd.DataFrame({
+        "Dossier N": rows["Dossier N"],
+        "Nom": rows["Nom"],
+        "Type": np.where(rows["Dossier Index"] > 0, "Fils", "Parent"),
+        "Date": rows["Date"].dt.date,
+        "Honoraires actuels": fee,
+        "Tarif catalogue actuel": price_frame(rows, index, default=np.nan),
+        "Nouveau tarif": float(new_price),
+        "Écart": float(new_price) - fee,
+    }, index=rows.index)
+
+
+def impact_totals(impact) -> dict:
+    """Nombre de dossiers (parents / fils) et variation totale des honoraires."""
+    return {
+        "dossiers": len(impact),
+        "parents": int((impact["Type"] == "Parent").sum()),
+        "fils": int((impact["Type"] == "Fils").sum()),
+        "honoraires_actuels": float(impact["Honoraires actuels"].sum()),
+        "delta": float(impact["Écart"].sum()),
+    }
+
+
+# Index partagé par révision de la base
+_INDEX = {"key": None, "index": None}
+_INDEX_LOCK = threading.Lock()
+
+
+def get_tariff_index(db) -> TariffIndex:
+    """Index de db["tarifs"], construit une fois par révision."""
+    rev = db.get(REV_KEY)
+    tarifs = db.get("tarifs", [])
+    key = None if rev is None else (rev, len(tarifs))
+    with _INDEX_LOCK:
+        if key is not None and _INDEX["key"] == key:
+            return _INDEX["index"]
+
+    index = TariffIndex(tarifs)
+    if key is not None:
+        with _INDEX_LOCK:
+            _INDEX.update(key=key, index=index)
+    return index
+
+
+def _scan_price(visa, date_dossier, tarifs, default=0.0):
+    """Même règle que TariffIndex.price, en un parcours de la liste brute."""
+    d = _as_date(date_dossier)
+    if d is None:
+        return default
+    best_day, best = None, default
+    for t in tarifs or []:
+        if not isinstance(t, dict) or t.get("Visa") != visa:
+            continue
+        d_effet = _parse_effet(t.get("Date_effet"))
+        # Même date d'effet : le premier tarif de la liste l'emporte
+        if d_effet is None or d_effet > d or (best_day is not None and d_effet <= best_day):
+            continue
         try:
-            d_effet = datetime.strptime(t["Date_effet"], "%Y-%m-%d").date()
-            if d_effet <= date_dossier:
-                applicable.append(t)
-        except:
+            best = float(t.get("Tarif"))
+        except (TypeError, ValueError):
             continue
+        best_day = d_effet
+    return best
 
-    if not applicable:
-        return 0.0
 
-    applicable.sort(
-        key=lambda x: datetime.strptime(x["Date_effet"], "%Y-%m-%d"),
-        reverse=True
-    )
-    return float(applicable[0]["Tarif"])
+def get_tarif_for_visa(visa, date_dossier, tarifs):
+    """
+    Retourne le tarif applicable pour un visa à une date donnée.
+    `tarifs` : TariffIndex (get_tariff_index) pour des recherches répétées, ou
+    liste brute pour une recherche isolée (simple parcours, sans index).
+    """
+    if isinstance(tarifs, TariffIndex):
+        return float(tarifs.price(visa, date_dossier))
+    return float(_scan_price(visa, date_dossier, tarifs))
@@ -1,5 +1,12 @@
+import threading
+
+import numpy as np
 import pandas as pd
 
+from backend.dropbox_utils import REV_KEY
+from utils.clients_frame import get_clients_frame
+from utils.status_utils import normalize_bool
+
 
 def _to_float(v):
     try:
@@ -12,7 +19,10 @@ def _to_date(v):
     if v in [None, "", "None"]:
         return None
     d = pd.to_datetime(v, errors="coerce")
-    return None if pd.isna(d) else d
+    if pd.isna(d):
+        return None
+    # Date avec fuseau : ramenée en UTC sans fuseau, comparable aux autres
+    return d.tz_convert("UTC").tz_localize(None) if d.tzinfo is not None else d
 
 
 def _sum_acomptes(dossier: dict) -> float:
@@ -79,7 +89,7 @@ def build_timeline(dossier: dict) -> list:
     escrow_amount = _sum_acomptes(dossier)
 
     if escrow_amount > 0:
-        if bool(dossier.get("Escrow", False)):
+        if normalize_bool(dossier.get("Escrow", False)):
             add_event(dossier.get("Date"), "Escrow actif", amount=escrow_amount)
 
         trigger_date = (
@@ -88,10 +98,10 @@ def build_timeline(dossier: dict) -> list:
             or dossier.get("Date annulation")
         )
 
-        if bool(dossier.get("Escrow_a_reclamer", False)):
+        if normalize_bool(dossier.get("Escrow_a_reclamer", False)):
             add_event(trigger_date, "Escrow à réclamer", amount=escrow_amount)
 
-        if bool(dossier.get("Escrow_reclame", False)):
+        if normalize_bool(dossier.get("Escrow_reclame", False)):
             # Si tu as une date dédiée à l'encaissement / réclamation escrow,
             # remplace Date reclamation par le champ correct.
             add_event(dossier.get("Date reclamation"), "Escrow réclamé", amount=escrow_amount)
@@ -100,4 +110,162 @@ def build_timeline(dossier: dict) -> list:
     # Tri chrono
     # -------------------------------------------------
     events.sort(key=lambda x: x["date"])
-    return events
\ No newline at end of file
+    return events
+
+# =====================================================
+# 🔹 Journal d'événements de tous les dossiers (colonnes)
+# =====================================================
+# Mêmes règles que build_timeline, appliquées à toute la base en une passe
+# vectorisée et une seule fois par révision. Une ligne par événement :
+#   pos (position dans db["clients"]), Dossier N, Nom, date, seq (ordre de
+#   build_timeline à date égale), label, amount (NaN sans montant), meta.
+# Trié par (pos, date, seq) : la timeline d'un dossier est une tranche ;
+# une permutation triée par date donne les recherches par période.
+EVENT_COLUMNS = ["pos", "Dossier N", "Nom", "date", "seq", "label", "amount", "meta"]
+
+_STATUS_EVENTS = [
+    ("Date envoi", "Dossier envoyé"),
+    ("Date acceptation", "Dossier accepté"),
+    ("Date refus", "Dossier refusé"),
+    ("Date annulation", "Dossier annulé"),
+    ("Date reclamation", "RFE"),
+]
+_TRIGGER_COLUMNS = ["Date acceptation", "Date refus", "Date annulation"]
+
+
+def _raw_column(raw, col):
+    return raw[col] if col in raw.columns else pd.Series(None, index=raw.index, dtype=object)
+
+
+def _filled(s):
+    """Valeur brute renseignée (ni None / NaN, ni chaîne vide)."""
+    return s.notna() & (s.astype(str) != "")
+
+
+def _parse_dates(s):
+    # Chaque valeur interprétée séparément, comme _to_date ; dates avec et sans
+    # fuseau mélangées : les premières ramenées en UTC, sans fuseau
+    dates = pd.to_datetime(s.where(_filled(s)), errors="coerce", format="mixed", utc=True)
+    return dates.dt.tz_localize(None)
+
+
+def build_events(clients, frame) -> pd.DataFrame:
+    """
+    Événements de tous les dossiers. `frame` : DataFrame enrichi
+    (utils/clients_frame.py) de ces dossiers, pour les montants et drapeaux.
+    """
+    raw = pd.DataFrame(clients)
+    parts = []
+
+    def add(mask, dates, seq, label, amount=None, meta=None):
+        keep = np.asarray(mask, dtype=bool) & dates.notna().to_numpy()
+        if not keep.any():
+            return
+        part = pd.DataFrame({
+            "pos": raw.index[keep],
+            "date": dates[keep].to_numpy(),
+            "seq": seq,
+            "label": label,
+            "amount": np.nan if amount is None else np.asarray(amount, dtype=float)[keep],
+            "meta": None if meta is None else np.asarray(meta, dtype=object)[keep],
+        })
+        parts.append(part)
+
+    everyone = np.ones(len(raw), dtype=bool)
+    creation = _parse_dates(_raw_column(raw, "Date"))
+    add(everyone, creation, 0, "Création du dossier")
+
+    for i in range(1, 5):
+        montant = frame[f"Acompte {i}"].to_numpy()
+        mode = _raw_column(raw, f"Mode Acompte {i}")
+        mode = mode.where(_filled(mode), _raw_column(raw, "mode de paiement"))
+        meta = np.where(_filled(mode), "Mode : " + mode.astype(str), None)
+        add(montant > 0, _parse_dates(_raw_column(raw, f"Date Acompte {i}")), i,
+            f"Paiement Acompte {i}", amount=montant, meta=meta)
+
+    for seq, (col, label) in enumerate(_STATUS_EVENTS, start=5):
+        add(everyone, _parse_dates(_raw_column(raw, col)), seq, label)
+
+    escrow_amount = frame["Total encaissé"].to_numpy()
+    has_escrow = escrow_amount > 0
+
+    # Date du statut déclencheur : première valeur renseignée (acceptation, refus, annulation)
+    trigger = pd.Series(None, index=raw.index, dtype=object)
+    for col in reversed(_TRIGGER_COLUMNS):
+        values = _raw_column(raw, col)
+        trigger = values.where(_filled(values), trigger)
+
+    add(has_escrow & frame["Escrow"].to_numpy(), creation, 10, "Escrow actif", amount=escrow_amount)
+    add(has_escrow & frame["Escrow_a_reclamer"].to_numpy(), _parse_dates(trigger), 11,
+        "Escrow à réclamer", amount=escrow_amount)
+    add(has_escrow & frame["Escrow_reclame"].to_numpy(), _parse_dates(_raw_column(raw, "Date reclamation")), 12,
+        "Escrow réclamé", amount=escrow_amount)
+
+    if not parts:
+        return pd.DataFrame(columns=EVENT_COLUMNS)
+
+    events = pd.concat(parts, ignore_index=True)
+    events["Dossier N"] = frame["Dossier N"].to_numpy()[events["pos"].to_numpy()]
+    events["Nom"] = frame["Nom"].to_numpy()[events["pos"].to_numpy()]
+    events = events.sort_values(["pos", "date", "seq"], kind="stable", ignore_index=True)
+    return events[EVENT_COLUMNS]
+
+
+class EventStore:
+    """Événements triés par dossier, avec un ordre secondaire par date."""
+
+    def __init__(self, events: pd.DataFrame):
+        self.events = events
+        self._pos = events["pos"].to_numpy(dtype=np.int64)
+        self._by_date = np.lexsort((
+            events["seq"].to_numpy(), self._pos, events["date"].to_numpy(),
+        ))
+        self._dates = events["date"].to_numpy()[self._by_date]
+
+    def __len__(self):
+        return len(self.events)
+
+    def for_dossier(self, pos) -> pd.DataFrame:
+        """Événements du dossier à la position `pos`, dans l'ordre chronologique."""
+        lo, hi = np.searchsorted(self._pos, [pos, pos + 1])
+        return self.events.iloc[lo:hi]
+
+    def timeline(self, pos) -> list:
+        """Même format que build_timeline(dossier)."""
+        out = []
+        for date, label, amount, meta in self.for_dossier(pos)[["date", "label", "amount", "meta"]].itertuples(index=False):
+            ev = {"date": date, "label": label}
+            if not pd.isna(amount):
+                ev["amount"] = float(amount)
+            if isinstance(meta, str) and meta:  # NaN après concaténation des colonnes
+                ev["meta"] = meta
+            out.append(ev)
+        return out
+
+    def between(self, start, end) -> pd.DataFrame:
+        """Événements de tous les dossiers du jour `start` au jour `end` inclus, par date."""
+        lo = np.datetime64(pd.Timestamp(start).normalize())
+        hi = np.datetime64(pd.Timestamp(end).normalize() + pd.Timedelta(days=1))
+        a, b = np.searchsorted(self._dates, [lo, hi])
+        return self.events.iloc[self._by_date[a:b]]
+
+
+# Journal partagé par révision de la base
+_STORE = {"key": None, "store": None}
+_STORE_LOCK = threading.Lock()
+
+
+def get_event_store(db) -> EventStore:
+    """Journal d'événements de la base chargée, construit une fois par révision."""
+    rev = db.get(REV_KEY)
+    clients = db.get("clients", [])
+    key = None if rev is None else (rev, len(clients))
+    with _STORE_LOCK:
+        if key is not None and _STORE["key"] == key:
+            return _STORE["store"]
+
+    store = EventStore(build_events(clients, get_clients_frame(db)))
+    if key is not None:
+        with _STORE_LOCK:
+            _STORE.update(key=key, store=store)
+    return store
@@ -1,5 +1,9 @@
+import threading
+
 import pandas as pd
 
+from backend.dropbox_utils import REV_KEY
+
 # ---------------------------------------------------------
 # 1) Nettoyage correct du tableau VISA
 # ---------------------------------------------------------
@@ -43,10 +47,10 @@ def clean_visa_df(dfv):
         if required not in dfv.columns:
             dfv[required] = ""
 
-    # Nettoyage valeurs
-    dfv["Categories"] = dfv["Categories"].astype(str).str.strip()
-    dfv["Sous-categories"] = dfv["Sous-categories"].astype(str).str.strip()
-    dfv["Visa"] = dfv["Visa"].astype(str).str.strip()
+    # Nettoyage valeurs (cellules absentes -> "" plutôt que "nan")
+    dfv["Categories"] = dfv["Categories"].fillna("").astype(str).str.strip()
+    dfv["Sous-categories"] = dfv["Sous-categories"].fillna("").astype(str).str.strip()
+    dfv["Visa"] = dfv["Visa"].fillna("").astype(str).str.strip()
 
     # Supprime lignes vides
     dfv = dfv[(dfv["Categories"] != "") | (dfv["Sous-categories"] != "") | (dfv["Visa"] != "")]
@@ -58,62 +62,147 @@ def clean_visa_df(dfv):
 
 
 # ---------------------------------------------------------
-# 2) Liste des catégories uniques (propres)
+# 2) Référentiel compilé : Catégorie -> Sous-catégorie -> Visas
+# ---------------------------------------------------------
+class VisaReferential:
+    """
+    Table VISA nettoyée une seule fois, avec ses index :
+      - arbre {catégorie: {sous-catégorie: [visas]}}
+      - visas par sous-catégorie et par catégorie
+      - chemin inverse {visa: [(catégorie, sous-catégorie)]}
+    Toutes les listes sont triées et sans valeur vide : une cascade de
+    selectbox ne fait plus que des accès dict.
+    """
+
+    def __init__(self, dfv=None):
+        self.df = clean_visa_df(dfv)
+
+        tree, by_souscat, by_cat, paths = {}, {}, {}, {}
+        for cat, souscat, visa in self.df[["Categories", "Sous-categories", "Visa"]].itertuples(index=False):
+            if cat:
+                level = tree.setdefault(cat, {})
+                if souscat:
+                    level.setdefault(souscat, set())
+            if souscat:
+                by_souscat.setdefault(souscat, set())
+            if not visa:
+                continue
+            if cat and souscat:
+                tree[cat][souscat].add(visa)
+            if souscat:
+                by_souscat[souscat].add(visa)
+            if cat:
+                by_cat.setdefault(cat, set()).add(visa)
+            paths.setdefault(visa, set()).add((cat, souscat))
+
+        self._tree = {
+            cat: {sc: sorted(visas) for sc, visas in sorted(level.items())}
+            for cat, level in sorted(tree.items())
+        }
+        self._souscats = {cat: list(level) for cat, level in self._tree.items()}
+        self._by_souscat = {sc: sorted(visas) for sc, visas in by_souscat.items()}
+        self._by_cat = {cat: sorted(visas) for cat, visas in by_cat.items()}
+        self._paths = {visa: sorted(p) for visa, p in paths.items()}
+
+        self._categories = list(self._tree)
+        self._all_souscats = sorted(by_souscat)
+        self._all_visas = sorted(paths)
+
+    @classmethod
+    def from_records(cls, records):
+        return cls(pd.DataFrame(records if isinstance(records, list) else []))
+
+    # ------------------------
+    # CASCADE
+    # ------------------------
+    def categories(self):
+        return list(self._categories)
+
+    def souscats(self, category=None):
+        """Sous-catégories d'une catégorie (toutes si None / "Toutes")."""
+        if not category or category == "Toutes":
+            return list(self._all_souscats)
+        return list(self._souscats.get(category, []))
+
+    def visas(self, category=None, souscat=None):
+        """
+        Visas d'une sous-catégorie, à défaut d'une catégorie, à défaut tous
+        (mêmes règles que get_visas).
+        """
+        if souscat and souscat != "Toutes":
+            return list(self._by_souscat.get(souscat, []))
+        if category and category != "Toutes":
+            return list(self._by_cat.get(category, []))
+        return list(self._all_visas)
+
+    def visas_for(self, category, souscat):
+        """Visas du couple exact (catégorie, sous-catégorie)."""
+        return list(self._tree.get(category, {}).get(souscat, []))
+
+    # ------------------------
+    # CHEMIN INVERSE
+    # ------------------------
+    def paths(self, visa):
+        """[(catégorie, sous-catégorie)] où figure ce visa."""
+        return list(self._paths.get(str(visa or "").strip(), []))
+
+    def path(self, visa):
+        """Premier chemin (catégorie, sous-catégorie) du visa, None s'il est inconnu."""
+        found = self._paths.get(str(visa or "").strip())
+        return found[0] if found else None
+
+
+def _referential(dfv):
+    return dfv if isinstance(dfv, VisaReferential) else VisaReferential(dfv)
+
+
+# Référentiel partagé par révision de la base
+_REFERENTIAL = {"key": None, "referential": None}
+_REFERENTIAL_LOCK = threading.Lock()
+
+
+def get_visa_referential(db) -> VisaReferential:
+    """Référentiel de db["visa"], construit une fois par révision."""
+    rev = db.get(REV_KEY)
+    records = db.get("visa", [])
+    key = None if rev is None else (rev, len(records) if isinstance(records, list) else 0)
+    with _REFERENTIAL_LOCK:
+        if key is not None and _REFERENTIAL["key"] == key:
+            return _REFERENTIAL["referential"]
+
+    referential = VisaReferential.from_records(records)
+    if key is not None:
+        with _REFERENTIAL_LOCK:
+            _REFERENTIAL.update(key=key, referential=referential)
+    return referential
+
+
+# ---------------------------------------------------------
+# 3) Liste des catégories uniques (propres)
+# (DataFrame brut ou VisaReferential déjà construit)
 # ---------------------------------------------------------
 def get_categories(dfv):
-    dfv = clean_visa_df(dfv)
-    return sorted(dfv["Categories"].dropna().unique().tolist())
+    return _referential(dfv).categories()
 
 
 # ---------------------------------------------------------
-# 3) Liste des sous-catégories dépendantes d’une catégorie
+# 4) Liste des sous-catégories dépendantes d’une catégorie
 # ---------------------------------------------------------
 def get_souscats(dfv, category):
-    dfv = clean_visa_df(dfv)
-    if not category or category == "Toutes":
-        return sorted(dfv["Sous-categories"].dropna().unique().tolist())
-    
-    return sorted(
-        dfv[dfv["Categories"] == category]["Sous-categories"]
-        .dropna()
-        .unique()
-        .tolist()
-    )
+    return _referential(dfv).souscats(category)
 
 
 # ---------------------------------------------------------
-# 4) Liste Visa dépendante d’une sous-catégorie ou d’une catégorie
+# 5) Liste Visa dépendante d’une sous-catégorie ou d’une catégorie
 # ---------------------------------------------------------
 def get_visas(dfv, category=None, souscat=None):
-    dfv = clean_visa_df(dfv)
-
-    if souscat and souscat != "Toutes":
-        return sorted(
-            dfv[dfv["Sous-categories"] == souscat]["Visa"]
-            .dropna()
-            .unique()
-            .tolist()
-        )
-
-    if category and category != "Toutes":
-        return sorted(
-            dfv[dfv["Categories"] == category]["Visa"]
-            .dropna()
-            .unique()
-            .tolist()
-        )
-
-    return sorted(dfv["Visa"].dropna().unique().tolist())
+    return _referential(dfv).visas(category, souscat)
 
 
 # ---------------------------------------------------------
-# 5) Tout récupérer : catégories, sous-catégories, visas
+# 6) Tout récupérer : catégories, sous-catégories, visas
+# (un seul nettoyage de la table)
 # ---------------------------------------------------------
 def get_all_lists(dfv):
-    dfv = clean_visa_df(dfv)
-
-    cats = get_categories(dfv)
-    sous = sorted(dfv["Sous-categories"].dropna().unique().tolist())
-    visas = sorted(dfv["Visa"].dropna().unique().tolist())
-
-    return cats, sous, visas
+    ref = _referential(dfv)
+    return ref.categories(), ref.souscats(), ref.visas()